@@ -0,0 +1,187 @@
+from typing import Dict, Iterator, Set, Tuple, Union, TextIO
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+import argparse
+import json
+import os
+import sys
+import time
+from rules import ChessGame
+from transposition import TranspositionTable
+from stats import SearchStats
+from engine import Search, SearchLimits, MoveOrderer, DEFAULT_DEPTH, MAX_PLY, TT_SIZE_MB
+
+# kolik pozic na jeden proces muze cekat ve fronte - soubor se cte prubezne, ne cely najednou
+PENDING_PER_WORKER = 4
+
+
+def parse_epd(line: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Funkce rozdeli radek EPD na pozici a operace. EPD obsahuje prvni ctyri pole FEN a za nimi operace ve tvaru
+    'opcode operand;' (napr. bm Nf3; id "WAC.001";). Pocitadla pultahu a tahu jsou v operacich hmvc a fmvn.
+    :param line: radek EPD
+    :return: (pozice ve FEN notaci, operace podle opcode)
+    """
+    fields = line.split(maxsplit=4)
+    if len(fields) < 4:
+        raise Exception(f'Invalid EPD: {line}')
+    operations: Dict[str, str] = {}
+    rest = fields[4] if len(fields) > 4 else ''
+    while rest.strip():
+        # strednik uvnitr uvozovek operaci neukoncuje
+        end = 0
+        in_quotes = False
+        while end < len(rest) and (rest[end] != ';' or in_quotes):
+            if rest[end] == '"':
+                in_quotes = not in_quotes
+            end += 1
+        operation = rest[:end].split(maxsplit=1)
+        if len(operation) > 0:
+            operations[operation[0]] = operation[1].strip().strip('"') if len(operation) > 1 else ''
+        rest = rest[end + 1:]
+    fen = ' '.join(fields[:4]) + f' {operations.get("hmvc", 0)} {operations.get("fmvn", 1)}'
+    return fen, operations
+
+
+def read_epd(file: TextIO) -> Iterator[Tuple[int, str]]:
+    """
+    Generator vraci neprazdne radky souboru EPD s cislem radku (komentare zacinajici # se preskakuji).
+    """
+    for line_number, line in enumerate(file, 1):
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line_number, line
+
+
+def normalize_san(san: str) -> str:
+    """
+    Funkce sjednoti zapis tahu v SAN, aby sel porovnat tah enginu s tahem z EPD (rosada 0-0 i O-O, promena s '='
+    i bez, znaky sachu a hodnoceni tahu).
+    """
+    return san.replace(' e.p.', '').replace('O', '0').replace('=', '').rstrip('+#!?')
+
+
+# transpozicni tabulka jednoho procesu, kazdy proces ma vlastni
+_worker_tt: Union[TranspositionTable, None] = None
+
+
+def _init_worker(tt_size_mb: int) -> None:
+    global _worker_tt
+    _worker_tt = TranspositionTable(tt_size_mb)
+
+
+def analyse_position(line_number: int, line: str, depth: int, limits: SearchLimits) -> Dict:
+    """
+    Funkce pro proces: prohleda jednu pozici z EPD. Transpozicni tabulka se pred kazdou pozici vymaze, aby vysledek
+    nezavisel na poradi pozic.
+    :return: vysledek jako slovnik pro zapis do JSONL
+    """
+    record: Dict = {'line': line_number}
+    try:
+        fen, operations = parse_epd(line)
+        record['fen'] = fen
+        if 'id' in operations:
+            record['id'] = operations['id']
+        game = ChessGame(fen)
+        _worker_tt.clear()
+        result = Search(game, depth, _worker_tt, MoveOrderer(), SearchStats(), limits=limits).search()
+    except Exception as e:
+        # chyba jedne pozice (zapis i hledani) se zapise do vysledku, ostatni pozice se analyzuji dal
+        record['error'] = str(e)
+        return record
+    if result.best_move is None:
+        record['best_move'] = None
+        return record
+    record.update({
+        'best_move': result.best_move.san,
+        'uci': result.best_move.uci,
+        'score': result.score,
+        'depth': result.depth,
+        'nodes': result.nodes,
+        'time': round(result.elapsed, 3),
+        'pv': [move.uci for move in result.pv],
+    })
+    best_move = normalize_san(result.best_move.san)
+    if 'bm' in operations:
+        record['bm'] = operations['bm']
+        record['correct'] = best_move in {normalize_san(san) for san in operations['bm'].split()}
+    if 'am' in operations:
+        record['am'] = operations['am']
+        record['correct'] = record.get('correct', True) and \
+            best_move not in {normalize_san(san) for san in operations['am'].split()}
+    return record
+
+
+def run_batch(input_file: TextIO, output_file: TextIO, workers: int, depth: int, limits: SearchLimits,
+              tt_size_mb: int = TT_SIZE_MB) -> int:
+    """
+    Funkce prohleda vsechny pozice souboru EPD ve skupine procesu. Soubor se cte prubezne a ve fronte ceka nejvyse
+    PENDING_PER_WORKER pozic na proces, vysledky se zapisuji hned, jak jsou hotove (v poradi dokonceni, ne v poradi
+    souboru - radek pozice je ve vysledku).
+    :param input_file: soubor EPD
+    :param output_file: soubor pro vysledky JSONL
+    :param workers: pocet procesu
+    :param depth: maximalni hloubka hledani
+    :param limits: casove limity a limit uzlu pro jednu pozici
+    :param tt_size_mb: velikost transpozicni tabulky kazdeho procesu v MB
+    :return: pocet zpracovanych pozic
+    """
+    count = 0
+    pending: Set[Future] = set()
+    # radek pozice pro kazdou zadanou ulohu, pro zaznam chyby, pokud proces s ulohou spadne
+    line_numbers: Dict[Future, int] = {}
+    positions = read_epd(input_file)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(tt_size_mb,)) as executor:
+        while True:
+            for line_number, line in positions:
+                future = executor.submit(analyse_position, line_number, line, depth, limits)
+                line_numbers[future] = line_number
+                pending.add(future)
+                if len(pending) >= workers * PENDING_PER_WORKER:
+                    break
+            if len(pending) == 0:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                line_number = line_numbers.pop(future)
+                try:
+                    record = future.result()
+                except Exception as e:
+                    record = {'line': line_number, 'error': str(e) or type(e).__name__}
+                output_file.write(json.dumps(record) + '\n')
+                count += 1
+            output_file.flush()
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Hromadna analyza pozic ze souboru EPD, vysledky ve formatu JSONL.')
+    parser.add_argument('epd', help='vstupni soubor EPD')
+    parser.add_argument('-o', '--output', help='vystupni soubor JSONL (vychozi je standardni vystup)')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help='pocet procesu')
+    parser.add_argument('-d', '--depth', type=int, help='maximalni hloubka hledani v pultazich (vychozi '
+                        f'{DEFAULT_DEPTH}, s casovym limitem nebo limitem uzlu {MAX_PLY})')
+    parser.add_argument('--time', type=float, help='cas na pozici v sekundach (tvrdy limit, dalsi iterace se '
+                        'nezacne po polovine)')
+    parser.add_argument('--nodes', type=int, help='maximalni pocet uzlu na pozici')
+    parser.add_argument('--hash', type=int, default=TT_SIZE_MB, help='velikost transpozicni tabulky procesu v MB')
+    args = parser.parse_args()
+    limits = SearchLimits(args.time / 2 if args.time is not None else None, args.time, args.nodes)
+    depth = args.depth
+    if depth is None:
+        depth = DEFAULT_DEPTH if args.time is None and args.nodes is None else MAX_PLY
+
+    start = time.perf_counter()
+    with open(args.epd) as input_file:
+        output_file = open(args.output, 'w') if args.output is not None else sys.stdout
+        try:
+            count = run_batch(input_file, output_file, args.workers, depth, limits, args.hash)
+        finally:
+            if output_file is not sys.stdout:
+                output_file.close()
+    elapsed = time.perf_counter() - start
+    print(f'positions {count}, time {elapsed:.1f} s, {count / max(elapsed, 1e-9) * 3600:.0f} positions/hour',
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+from typing import Dict, List, Tuple, Union
+import argparse
+import mmap
+import random
+import struct
+from rules import ChessGame, Move, STARTING_FEN, KNIGHT_CODE, BISHOP_CODE, ROOK_CODE, QUEEN_CODE, MOVE_PROMOTION_SHIFT
+from pgn import read_games
+
+# Zaznam knihy zahajeni ma rozlozeni formatu Polyglot: 16 bajtu big-endian - klic pozice (64 bitu), tah (16 bitu),
+# vaha (16 bitu) a learn (32 bitu, nepouzivame). Zaznamy jsou serazene podle klice, zaznamy stejne pozice podle vahy
+# sestupne. Klicem je nas Zobrist hash (ChessGame.zobrist_key), ne klic Polyglotu, knihy jinych programu tedy
+# ctou zaznamy spravne, ale pozice v nich nenajdou.
+ENTRY = struct.Struct('>QHHI')
+# kod promeny v tahu Polyglotu podle kodu figury
+_POLYGLOT_PROMOTIONS = {KNIGHT_CODE: 1, BISHOP_CODE: 2, ROOK_CODE: 3, QUEEN_CODE: 4}
+DEFAULT_BOOK_PLIES = 20
+MAX_WEIGHT = 0xFFFF
+
+
+def encode_book_move(move: Move) -> int:
+    """
+    Funkce zakoduje tah do 16 bitu podle formatu Polyglot: cilovy sloupec, cilova rada, vychozi sloupec, vychozi rada
+    (rady od 0 pro prvni radu) a promena. Rosada se zapisuje jako tah krale na pole vlastni veze.
+    :param move: tah
+    :return: kod tahu v knize
+    """
+    end_col = move.end_col
+    if move.is_castle:
+        end_col = 7 if move.end_col > move.start_col else 0
+    promotion = _POLYGLOT_PROMOTIONS.get((move.code >> MOVE_PROMOTION_SHIFT) & 7, 0)
+    return end_col | (7 - move.end_row) << 3 | move.start_col << 6 | (7 - move.start_row) << 9 | promotion << 12
+
+
+def build_book(pgn_files: List[str], output: str, plies: int = DEFAULT_BOOK_PLIES, min_games: int = 1) -> int:
+    """
+    Funkce projde partie z PGN souboru a z prvnich tahu kazde partie sestavi knihu zahajeni. Vaha tahu je soucet
+    bodu hrace, ktery tah zahral (vyhra 2, remiza 1, prohra 0), tahy s nulovou vahou se do knihy nezapisuji.
+    Partie, ktere nelze prehrat, se preskoci.
+    :param pgn_files: PGN soubory
+    :param output: soubor knihy
+    :param plies: kolik prvnich pultahu kazde partie se do knihy zapise
+    :param min_games: minimalni pocet partii, ve kterych se tah v dane pozici objevil
+    :return: pocet zaznamu knihy
+    """
+    weights: Dict[Tuple[int, int], List[int]] = {}
+    for pgn_file in pgn_files:
+        with open(pgn_file, encoding='utf-8', errors='replace') as file:
+            for pgn_game in read_games(file):
+                if pgn_game.result == '1-0':
+                    points = (2, 0)
+                elif pgn_game.result == '0-1':
+                    points = (0, 2)
+                elif pgn_game.result == '1/2-1/2':
+                    points = (1, 1)
+                else:
+                    continue
+                # tahy partie zapiseme, az kdyz se partie da prehrat
+                game_moves: List[Tuple[int, int, int]] = []
+                try:
+                    game = ChessGame(pgn_game.fen)
+                    for san in pgn_game.moves[:plies]:
+                        move = game.parse_san(san)
+                        game_moves.append((game.zobrist_key, encode_book_move(move),
+                                           points[0 if game.white_to_move else 1]))
+                        game.do_move(move)
+                except Exception:
+                    continue
+                for key, move_code, move_points in game_moves:
+                    entry = weights.setdefault((key, move_code), [0, 0])
+                    entry[0] += move_points
+                    entry[1] += 1
+
+    entries = [(key, move, weight) for (key, move), (weight, games) in weights.items()
+               if weight > 0 and games >= min_games]
+    # vahy se musi vejit do 16 bitu, pomer vah tahu zustane zachovan
+    max_weight = max((weight for _, _, weight in entries), default=0)
+    if max_weight > MAX_WEIGHT:
+        entries = [(key, move, max(1, weight * MAX_WEIGHT // max_weight)) for key, move, weight in entries]
+    entries.sort(key=lambda entry: (entry[0], -entry[2], entry[1]))
+    with open(output, 'wb') as file:
+        for key, move, weight in entries:
+            file.write(ENTRY.pack(key, move, weight, 0))
+    return len(entries)
+
+
+class OpeningBook:
+    """
+    Kniha zahajeni namapovana do pameti (mmap). Soubor se necte do pameti procesu, zaznamy pozice se hledaji
+    binarne primo v souboru, a vice procesu tak sdili stranky souboru v pameti systemu.
+    """
+    def __init__(self, path: str) -> None:
+        """
+        :param path: soubor knihy (viz build_book())
+        """
+        self.file = open(path, 'rb')
+        self.data: Union[mmap.mmap, bytes] = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) \
+            if self._file_size() > 0 else b''
+        self.size: int = len(self.data) // ENTRY.size
+
+    def _file_size(self) -> int:
+        self.file.seek(0, 2)
+        return self.file.tell()
+
+    def close(self) -> None:
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def _key_at(self, index: int) -> int:
+        return ENTRY.unpack_from(self.data, index * ENTRY.size)[0]
+
+    def probe(self, game: ChessGame, valid_moves: Union[List[Move], None] = None) -> List[Tuple[Move, int]]:
+        """
+        Metoda najde tahy aktualni pozice v knize. Zaznamy, ktere neodpovidaji zadnemu legalnimu tahu (kolize
+        klicu), se vynechaji.
+        :param game: objekt partie
+        :param valid_moves: legalni tahy pozice (pokud je nezadame, vygeneruji se)
+        :return: list dvojic (tah, vaha) serazeny podle vahy sestupne
+        """
+        key = game.zobrist_key
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low >= self.size or self._key_at(low) != key:
+            return []
+        if valid_moves is None:
+            valid_moves = game.generate_legal_moves()
+        moves_by_code = {encode_book_move(move): move for move in valid_moves}
+        result: List[Tuple[Move, int]] = []
+        index = low
+        while index < self.size:
+            entry_key, move_code, weight, _ = ENTRY.unpack_from(self.data, index * ENTRY.size)
+            if entry_key != key:
+                break
+            if move_code in moves_by_code:
+                result.append((moves_by_code[move_code], weight))
+            index += 1
+        return result
+
+    def choose_move(self, game: ChessGame, valid_moves: Union[List[Move], None] = None,
+                    best: bool = False) -> Union[Move, None]:
+        """
+        Metoda vybere tah z knihy nahodne podle vah (nebo tah s nejvyssi vahou).
+        :param game: objekt partie
+        :param valid_moves: legalni tahy pozice (pokud je nezadame, vygeneruji se)
+        :param best: vybrat tah s nejvyssi vahou misto nahodneho vyberu
+        :return: tah z knihy, nebo None, pokud pozice v knize neni
+        """
+        entries = self.probe(game, valid_moves)
+        if len(entries) == 0:
+            return None
+        if best:
+            return entries[0][0]
+        return random.choices([move for move, _ in entries], weights=[weight for _, weight in entries])[0]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Kniha zahajeni - sestaveni z PGN a vypis tahu pozice.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build_parser = subparsers.add_parser('build', help='sestavit knihu z PGN souboru')
+    build_parser.add_argument('pgn', nargs='+', help='PGN soubory')
+    build_parser.add_argument('-o', '--output', default='book.bin', help='soubor knihy')
+    build_parser.add_argument('--plies', type=int, default=DEFAULT_BOOK_PLIES, help='pocet pultahu z kazde partie')
+    build_parser.add_argument('--min-games', type=int, default=1, help='minimalni pocet partii s tahem')
+    probe_parser = subparsers.add_parser('probe', help='vypsat tahy pozice z knihy')
+    probe_parser.add_argument('book', help='soubor knihy')
+    probe_parser.add_argument('--fen', default=STARTING_FEN, help='pozice ve FEN notaci')
+    args = parser.parse_args()
+    if args.command == 'build':
+        count = build_book(args.pgn, args.output, args.plies, args.min_games)
+        print(f'entries {count}')
+    else:
+        book = OpeningBook(args.book)
+        try:
+            for move, weight in book.probe(ChessGame(args.fen)):
+                print(f'{move}: {weight}')
+        finally:
+            book.close()
+
+
+if __name__ == '__main__':
+    main()
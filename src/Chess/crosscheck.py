@@ -0,0 +1,72 @@
+from typing import List
+import argparse
+import importlib
+import random
+import sys
+from rules import ChessGame, Move
+from batch import normalize_san
+
+# Vyvojarsky skript: porovna generator tahu, FEN a SAN s knihovnou python-chess v nahodnych partiich. Knihovna neni
+# zavislosti projektu, instaluje se s vyvojovymi zavislostmi (pip install -r requirements-dev.txt).
+
+
+def _import_python_chess():
+    try:
+        return importlib.import_module('chess')
+    except ImportError as e:
+        raise ImportError('python-chess is not installed, run: pip install -r requirements-dev.txt') from e
+
+
+def crosscheck(games: int, plies: int, seed: int) -> int:
+    """
+    Funkce odehraje nahodne partie soucasne v ChessGame a v python-chess a po kazdem tahu porovna legalni tahy,
+    FEN a notaci tahu.
+    :param games: pocet partii
+    :param plies: maximalni pocet pultahu partie
+    :param seed: seed generatoru nahodnych cisel
+    :return: pocet partii s rozdilem
+    """
+    chess = _import_python_chess()
+    rng = random.Random(seed)
+    errors = 0
+    for game_number in range(games):
+        board = chess.Board()
+        game = ChessGame()
+        for _ in range(plies):
+            moves: List[Move] = game.generate_legal_moves()
+            expected = sorted(move.uci() for move in board.legal_moves)
+            if sorted(move.uci for move in moves) != expected:
+                print(f'game {game_number}: moves differ in {board.fen()}')
+                errors += 1
+                break
+            # pole pro brani mimochodem zapisujeme po kazdem tahu pescem o dve pole, i kdyz brat nelze
+            if game.get_fen() != board.fen(en_passant='fen'):
+                print(f'game {game_number}: FEN {game.get_fen()} != {board.fen(en_passant="fen")}')
+                errors += 1
+                break
+            if not moves:
+                break
+            move = rng.choice(moves)
+            expected_san = normalize_san(board.san(chess.Move.from_uci(move.uci)))
+            if normalize_san(move.san) != expected_san:
+                print(f'game {game_number}: SAN {move.san} != {expected_san} in {board.fen()}')
+                errors += 1
+                break
+            game.do_move(move)
+            board.push_uci(move.uci)
+    return errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Porovnani generatoru tahu, FEN a SAN s knihovnou python-chess.')
+    parser.add_argument('-g', '--games', type=int, default=100, help='pocet nahodnych partii')
+    parser.add_argument('--plies', type=int, default=200, help='maximalni pocet pultahu partie')
+    parser.add_argument('--seed', type=int, default=1, help='seed generatoru nahodnych cisel')
+    args = parser.parse_args()
+    errors = crosscheck(args.games, args.plies, args.seed)
+    print(f'games {args.games}, errors {errors}')
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
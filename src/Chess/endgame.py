@@ -0,0 +1,483 @@
+from typing import Dict, List, Tuple, Union
+import argparse
+import itertools
+import mmap
+import os
+import time
+from rules import ChessGame, STARTING_FEN, PAWN_CODE, KNIGHT_CODE, BISHOP_CODE, ROOK_CODE, QUEEN_CODE
+
+# Tabulky koncovek: silnejsi strana (v tabulce vzdy bila) ma krale a figury podle nazvu, slabsi strana jen krale.
+# Figury v indexu tabulky jsou v poradi podle nazvu.
+TABLES: Dict[str, Tuple[int, ...]] = {
+    'KQK': (QUEEN_CODE,),
+    'KRK': (ROOK_CODE,),
+    'KPK': (PAWN_CODE,),
+    'KBNK': (BISHOP_CODE, KNIGHT_CODE),
+}
+# KPK pouziva pri promene pesce tabulky KQK a KRK, ty se proto generuji drive
+GENERATION_ORDER = ['KQK', 'KRK', 'KPK', 'KBNK']
+ENDGAME_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'endgame')
+
+# Hodnota pozice v tabulce (1 bajt): DRAW, ILLEGAL, nebo vzdalenost do matu v pultazich + 1. Vzdalenost je vzdy
+# vzdalenost matu silnejsi strany - pri tahu silnejsi strany vyhra, pri tahu slabsi strany prohra.
+DRAW = 0
+ILLEGAL = 255
+WHITE = 0
+BLACK = 1
+
+# Pole v tabulkach jsou 0..63, index je rada * 8 + sloupec, kde rada 0 je prvni rada (na rozdil od 0x88 v rules.py).
+KING_STEPS = [[s2 for s2 in range(64) if s2 != s and max(abs(s2 // 8 - s // 8), abs(s2 % 8 - s % 8)) == 1]
+              for s in range(64)]
+KNIGHT_STEPS = [[s2 for s2 in range(64) if {abs(s2 // 8 - s // 8), abs(s2 % 8 - s % 8)} == {1, 2}]
+                for s in range(64)]
+_ORTHOGONAL_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+_DIAGONAL_DIRECTIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+def _rays(s: int, directions: Tuple[Tuple[int, int], ...]) -> List[List[int]]:
+    rays = []
+    for rank_step, file_step in directions:
+        ray = []
+        rank, file = s // 8 + rank_step, s % 8 + file_step
+        while 0 <= rank < 8 and 0 <= file < 8:
+            ray.append(rank * 8 + file)
+            rank, file = rank + rank_step, file + file_step
+        rays.append(ray)
+    return rays
+
+
+ORTHOGONAL_RAYS = [_rays(s, _ORTHOGONAL_DIRECTIONS) for s in range(64)]
+DIAGONAL_RAYS = [_rays(s, _DIAGONAL_DIRECTIONS) for s in range(64)]
+PIECE_RAYS = {
+    BISHOP_CODE: DIAGONAL_RAYS,
+    ROOK_CODE: ORTHOGONAL_RAYS,
+    QUEEN_CODE: [ORTHOGONAL_RAYS[s] + DIAGONAL_RAYS[s] for s in range(64)],
+}
+# bitova maska poli mezi dvema poli na spolecne linii, -1 pokud na spolecne linii nejsou
+_BETWEEN_ORTHOGONAL = [[-1] * 64 for _ in range(64)]
+_BETWEEN_DIAGONAL = [[-1] * 64 for _ in range(64)]
+for _s in range(64):
+    for _between, _all_rays in ((_BETWEEN_ORTHOGONAL, ORTHOGONAL_RAYS), (_BETWEEN_DIAGONAL, DIAGONAL_RAYS)):
+        for _ray in _all_rays[_s]:
+            _mask = 0
+            for _s2 in _ray:
+                _between[_s][_s2] = _mask
+                _mask |= 1 << _s2
+KING_MASKS = [sum(1 << s2 for s2 in KING_STEPS[s]) for s in range(64)]
+KNIGHT_MASKS = [sum(1 << s2 for s2 in KNIGHT_STEPS[s]) for s in range(64)]
+# pole napadena bilym pescem z daneho pole
+PAWN_MASKS = [(1 << s + 7 if s % 8 > 0 and s < 56 else 0) | (1 << s + 9 if s % 8 < 7 and s < 56 else 0)
+              for s in range(64)]
+
+# Tabulky bez pescu jsou symetricke podle svisle, vodorovne i diagonalni osy. Kazdou pozici transformujeme tak, aby
+# bily kral stal v trojuhelniku a1-d1-d4 (10 poli), tabulka je tak osmkrat mensi. Pozice s kralem na diagonale
+# a1-h8, ktere se na kanonickou pozici netransformuji, jsou v tabulce jako nelegalni.
+TRIANGLE = [rank * 8 + file for file in range(4) for rank in range(file + 1)]
+_TRIANGLE_INDEX = {s: i for i, s in enumerate(TRIANGLE)}
+
+
+def _transform(s: int, flip_file: bool, flip_rank: bool, flip_diagonal: bool) -> int:
+    rank, file = s // 8, s % 8
+    if flip_file:
+        file = 7 - file
+    if flip_rank:
+        rank = 7 - rank
+    if flip_diagonal:
+        rank, file = file, rank
+    return rank * 8 + file
+
+
+# transformace poli podle pole bileho krale
+_KING_TRANSFORMS: List[List[int]] = []
+for _s in range(64):
+    _flip_file, _flip_rank = _s % 8 > 3, _s // 8 > 3
+    _king = _transform(_s, _flip_file, _flip_rank, False)
+    _flip_diagonal = _king // 8 > _king % 8
+    _KING_TRANSFORMS.append([_transform(s, _flip_file, _flip_rank, _flip_diagonal) for s in range(64)])
+_DIAGONAL = {s * 9 for s in range(8)}
+_DIAGONAL_FLIP = [_transform(s, False, False, True) for s in range(64)]
+
+
+class TableLayout:
+    """
+    Rozlozeni tabulky koncovky: index pozice je (((strana na tahu * K + bily kral) * 64 + cerny kral) * 64 + figura 1)
+    * 64 + figura 2, kde K je 10 pro tabulky bez pescu (bily kral v trojuhelniku) a 64 pro tabulky s pescem.
+    """
+    def __init__(self, codes: Tuple[int, ...]) -> None:
+        self.codes = codes
+        self.pawnless: bool = PAWN_CODE not in codes
+        self.kings: List[int] = TRIANGLE if self.pawnless else list(range(64))
+        self.size: int = 2 * len(self.kings) * 64 ** (len(codes) + 1)
+
+    def index(self, stm: int, wk: int, bk: int, pieces: Tuple[int, ...]) -> int:
+        """
+        Metoda vraci index pozice, pozice bez pescu se nejdrive transformuje (viz _KING_TRANSFORMS).
+        :param stm: strana na tahu (WHITE je silnejsi strana)
+        :param wk: pole bileho krale
+        :param bk: pole cerneho krale
+        :param pieces: pole figur silnejsi strany v poradi self.codes
+        """
+        if self.pawnless:
+            transform = _KING_TRANSFORMS[wk]
+            if transform[wk] in _DIAGONAL:
+                # kral na diagonale a1-h8 - pozici a jeji obraz podle diagonaly rozlisi prvni dalsi kamen mimo ni
+                for s in (bk,) + pieces:
+                    s = transform[s]
+                    if s not in _DIAGONAL:
+                        if s // 8 > s % 8:
+                            transform = [_DIAGONAL_FLIP[s2] for s2 in transform]
+                        break
+            index = (stm * 10 + _TRIANGLE_INDEX[transform[wk]]) * 64 + transform[bk]
+            for s in pieces:
+                index = index * 64 + transform[s]
+        else:
+            index = (stm * 64 + wk) * 64 + bk
+            for s in pieces:
+                index = index * 64 + s
+        return index
+
+    def decode(self, index: int) -> Tuple[int, int, int, Tuple[int, ...]]:
+        """
+        Metoda vraci pozici indexu (strana na tahu, bily kral, cerny kral, figury).
+        """
+        pieces = []
+        for _ in self.codes:
+            index, s = divmod(index, 64)
+            pieces.append(s)
+        pieces.reverse()
+        index, bk = divmod(index, 64)
+        stm, king = divmod(index, len(self.kings))
+        return stm, self.kings[king], bk, tuple(pieces)
+
+
+def _attacked(s: int, codes: Tuple[int, ...], wk: int, pieces: Tuple[int, ...], occupied: int,
+              skip: int = -1) -> bool:
+    """
+    Funkce zjisti, zda bila strana napada pole.
+    :param s: pole
+    :param codes: kody figur bile strany (bez krale)
+    :param wk: pole bileho krale
+    :param pieces: pole figur bile strany
+    :param occupied: bitova maska obsazenych poli
+    :param skip: pole figury, ktera se nepocita (figura brana cernym kralem)
+    """
+    if KING_MASKS[wk] >> s & 1:
+        return True
+    for code, piece_sq in zip(codes, pieces):
+        if piece_sq == skip:
+            continue
+        if code == KNIGHT_CODE:
+            if KNIGHT_MASKS[piece_sq] >> s & 1:
+                return True
+        elif code == PAWN_CODE:
+            if PAWN_MASKS[piece_sq] >> s & 1:
+                return True
+        else:
+            if code != BISHOP_CODE:
+                between = _BETWEEN_ORTHOGONAL[piece_sq][s]
+                if between >= 0 and between & occupied == 0:
+                    return True
+            if code != ROOK_CODE:
+                between = _BETWEEN_DIAGONAL[piece_sq][s]
+                if between >= 0 and between & occupied == 0:
+                    return True
+    return False
+
+
+def _black_king_moves(codes: Tuple[int, ...], wk: int, bk: int, pieces: Tuple[int, ...]) -> Tuple[List[int], bool]:
+    """
+    Funkce vraci legalni tahy cerneho krale bez brani a priznak, zda muze brat nekterou figuru (brani vede do
+    koncovky bez matu nebo mimo tabulku, pro tabulku je to remiza).
+    """
+    # pole krale je pri jeho tahu prazdne - vez nebo dama utoci i na pole za nim
+    occupied = 1 << wk
+    for piece_sq in pieces:
+        occupied |= 1 << piece_sq
+    targets = []
+    can_capture = False
+    for target in KING_STEPS[bk]:
+        if KING_MASKS[wk] >> target & 1 or target == wk:
+            continue
+        if target in pieces:
+            if not can_capture and not _attacked(target, codes, wk, pieces, occupied, target):
+                can_capture = True
+        elif not _attacked(target, codes, wk, pieces, occupied):
+            targets.append(target)
+    return targets, can_capture
+
+
+def generate_table(name: str, tables: Dict[str, bytes]) -> bytearray:
+    """
+    Funkce vygeneruje tabulku koncovky retrogradni analyzou: od matu postupuje tahy zpet. Pozice bile strany na tahu
+    je vyhrana za n + 1 pultahu, pokud z ni vede tah do pozice prohrane za n pultahu. Pozice cerne strany na tahu
+    je prohrana, pokud vsechny jeji tahy vedou do vyhranych pozic, a vzdalenost do matu je o jedna vetsi nez
+    nejvzdalenejsi z nich - proto se pozice zpracovavaji podle vzdalenosti do matu od nejmensi.
+    :param name: nazev tabulky (viz TABLES)
+    :param tables: jiz vygenerovane tabulky podle nazvu (KPK potrebuje KQK a KRK pro promenu pesce)
+    :return: hodnoty pozic podle indexu (viz TableLayout)
+    """
+    codes = TABLES[name]
+    layout = TableLayout(codes)
+    values = bytearray(layout.size)
+    # buckets[n] - pozice, jejichz vzdalenost do matu je n pultahu
+    buckets: List[List[int]] = [[]]
+    # vyhry bile strany promenou pesce podle vzdalenosti do matu, pouziji se, az na ne prijde rada
+    promotions: Dict[int, List[int]] = {}
+    promotion_layouts = [(TableLayout(TABLES[promotion]), tables[promotion]) for promotion in ('KQK', 'KRK')
+                         if PAWN_CODE in codes]
+
+    index = 0
+    for stm in (WHITE, BLACK):
+        for wk in layout.kings:
+            for bk in range(64):
+                for pieces in itertools.product(range(64), repeat=len(codes)):
+                    squares = (wk, bk) + pieces
+                    if len(set(squares)) < len(squares) or KING_MASKS[wk] >> bk & 1 or \
+                            any(code == PAWN_CODE and not 8 <= s < 56 for code, s in zip(codes, pieces)):
+                        values[index] = ILLEGAL
+                    elif layout.pawnless and wk in _DIAGONAL and layout.index(stm, wk, bk, pieces) != index:
+                        values[index] = ILLEGAL
+                    elif stm == WHITE:
+                        occupied = sum(1 << s for s in squares)
+                        if _attacked(bk, codes, wk, pieces, occupied):
+                            values[index] = ILLEGAL
+                        elif promotion_layouts and pieces[0] >= 48 and pieces[0] + 8 not in squares:
+                            promotion_sq = pieces[0] + 8
+                            distances = []
+                            for promotion_layout, table in promotion_layouts:
+                                value = table[promotion_layout.index(BLACK, wk, bk, (promotion_sq,))]
+                                if value != DRAW and value != ILLEGAL:
+                                    distances.append(value)
+                            if distances:
+                                # hodnota je vzdalenost + 1, po promene je to tedy presne vzdalenost z teto pozice
+                                promotions.setdefault(min(distances), []).append(index)
+                    else:
+                        targets, can_capture = _black_king_moves(codes, wk, bk, pieces)
+                        if not targets and not can_capture and \
+                                _attacked(bk, codes, wk, pieces, sum(1 << s for s in squares)):
+                            values[index] = 1
+                            buckets[0].append(index)
+                    index += 1
+
+    distance = 0
+    while distance < len(buckets) or any(d >= distance for d in promotions):
+        if distance == len(buckets):
+            buckets.append([])
+        for index in promotions.pop(distance, []):
+            if values[index] == DRAW:
+                values[index] = distance + 1
+                buckets[distance].append(index)
+        if not buckets[distance]:
+            distance += 1
+            continue
+        buckets.append([])
+        next_bucket = buckets[distance + 1]
+        next_value = distance + 2
+        for index in buckets[distance]:
+            stm, wk, bk, pieces = layout.decode(index)
+            occupied = 1 << wk | 1 << bk
+            for s in pieces:
+                occupied |= 1 << s
+            if stm == BLACK:
+                # cerny prohrava - bily vyhraje kazdou pozici, ze ktere do teto pozice tahne
+                for predecessor in _white_predecessors(layout, wk, bk, pieces, occupied):
+                    if values[predecessor] == DRAW:
+                        values[predecessor] = next_value
+                        next_bucket.append(predecessor)
+            else:
+                for target in KING_STEPS[bk]:
+                    if occupied >> target & 1:
+                        continue
+                    predecessor = layout.index(BLACK, wk, target, pieces)
+                    if values[predecessor] == DRAW and _black_lost(layout, values, wk, target, pieces):
+                        values[predecessor] = next_value
+                        next_bucket.append(predecessor)
+        distance += 1
+    return values
+
+
+def _white_predecessors(layout: TableLayout, wk: int, bk: int, pieces: Tuple[int, ...], occupied: int) -> List[int]:
+    """
+    Funkce vraci indexy pozic s bilym na tahu, ze kterych tah bile figury (bez brani a promeny) vede do dane pozice.
+    Nelegalni pozice (cerny kral v sachu) maji v tabulce hodnotu ILLEGAL.
+    """
+    predecessors = []
+    for target in KING_STEPS[wk]:
+        if not occupied >> target & 1:
+            predecessors.append(layout.index(WHITE, target, bk, pieces))
+    for i, (code, piece_sq) in enumerate(zip(layout.codes, pieces)):
+        if code == PAWN_CODE:
+            targets = []
+            if piece_sq >= 16 and not occupied >> piece_sq - 8 & 1:
+                targets.append(piece_sq - 8)
+                if 24 <= piece_sq < 32 and not occupied >> piece_sq - 16 & 1:
+                    targets.append(piece_sq - 16)
+        elif code == KNIGHT_CODE:
+            targets = [target for target in KNIGHT_STEPS[piece_sq] if not occupied >> target & 1]
+        else:
+            targets = []
+            for ray in PIECE_RAYS[code][piece_sq]:
+                for target in ray:
+                    if occupied >> target & 1:
+                        break
+                    targets.append(target)
+        for target in targets:
+            predecessors.append(layout.index(WHITE, wk, bk, pieces[:i] + (target,) + pieces[i + 1:]))
+    return predecessors
+
+
+def _black_lost(layout: TableLayout, values: bytearray, wk: int, bk: int, pieces: Tuple[int, ...]) -> bool:
+    """
+    Funkce zjisti, zda vsechny tahy cerneho krale vedou do pozic vyhranych bilym (pat ani brani nejsou prohra).
+    """
+    targets, can_capture = _black_king_moves(layout.codes, wk, bk, pieces)
+    if can_capture or not targets:
+        return False
+    for target in targets:
+        value = values[layout.index(WHITE, wk, target, pieces)]
+        if value == DRAW or value == ILLEGAL:
+            return False
+    return True
+
+
+def table_path(directory: str, name: str) -> str:
+    return os.path.join(directory, f'{name}.bin')
+
+
+def generate_tables(directory: str = ENDGAME_DIR, names: Union[List[str], None] = None) -> None:
+    """
+    Funkce vygeneruje tabulky a zapise je do adresare (jeden soubor na tabulku). Tabulky potrebne pro generovani
+    jinych tabulek se nactou z adresare, pokud uz existuji, jinak se vygeneruji take.
+    :param directory: adresar tabulek
+    :param names: nazvy tabulek, vychozi jsou vsechny
+    """
+    os.makedirs(directory, exist_ok=True)
+    names = names if names is not None else GENERATION_ORDER
+    tables: Dict[str, bytes] = {}
+    for name in GENERATION_ORDER:
+        required = name in names or (name in ('KQK', 'KRK') and 'KPK' in names)
+        if not required:
+            continue
+        path = table_path(directory, name)
+        if name not in names and os.path.exists(path):
+            with open(path, 'rb') as file:
+                tables[name] = file.read()
+            continue
+        start = time.perf_counter()
+        values = generate_table(name, tables)
+        with open(path, 'wb') as file:
+            file.write(values)
+        tables[name] = bytes(values)
+        wins = sum(1 for value in values if value != DRAW and value != ILLEGAL)
+        print(f'{name}: {len(values)} positions, {wins} decided, max distance {max(values.translate(_NO_ILLEGAL)) - 1} '
+              f'plies, time {time.perf_counter() - start:.1f} s')
+
+
+# prevod hodnot pro vypis nejdelsi vzdalenosti do matu (nelegalni pozice se nepocitaji)
+_NO_ILLEGAL = bytes(range(255)) + bytes([DRAW])
+
+
+class EndgameTables:
+    """
+    Tabulky koncovek namapovane do pameti (mmap). Nactou se vsechny tabulky, ktere v adresari existuji.
+    """
+    def __init__(self, directory: str = ENDGAME_DIR) -> None:
+        self.tables: Dict[Tuple[int, ...], Tuple[TableLayout, mmap.mmap]] = {}
+        self._files = []
+        for name, codes in TABLES.items():
+            path = table_path(directory, name)
+            layout = TableLayout(codes)
+            if not os.path.exists(path) or os.path.getsize(path) != layout.size:
+                continue
+            file = open(path, 'rb')
+            self._files.append(file)
+            self.tables[tuple(sorted(codes))] = (layout, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        # nejvyssi pocet figur vcetne kralu, pro ktery muze existovat tabulka (rychle vylouceni ostatnich pozic)
+        self.max_pieces: int = max((len(codes) + 2 for codes in self.tables), default=0)
+
+    def close(self) -> None:
+        for _, data in self.tables.values():
+            data.close()
+        for file in self._files:
+            file.close()
+        self.tables = {}
+        self.max_pieces = 0
+
+    def probe(self, game: ChessGame) -> Union[Tuple[int, int], None]:
+        """
+        Metoda najde pozici v tabulkach.
+        :param game: objekt partie
+        :return: None, pokud pozice v tabulkach neni, jinak (vysledek, vzdalenost do matu v pultazich) - vysledek
+            je 1 (hrac na tahu vyhraje), 0 (remiza) nebo -1 (hrac na tahu prohraje)
+        """
+        counts = game.piece_counts
+        if counts[0] + counts[1] > self.max_pieces or game.castling_rights:
+            return None
+        # slabsi strana ma jen krale
+        if counts[0] > 1 and counts[1] > 1 or counts[0] + counts[1] == 2:
+            return None
+        strong = 0 if counts[0] > 1 else 1
+        sign = 1 if strong == 0 else -1
+        kings = (game.white_king_square, game.black_king_square)
+        pieces = [(code, sq) for code in (PAWN_CODE, KNIGHT_CODE, BISHOP_CODE, ROOK_CODE, QUEEN_CODE)
+                  for sq in game.piece_squares[sign * code]]
+        table = self.tables.get(tuple(sorted(code for code, _ in pieces)))
+        if table is None:
+            return None
+        layout, data = table
+        # figury v poradi tabulky, u cerne silnejsi strany se pozice zrcadli podle vodorovne osy
+        pieces.sort(key=lambda piece: layout.codes.index(piece[0]))
+        if strong == 0:
+            to_table = _to_table_square
+        else:
+            to_table = _to_table_square_mirrored
+        stm = WHITE if game.white_to_move == (strong == 0) else BLACK
+        value = data[layout.index(stm, to_table(kings[strong]), to_table(kings[1 - strong]),
+                                  tuple(to_table(sq) for _, sq in pieces))]
+        if value == ILLEGAL:
+            return None
+        if value == DRAW:
+            return 0, 0
+        return 1 if stm == WHITE else -1, value - 1
+
+
+def _to_table_square(sq: int) -> int:
+    return (7 - (sq >> 4)) * 8 + (sq & 7)
+
+
+def _to_table_square_mirrored(sq: int) -> int:
+    return (sq >> 4) * 8 + (sq & 7)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Tabulky koncovek - generovani a vypis hodnoty pozice.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    generate_parser = subparsers.add_parser('generate', help='vygenerovat tabulky')
+    generate_parser.add_argument('names', nargs='*', help=f'nazvy tabulek {", ".join(GENERATION_ORDER)} (vychozi '
+                                 'vsechny)')
+    generate_parser.add_argument('--dir', default=ENDGAME_DIR, help='adresar tabulek')
+    probe_parser = subparsers.add_parser('probe', help='vypsat hodnotu pozice')
+    probe_parser.add_argument('--fen', default=STARTING_FEN, help='pozice ve FEN notaci')
+    probe_parser.add_argument('--dir', default=ENDGAME_DIR, help='adresar tabulek')
+    args = parser.parse_args()
+    if args.command == 'generate':
+        for name in args.names:
+            if name not in TABLES:
+                raise Exception(f'Invalid table: {name}')
+        generate_tables(args.dir, args.names or None)
+    else:
+        tables = EndgameTables(args.dir)
+        try:
+            result = tables.probe(ChessGame(args.fen))
+            if result is None:
+                print('not in tables')
+            elif result[0] == 0:
+                print('draw')
+            else:
+                print(f'{"win" if result[0] > 0 else "loss"} in {result[1]} plies')
+        finally:
+            tables.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,68 +1,170 @@
-from typing import List, Tuple, Union
-from rules import Move, PieceType, ChessGame, Color, Piece
+from typing import List, Union, Iterator, Protocol, Callable
+from array import array
+from rules import Move, PieceType, ChessGame, GameResult, STARTING_FEN, Piece, PIECES, BOARD_SQUARES, \
+    PIECE_TYPE_CODES, PAWN_CODE, MOVE_TO_SHIFT, MOVE_PROMOTION_SHIFT, MOVE_CAPTURE, MOVE_ENPASSANT, MAX_MOVES, \
+    FIFTY_MOVE_RULE_PLIES, EMPTY, to_row_col, new_move_buffer
+from transposition import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+from stats import SearchStats
+from endgame import EndgameTables
+from psqt import PIECE_VALUES, pawn_table, knights_table, bishops_table, rooks_table, queens_table, kings_table
+import argparse
+import copy
 import random
+import threading
+import time
 
-piece_score = {PieceType.KING: 0, PieceType.QUEEN: 900, PieceType.ROOK: 500, PieceType.BISHOP: 320, PieceType.KNIGHT: 310,
-               PieceType.PAWN: 100}
+piece_score = {piece_type: PIECE_VALUES[code] for piece_type, code in PIECE_TYPE_CODES.items()}
 CHECKMATE = 10000
 STALEMATE = 0
-MAX_DEPTH = 3
-
-pawn_table = [
-    0, 0, 0, 0, 0, 0, 0, 0,
-    5, 10, 10, -20, -20, 10, 10, 5,
-    5, -5, -10, 0, 0, -10, -5, 5,
-    0, 0, 0, 20, 20, 0, 0, 0,
-    5, 5, 10, 25, 25, 10, 5, 5,
-    10, 10, 20, 30, 30, 20, 10, 10,
-    50, 50, 50, 50, 50, 50, 50, 50,
-    0, 0, 0, 0, 0, 0, 0, 0]
-
-knights_table = [
-    -50, -40, -30, -30, -30, -30, -40, -50,
-    -40, -20, 0, 5, 5, 0, -20, -40,
-    -30, 5, 10, 15, 15, 10, 5, -30,
-    -30, 0, 15, 20, 20, 15, 0, -30,
-    -30, 5, 15, 20, 20, 15, 5, -30,
-    -30, 0, 10, 15, 15, 10, 0, -30,
-    -40, -20, 0, 0, 0, 0, -20, -40,
-    -50, -40, -30, -30, -30, -30, -40, -50]
-bishops_table = [
-    -20, -10, -10, -10, -10, -10, -10, -20,
-    -10, 5, 0, 0, 0, 0, 5, -10,
-    -10, 10, 10, 10, 10, 10, 10, -10,
-    -10, 0, 10, 10, 10, 10, 0, -10,
-    -10, 5, 5, 10, 10, 5, 5, -10,
-    -10, 0, 5, 10, 10, 5, 0, -10,
-    -10, 0, 0, 0, 0, 0, 0, -10,
-    -20, -10, -10, -10, -10, -10, -10, -20]
-rooks_table = [
-    0, 0, 0, 5, 5, 0, 0, 0,
-    -5, 0, 0, 0, 0, 0, 0, -5,
-    -5, 0, 0, 0, 0, 0, 0, -5,
-    -5, 0, 0, 0, 0, 0, 0, -5,
-    -5, 0, 0, 0, 0, 0, 0, -5,
-    -5, 0, 0, 0, 0, 0, 0, -5,
-    5, 10, 10, 10, 10, 10, 10, 5,
-    0, 0, 0, 0, 0, 0, 0, 0]
-queens_table = [
-    -20, -10, -10, -5, -5, -10, -10, -20,
-    -10, 0, 0, 0, 0, 0, 0, -10,
-    -10, 5, 5, 5, 5, 5, 0, -10,
-    0, 0, 5, 5, 5, 5, 0, -5,
-    -5, 0, 5, 5, 5, 5, 0, -5,
-    -10, 0, 5, 5, 5, 5, 0, -10,
-    -10, 0, 0, 0, 0, 0, 0, -10,
-    -20, -10, -10, -5, -5, -10, -10, -20]
-kings_table = [
-    20, 30, 10, 0, 0, 10, 30, 20,
-    20, 20, 0, 0, 0, 0, 20, 20,
-    -10, -20, -20, -20, -20, -20, -20, -10,
-    -20, -30, -30, -40, -40, -30, -30, -20,
-    -30, -40, -40, -50, -50, -40, -40, -30,
-    -30, -40, -40, -50, -50, -40, -40, -30,
-    -30, -40, -40, -50, -50, -40, -40, -30,
-    -30, -40, -40, -50, -50, -40, -40, -30]
+INFINITY = CHECKMATE + 1
+DEFAULT_DEPTH = 3
+MAX_PLY = 64
+# skore od MATE_BOUND vys je skore matu - mat z tabulek koncovek muze byt i dal nez MAX_PLY pultahu od korene
+MATE_BOUND = CHECKMATE - 4 * MAX_PLY
+# rezerva pro delta pruning v quiescence search - brani, ktere ani s touto rezervou nezlepsi alfu, nezkousime
+DELTA_MARGIN = 200
+TT_SIZE_MB = 16
+# po kolika uzlech hledani kontroluje, zda ma skoncit (casovy limit, limit uzlu, stop_event)
+STOP_CHECK_INTERVAL = 256
+# kontrola prubezne pocitaneho hodnoceni proti hodnoceni spocitanemu od zacatku (pouze pro ladeni, je pomala)
+DEBUG_EVALUATION = False
+
+# hodnota figury podle jejiho kodu (bez ohledu na barvu) pro MVV-LVA razeni tahu
+_piece_values_by_code: List[int] = [0] * 7
+for _piece_type, _code in PIECE_TYPE_CODES.items():
+    _piece_values_by_code[_code] = piece_score[_piece_type]
+
+
+class StopEvent(Protocol):
+    """
+    Udalost pro preruseni hledani - staci metoda is_set() (splnuje threading.Event i multiprocessing.Event).
+    """
+    def is_set(self) -> bool:
+        ...
+
+
+class SearchLimits:
+    """
+    Limity hledani krome maximalni hloubky. Mekky casovy limit se kontroluje jen mezi iteracemi (po jeho vyprseni
+    se nezacne dalsi hloubka), tvrdy casovy limit a limit uzlu preruseni i rozpracovanou iteraci. None znamena bez
+    limitu.
+    """
+    def __init__(self, soft_time: Union[float, None] = None, hard_time: Union[float, None] = None,
+                 nodes: Union[int, None] = None) -> None:
+        """
+        :param soft_time: cas v sekundach, po kterem se nezacne dalsi iterace
+        :param hard_time: cas v sekundach, po kterem se hledani prerusi
+        :param nodes: pocet uzlu, po kterem se hledani prerusi
+        """
+        self.soft_time = soft_time
+        self.hard_time = hard_time
+        self.nodes = nodes
+
+
+class MoveOrderer:
+    """
+    Razeni tahu pred hledanim. Alfa-beta orezava tim vic, cim drive zkusi nejlepsi tah, proto tahy radime v poradi:
+    tah z transpozicni tabulky, brani podle MVV-LVA (nejcennejsi obet, nejlevnejsi utocnik), promeny pesce, dva
+    killer tahy daneho pultahu (tiche tahy, ktere jinde na stejne urovni zpusobily beta rez) a nakonec tabulka
+    historie (jak casto tichy tah zpusobil beta rez kdekoliv ve stromu). Tahy se porovnavaji podle kodu tahu.
+    """
+    HASH_MOVE_SCORE = 1000000
+    CAPTURE_SCORE = 100000
+    PROMOTION_SCORE = 90000
+    KILLER_SCORES = (80000, 70000)
+    HISTORY_LIMIT = 60000
+
+    def __init__(self) -> None:
+        self.killers: List[List[int]] = [[0, 0] for _ in range(MAX_PLY + 1)]
+        # historie se indexuje kodem tahnouci figury a cilovym polem 0x88 sachovnice
+        self.history: List[List[int]] = [[0] * 128 for _ in range(len(PIECES))]
+
+    def new_search(self) -> None:
+        """
+        Metoda se vola pred kazdym hledanim. Tabulky mezi tahy pocitace nemazeme, jen historii zeslabime, aby se
+        prizpusobila nove pozici.
+        """
+        for row in self.history:
+            for i in range(len(row)):
+                row[i] >>= 1
+
+    def score_moves(self, squares: array, moves: array, scores: array, count: int, ply: int, hash_move: int) -> None:
+        """
+        Metoda ohodnoti tahy v bufferu, vyssi skore znamena nadejnejsi tah.
+        :param squares: pole sachovnice pred provedenim tahu
+        :param moves: buffer s kody tahu
+        :param scores: buffer, do ktereho se zapise skore tahu na stejny index
+        :param count: pocet tahu v bufferu
+        :param ply: vzdalenost od korene hledani (pro killer tahy)
+        :param hash_move: kod nejlepsiho tahu z transpozicni tabulky (0, pokud neni)
+        """
+        killer_0, killer_1 = self.killers[ply]
+        history = self.history
+        for i in range(count):
+            code = moves[i]
+            if code == hash_move:
+                score = self.HASH_MOVE_SCORE
+            elif code & MOVE_CAPTURE:
+                # pri brani mimochodem stoji na cilovem poli prazdno, bere se pesec
+                victim = PAWN_CODE if code & MOVE_ENPASSANT else abs(squares[(code >> MOVE_TO_SHIFT) & 0x7F])
+                score = self.CAPTURE_SCORE + 10 * _piece_values_by_code[victim] - \
+                    _piece_values_by_code[abs(squares[code & 0x7F])] // 10
+            elif code >> MOVE_PROMOTION_SHIFT & 7:
+                score = self.PROMOTION_SCORE + _piece_values_by_code[code >> MOVE_PROMOTION_SHIFT & 7]
+            elif code == killer_0:
+                score = self.KILLER_SCORES[0]
+            elif code == killer_1:
+                score = self.KILLER_SCORES[1]
+            else:
+                score = history[squares[code & 0x7F]][(code >> MOVE_TO_SHIFT) & 0x7F]
+            scores[i] = score
+
+    def order_moves(self, squares: array, moves: List[Move], ply: int, hash_move: int) -> List[Move]:
+        """
+        Metoda seradi list objektu tahu od nejnadejnejsiho (pro hledani mimo buffery, viz find_best_move()).
+        :param squares: pole sachovnice pred provedenim tahu
+        :param moves: tahy k serazeni
+        :param ply: vzdalenost od korene hledani (pro killer tahy)
+        :param hash_move: kod nejlepsiho tahu z transpozicni tabulky (0, pokud neni)
+        :return: serazeny list tahu
+        """
+        codes = array('i', [move.code for move in moves])
+        scores = array('i', bytes(4 * len(moves)))
+        self.score_moves(squares, codes, scores, len(moves), ply, hash_move)
+        return [moves[i] for i in sorted(range(len(moves)), key=scores.__getitem__, reverse=True)]
+
+    def record_cutoff(self, code: int, moved: int, depth: int, ply: int) -> None:
+        """
+        Metoda si zapamatuje tichy tah, ktery zpusobil beta rez.
+        :param code: kod tahu
+        :param moved: kod tahnouci figury
+        :param depth: zbyvajici hloubka (hlubsi rezy maji vetsi vahu)
+        :param ply: vzdalenost od korene hledani
+        """
+        if code & MOVE_CAPTURE or code >> MOVE_PROMOTION_SHIFT & 7:
+            return
+        killers = self.killers[ply]
+        if killers[0] != code:
+            killers[1] = killers[0]
+            killers[0] = code
+        row = self.history[moved]
+        end_sq = (code >> MOVE_TO_SHIFT) & 0x7F
+        row[end_sq] += depth * depth
+        if row[end_sq] > self.HISTORY_LIMIT:
+            # historie nesmi prerust killer tahy, proto pri preteceni vsechno zmensime
+            for history_row in self.history:
+                for i in range(len(history_row)):
+                    history_row[i] >>= 1
+
+
+# transpozicni tabulka a tabulky pro razeni tahu se sdili mezi tahy pocitace, vysledky z predchoziho tahu tak muzeme
+# vyuzit
+transposition_table = TranspositionTable(TT_SIZE_MB)
+move_orderer = MoveOrderer()
+# statistiky hledani, standardne vypnute (zapnout lze search_stats.enabled = True nebo parametrem --stats)
+search_stats = SearchStats()
+# tabulky koncovek (viz endgame.py), nactou se ty, ktere jsou vygenerovane
+endgame_tables = EndgameTables()
 
 
 def find_random_move(valid_moves: List[Move]) -> Move:
@@ -72,100 +174,512 @@ def find_random_move(valid_moves: List[Move]) -> Move:
 def find_best_move(game: ChessGame, valid_moves: List[Move]) -> Move:
     turn_multiplier = 1 if game.white_to_move else -1
     opponent_min_max_score: int = CHECKMATE
-    random.shuffle(valid_moves)
+    valid_moves = move_orderer.order_moves(game.squares, valid_moves, 0, 0)
     best_move: Union[Move, None] = None
     for player_move in valid_moves:
         game.do_move(player_move)
         opponent_moves = game.generate_legal_moves()
-        if game.game_result is not None and game.game_result.STALEMATE:
+        if not opponent_moves:
+            # mat nebo pat, vysledek zrusi undo_move()
+            game.check_end_result()
+        if game.game_result == GameResult.STALEMATE:
             opponent_max_score = STALEMATE
-        elif game.game_result is not None and (game.game_result.WHITE_WIN or game.game_result.BLACK_WIN):
+        elif game.game_result in (GameResult.WHITE_WIN, GameResult.BLACK_WIN):
             opponent_max_score = -CHECKMATE
         else:
             opponent_max_score = -CHECKMATE
             for opponent_move in opponent_moves:
                 game.do_move(opponent_move)
-                if game.game_result is not None and game.game_result.STALEMATE:
+                if game.game_result == GameResult.STALEMATE:
                     score = STALEMATE
-                elif game.game_result is not None and (game.game_result.WHITE_WIN or game.game_result.BLACK_WIN):
+                elif game.game_result in (GameResult.WHITE_WIN, GameResult.BLACK_WIN):
                     score = CHECKMATE
                 else:
-                    score = -turn_multiplier * _get_naive_position_evaluation(game)
+                    score = -turn_multiplier * _get_position_evaluation(game)
                 if score > opponent_max_score:
                     opponent_max_score = score
                 game.undo_move()
         if opponent_max_score < opponent_min_max_score:
             opponent_min_max_score = opponent_max_score
             best_move = player_move
-            print(f'Move: {player_move.san}, score: {opponent_min_max_score}')
         game.undo_move()
     return best_move
 
 
-def find_best_move_min_max(game: ChessGame, valid_moves: List[Move]) -> Union[Move, None]:
-    global best_move
-    best_move = None
-    find_move_min_max(game, valid_moves, MAX_DEPTH, game.white_to_move)
-    return best_move
+def find_best_move_min_max(game: ChessGame, valid_moves: List[Move], depth: int = DEFAULT_DEPTH,
+                           limits: Union[SearchLimits, None] = None) -> Union[Move, None]:
+    """
+    Funkce najde nejlepsi tah pomoci hledani Search do zadane hloubky.
+    :param game: objekt partie
+    :param valid_moves: legalni tahy hrace na tahu
+    :param depth: hloubka hledani v pultazich
+    :param limits: volitelne casove limity a limit uzlu
+    :return: nejlepsi tah nebo None, pokud hrac nema zadny legalni tah
+    """
+    return Search(game, depth, limits=limits).search(valid_moves).best_move
+
+
+class SearchResult:
+    """
+    Vysledek hledani - nejlepsi tah, jeho skore z pohledu hrace na tahu a hlavni varianta (principal variation).
+    """
+    def __init__(self, best_move: Union[Move, None], score: int, pv: List[Move], depth: int, nodes: int,
+                 stats: Union[SearchStats, None] = None, elapsed: float = 0.0) -> None:
+        self.best_move = best_move
+        self.score = score
+        self.pv = pv
+        self.depth = depth
+        self.nodes = nodes
+        # statistiky hledani, pokud byly zapnute
+        self.stats = stats
+        # cas od zacatku hledani v sekundach
+        self.elapsed = elapsed
+
+    @property
+    def nps(self) -> int:
+        return int(self.nodes / self.elapsed) if self.elapsed > 0 else 0
+
+    def __str__(self) -> str:
+        return f'depth: {self.depth}, score: {self.score}, nodes: {self.nodes}, pv: {" ".join(str(m) for m in self.pv)}'
+
+
+def _ordered_moves(moves: array, scores: array, count: int) -> Iterator[int]:
+    """
+    Generator vraci kody tahu od nejvyssiho skore. Prvni tah (casto tah z transpozicni tabulky, ktery sam zpusobi
+    beta rez) najdeme jednim pruchodem, zbytek radime az ve chvili, kdy je potreba.
+    """
+    if count == 0:
+        return
+    first = max(range(count), key=scores.__getitem__)
+    yield moves[first]
+    for i in sorted(range(count), key=scores.__getitem__, reverse=True):
+        if i != first:
+            yield moves[i]
+
+
+class Search:
+    """
+    Hledani nejlepsiho tahu algoritmem negamax s alfa-beta orezavanim a iterativnim prohlubovanim. Veskery stav
+    hledani je v objektu, takze muze bezet vice hledani zaroven (kazde nad vlastni partii). Tahy se generuji jako
+    kody do bufferu predem alokovanych pro kazdy pultah, objekty Move se vytvari az pro vysledek.
+    """
+    def __init__(self, game: ChessGame, depth: int = DEFAULT_DEPTH,
+                 tt: Union[TranspositionTable, None] = None, orderer: Union[MoveOrderer, None] = None,
+                 stats: Union[SearchStats, None] = None, stop_event: Union[StopEvent, None] = None,
+                 limits: Union[SearchLimits, None] = None,
+                 on_iteration: Union[Callable[[SearchResult], None], None] = None) -> None:
+        """
+        :param game: objekt partie, nad kterym se hleda (tahy se provadeji a vraceji primo v nem)
+        :param depth: maximalni hloubka hledani v pultazich
+        :param tt: transpozicni tabulka, vychozi je sdilena tabulka modulu
+        :param orderer: razeni tahu, vychozi je sdilene razeni modulu
+        :param stats: statistiky hledani, vychozi jsou sdilene statistiky modulu (sbiraji se jen, pokud jsou zapnute)
+        :param stop_event: volitelna udalost (threading.Event, multiprocessing.Event), po jejimz nastaveni hledani
+            skonci a vrati vysledek posledni dokoncene iterace
+        :param limits: casove limity a limit uzlu, vychozi je hledani bez limitu
+        :param on_iteration: volitelna funkce, ktera dostane vysledek kazde dokoncene iterace (napr. pro vypis
+            prubehu hledani)
+        """
+        self.game = game
+        self.depth = depth
+        self.tt = tt if tt is not None else transposition_table
+        self.orderer = orderer if orderer is not None else move_orderer
+        self.stats = stats if stats is not None else search_stats
+        self.stop_event = stop_event
+        self.limits = limits if limits is not None else SearchLimits()
+        self.on_iteration = on_iteration
+        # hledani bylo preruseno, rozpracovana iterace se zahodi
+        self.stopped = False
+        # pocet uzlu, pri kterem se znovu zkontroluje, zda hledani nema skoncit (viz _check_stop())
+        self._next_stop_check = 0
+        self._start_time = 0.0
+        # statistiky, do kterych prave probihajici hledani zapisuje (None, pokud jsou vypnute)
+        self._stats: Union[SearchStats, None] = None
+        self.nodes = 0
+        # buffery pro kody tahu a jejich skore pro kazdy pultah, pouzivaji se opakovane po celou dobu hledani
+        self.move_buffers: List[array] = [new_move_buffer() for _ in range(MAX_PLY + 1)]
+        self.score_buffers: List[array] = [array('i', bytes(4 * MAX_MOVES)) for _ in range(MAX_PLY + 1)]
+        # pocet tahu v koreni (tahy korene se do bufferu zapisuji jednou pred iterativnim prohlubovanim)
+        self.root_count = 0
+        # tabulky koncovek, ve kterych se hledaji pozice s malo figurami (None - nepouzivaji se)
+        self.endgame_tables: Union[EndgameTables, None] = endgame_tables
+        # trojuhelnikova tabulka hlavnich variant - pv[ply] je nejlepsi pokracovani od daneho pultahu (kody tahu)
+        self.pv: List[List[int]] = [[] for _ in range(MAX_PLY + 1)]
+
+    def search(self, valid_moves: Union[List[Move], None] = None) -> SearchResult:
+        """
+        Metoda postupne prohledava hloubky 1 az self.depth. Kazda iterace naplni transpozicni tabulku, takze dalsi
+        iterace zkousi nejlepsi tahy jako prvni a orezava vic. Hledani muze skoncit drive podle self.limits nebo
+        self.stop_event, rozpracovana iterace se pak zahodi.
+        :param valid_moves: legalni tahy v koreni (pokud je nezadame, vygeneruji se)
+        :return: vysledek posledni dokoncene iterace (pokud se nedokoncila ani prvni, prvni legalni tah s hloubkou 0)
+        """
+        if valid_moves is None:
+            valid_moves = self.game.generate_legal_moves()
+        self.tt.new_search()
+        self.orderer.new_search()
+        self.nodes = 0
+        self.stopped = False
+        self._next_stop_check = 0
+        self._start_time = time.perf_counter()
+        self._stats = self.stats if self.stats.enabled else None
+        if self._stats is not None:
+            self._stats.reset()
+        result = SearchResult(None, 0, [], 0, 0, self._stats)
+        if len(valid_moves) == 0:
+            return result
+        result = SearchResult(valid_moves[0], 0, [valid_moves[0]], 0, 0, self._stats)
+        root_moves = self.move_buffers[0]
+        for i, move in enumerate(valid_moves):
+            root_moves[i] = move.code
+        self.root_count = len(valid_moves)
+        for depth in range(1, self.depth + 1):
+            score = self._negamax(depth, 0, -INFINITY, INFINITY)
+            if self.stopped:
+                break
+            pv = moves_from_codes(self.game, self.pv[0])
+            # jako nejlepsi tah vracime objekt ze vstupniho listu (ma vyplnenou notaci)
+            best_move = next(move for move in valid_moves if move.code == self.pv[0][0])
+            elapsed = time.perf_counter() - self._start_time
+            result = SearchResult(best_move, score, pv, depth, self.nodes, self._stats, elapsed)
+            if self._stats is not None:
+                self._stats.depth = depth
+            if self.on_iteration is not None:
+                self.on_iteration(result)
+            if abs(score) >= MATE_BOUND:
+                # nasli jsme mat, hlubsi hledani uz nic nezmeni
+                break
+            if self.limits.soft_time is not None and elapsed >= self.limits.soft_time:
+                break
+        result.nodes = self.nodes
+        result.elapsed = time.perf_counter() - self._start_time
+        if self._stats is not None:
+            self._stats.stop()
+        return result
 
+    def _check_stop(self) -> None:
+        """
+        Metoda zjisti, zda ma hledani skoncit (tvrdy casovy limit, limit uzlu nebo nastaveny stop_event), a nastavi
+        self.stopped. Vola se z _negamax() a _quiescence() jednou za STOP_CHECK_INTERVAL uzlu.
+        """
+        limits = self.limits
+        self._next_stop_check = self.nodes + STOP_CHECK_INTERVAL
+        if limits.nodes is not None:
+            self._next_stop_check = min(self._next_stop_check, limits.nodes)
+            if self.nodes >= limits.nodes:
+                self.stopped = True
+        if limits.hard_time is not None and time.perf_counter() - self._start_time >= limits.hard_time:
+            self.stopped = True
+        if self.stop_event is not None and self.stop_event.is_set():
+            self.stopped = True
 
-def find_move_min_max(game: ChessGame, valid_moves: List[Move], depth: int, white_to_move: bool) -> int:
-    global best_move
-    if depth == 0:
-        return _get_naive_position_evaluation(game)
-
-    if white_to_move:
-        max_score = -CHECKMATE
-        for valid_move in valid_moves:
-            game.do_move(valid_move)
-            next_moves = game.generate_legal_moves()
-            score = find_move_min_max(game, next_moves, depth - 1, False)
-            if score > max_score:
-                max_score = score
-                if depth == MAX_DEPTH:
-                    best_move = valid_move
-            game.undo_move()
-        return max_score
-    else:
-        min_score = CHECKMATE
-        for valid_move in valid_moves:
-            game.do_move(valid_move)
-            next_moves = game.generate_legal_moves()
-            score = find_move_min_max(game, next_moves, depth - 1, True)
-            if score < min_score:
-                min_score = score
-                if depth == MAX_DEPTH:
-                    best_move = valid_move
-            game.undo_move()
-        return min_score
+    def _negamax(self, depth: int, ply: int, alpha: int, beta: int) -> int:
+        """
+        Metoda vraci skore pozice z pohledu hrace na tahu.
+        :param depth: zbyvajici hloubka
+        :param ply: vzdalenost od korene
+        :param alpha: dolni mez okna
+        :param beta: horni mez okna
+        :return: skore pozice
+        """
+        game = self.game
+        self.pv[ply] = []
+        if ply > 0 and (game.is_repetition() or game.halfmove_clock >= FIFTY_MOVE_RULE_PLIES):
+            # opakovani pozice hodnotime jako remizu hned, nema smysl prohledavat tahy sem a tam
+            return STALEMATE
+        if ply > 0 and self.endgame_tables is not None:
+            table_result = self.endgame_tables.probe(game)
+            if table_result is not None:
+                # presny vysledek z tabulky koncovek, mat v tabulce je vzdalenost od teto pozice
+                result, distance = table_result
+                return result * (CHECKMATE - ply - distance)
+        if depth == 0 or ply >= MAX_PLY:
+            return self._quiescence(ply, alpha, beta)
+        if self.nodes >= self._next_stop_check:
+            self._check_stop()
+        if self.stopped:
+            return 0
+        self.nodes += 1
+        stats = self._stats
+        if stats is not None:
+            stats.nodes += 1
+            stats.tt_probes += 1
 
+        key = game.zobrist_key
+        entry = self.tt.probe(key)
+        hash_move = 0
+        if entry is not None:
+            if stats is not None:
+                stats.tt_hits += 1
+            hash_move, entry_depth, flag, entry_score = entry
+            if ply > 0 and entry_depth >= depth:
+                entry_score = _score_from_tt(entry_score, ply)
+                if flag == EXACT or (flag == LOWER_BOUND and entry_score >= beta) or \
+                        (flag == UPPER_BOUND and entry_score <= alpha):
+                    return entry_score
 
+        # tahy generujeme az tady, aby se pri zasahu v transpozicni tabulce vubec negenerovaly
+        moves = self.move_buffers[ply]
+        if stats is not None:
+            start = time.perf_counter()
+            count = self.root_count if ply == 0 else game.generate_moves(moves)
+            stats.move_generation_time += time.perf_counter() - start
+        else:
+            count = self.root_count if ply == 0 else game.generate_moves(moves)
+        if count == 0:
+            # mat (cim blize ke koreni, tim lepsi pro soupere) nebo pat
+            return -CHECKMATE + ply if game.in_check else STALEMATE
+        scores = self.score_buffers[ply]
+        squares = game.squares
+        self.orderer.score_moves(squares, moves, scores, count, ply, hash_move)
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = 0
+        for i, code in enumerate(_ordered_moves(moves, scores, count)):
+            if stats is not None:
+                score = -self._search_move_timed(stats, code, depth - 1, ply + 1, -beta, -alpha)
+            else:
+                game.make_move(code)
+                score = -self._negamax(depth - 1, ply + 1, -beta, -alpha)
+                game.unmake_move()
+            if self.stopped:
+                # skore preruseneho hledani neplati, nic neukladame
+                return 0
+            if score > best_score:
+                best_score = score
+                best_move = code
+                if score > alpha:
+                    alpha = score
+                    self.pv[ply] = [code] + self.pv[ply + 1]
+                    if alpha >= beta:
+                        self.orderer.record_cutoff(code, squares[code & 0x7F], depth, ply)
+                        if stats is not None:
+                            stats.beta_cutoffs += 1
+                            stats.first_move_cutoffs += i == 0
+                        break
+
+        if best_score <= original_alpha:
+            flag = UPPER_BOUND
+        elif best_score >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.tt.store(key, best_move, depth, flag, _score_to_tt(best_score, ply))
+        return best_score
+
+    def _quiescence(self, ply: int, alpha: int, beta: int) -> int:
+        """
+        Metoda na horizontu hledani dohrava brani a promeny pesce, aby se pozice nehodnotila uprostred vymeny.
+        Hrac na tahu muze vzdy zustat u statickeho hodnoceni (stand pat), pokud neni v sachu. V sachu zkousime
+        vsechny uniky ze sachu.
+        :param ply: vzdalenost od korene
+        :param alpha: dolni mez okna
+        :param beta: horni mez okna
+        :return: skore pozice z pohledu hrace na tahu
+        """
+        game = self.game
+        if self.nodes >= self._next_stop_check:
+            self._check_stop()
+        if self.stopped:
+            return 0
+        self.nodes += 1
+        stats = self._stats
+        if stats is not None:
+            stats.quiescence_nodes += 1
+            stats.evaluations += 1
+            start = time.perf_counter()
+            stand_pat = _get_position_evaluation(game) if game.white_to_move else -_get_position_evaluation(game)
+            stats.evaluation_time += time.perf_counter() - start
+        else:
+            stand_pat = _get_position_evaluation(game) if game.white_to_move else -_get_position_evaluation(game)
+        if ply >= MAX_PLY:
+            return stand_pat
+        moves = self.move_buffers[ply]
+        if stats is not None:
+            start = time.perf_counter()
+            count = game.generate_moves(moves, captures_only=True)
+            stats.move_generation_time += time.perf_counter() - start
+        else:
+            count = game.generate_moves(moves, captures_only=True)
+        in_check = game.in_check
+        if in_check:
+            if count == 0:
+                return -CHECKMATE + ply
+            best_score = -INFINITY
+        else:
+            if stand_pat >= beta:
+                return stand_pat
+            if stand_pat > alpha:
+                alpha = stand_pat
+            best_score = stand_pat
+
+        scores = self.score_buffers[ply]
+        squares = game.squares
+        self.orderer.score_moves(squares, moves, scores, count, ply, 0)
+        for i, code in enumerate(_ordered_moves(moves, scores, count)):
+            # delta pruning - brani, ktere nezlepsi alfu ani s rezervou, nema smysl zkouset
+            if not in_check and not code >> MOVE_PROMOTION_SHIFT & 7:
+                victim = PAWN_CODE if code & MOVE_ENPASSANT else abs(squares[(code >> MOVE_TO_SHIFT) & 0x7F])
+                if stand_pat + _piece_values_by_code[victim] + DELTA_MARGIN <= alpha:
+                    continue
+            if stats is not None:
+                score = -self._search_move_timed(stats, code, 0, ply + 1, -beta, -alpha, quiescence=True)
+            else:
+                game.make_move(code)
+                score = -self._quiescence(ply + 1, -beta, -alpha)
+                game.unmake_move()
+            if self.stopped:
+                return 0
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if stats is not None:
+                            stats.beta_cutoffs += 1
+                            stats.first_move_cutoffs += i == 0
+                        break
+        return best_score
+
+    def _search_move_timed(self, stats: SearchStats, code: int, depth: int, ply: int, alpha: int, beta: int,
+                           quiescence: bool = False) -> int:
+        """
+        Metoda provede tah, prohleda pozici po tahu a tah vrati, pritom meri cas provedeni a vraceni tahu. Pouziva se
+        misto primeho volani jen se zapnutymi statistikami, aby mereni nezpomalovalo bezne hledani.
+        :param depth: zbyvajici hloubka po tahu
+        :param quiescence: pozici po tahu prohledat pomoci _quiescence() misto _negamax()
+        :return: skore pozice po tahu z pohledu soupere
+        """
+        game = self.game
+        start = time.perf_counter()
+        game.make_move(code)
+        stats.make_unmake_time += time.perf_counter() - start
+        score = self._quiescence(ply, alpha, beta) if quiescence else self._negamax(depth, ply, alpha, beta)
+        start = time.perf_counter()
+        game.unmake_move()
+        stats.make_unmake_time += time.perf_counter() - start
+        return score
+
+
+class SearchThread(threading.Thread):
+    """
+    Hledani ve vlastnim vlakne nad kopii partie, aby volajici (napr. smycka UI) mohl dal bezet a kdykoliv hledani
+    zastavit. Vysledek je v self.result, jakmile vlakno skonci, prubezny vysledek posledni dokoncene iterace
+    v self.progress.
+    """
+    def __init__(self, game: ChessGame, depth: int = DEFAULT_DEPTH, limits: Union[SearchLimits, None] = None,
+                 on_iteration: Union[Callable[[SearchResult], None], None] = None) -> None:
+        """
+        :param game: objekt partie, hleda se nad jeho kopii (puvodni partii lze mezitim menit)
+        :param depth: maximalni hloubka hledani v pultazich
+        :param limits: volitelne casove limity a limit uzlu
+        :param on_iteration: volitelna funkce volana po kazde iteraci (z vlakna hledani)
+        """
+        super().__init__(daemon=True)
+        self.stop_event = threading.Event()
+        self.on_iteration = on_iteration
+        self.result: Union[SearchResult, None] = None
+        self.progress: Union[SearchResult, None] = None
+        self._search = Search(copy.deepcopy(game), depth, stop_event=self.stop_event, limits=limits,
+                              on_iteration=self._on_iteration)
+
+    def run(self) -> None:
+        self.result = self._search.search()
+
+    def stop(self) -> None:
+        """
+        Metoda prerusi hledani a pocka na konec vlakna.
+        """
+        self.stop_event.set()
+        if self.is_alive():
+            self.join()
+
+    def _on_iteration(self, result: SearchResult) -> None:
+        self.progress = result
+        if self.on_iteration is not None:
+            self.on_iteration(result)
+
+
+def moves_from_codes(game: ChessGame, codes: List[int]) -> List[Move]:
+    """
+    Funkce prevede posloupnost kodu tahu (napr. hlavni variantu) na objekty tahu vcetne notace. Tahy postupne provede
+    a pak vrati.
+    :param game: objekt partie v pozici, ze ktere tahy vychazeji
+    :param codes: kody tahu
+    :return: list tahu (konci prvnim tahem, ktery v pozici neni legalni)
+    """
+    moves: List[Move] = []
+    for code in codes:
+        move = next((m for m in game.generate_legal_moves() if m.code == code), None)
+        if move is None:
+            break
+        moves.append(move)
+        game.do_move(move)
+    for _ in moves:
+        game.undo_move()
+    return moves
+
+
+def _score_to_tt(score: int, ply: int) -> int:
+    """
+    Skore matu ukladame do transpozicni tabulky jako vzdalenost od ulozene pozice, ne od korene hledani.
+    """
+    if score >= MATE_BOUND:
+        return score + ply
+    elif score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def _score_from_tt(score: int, ply: int) -> int:
+    """
+    Opak _score_to_tt() - prevadi skore matu z tabulky zpet na vzdalenost od korene hledani.
+    """
+    if score >= MATE_BOUND:
+        return score - ply
+    elif score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+def _get_position_evaluation(game: ChessGame) -> int:
+    """
+    Metoda vraci hodnoceni pozice z pohledu bileho. Material a pozicni hodnotu figur udrzuje ChessGame prubezne
+    v make_move() a unmake_move(), takze hodnoceni je jen jejich soucet.
+    :return: hodnoceni pozice
+    """
+    score = game.material_score[0] + game.positional_score[0] - game.material_score[1] - game.positional_score[1]
+    if DEBUG_EVALUATION and game.game_result is None:
+        assert score == _get_naive_position_evaluation(game), 'prubezne hodnoceni nesedi s hodnocenim od zacatku'
+    return score
 
 
 def _get_naive_position_evaluation(game: ChessGame) -> int:
     """
-    Metoda spocita pro kazdeho hrace hodnotu jeho figur.
-    :return: hodnoceni obou hracu
+    Metoda spocita hodnotu figur obou hracu pruchodem celou sachovnici. Pouziva se jen pro kontrolu prubezne
+    pocitaneho hodnoceni (viz DEBUG_EVALUATION).
+    :return: hodnoceni pozice z pohledu bileho
     """
-    if game.game_result is not None and (game.game_result.WHITE_WIN or game.game_result.BLACK_WIN):
+    if game.game_result in (GameResult.WHITE_WIN, GameResult.BLACK_WIN):
         if game.white_to_move:
             return -CHECKMATE
         else:
             return CHECKMATE
-    elif game.game_result is not None and game.game_result.STALEMATE:
+    elif game.game_result == GameResult.STALEMATE:
         return STALEMATE
 
+    # zamerne bez seznamu figur a predpocitanych tabulek hodnot (MATERIAL_SCORES, POSITIONAL_SCORES), ktere kontroluje
     score: int = 0
-    for r in range(len(game.board)):
-        for c in range(len(game.board[r])):
-            piece = game.board[r][c]
-            if piece is not None:
-                if piece.color == Color.WHITE:
-                    score += piece_score[piece.piece_type]
-                    score += _get_positional_score(r, c, piece, True)
-                else:
-                    score -= piece_score[piece.piece_type]
-                    score -= _get_positional_score(r, c, piece, False)
+    squares = game.squares
+    for sq in BOARD_SQUARES:
+        code = squares[sq]
+        if code == EMPTY:
+            continue
+        piece = PIECES[code]
+        r, c = to_row_col(sq)
+        value = piece_score[piece.piece_type] + _get_positional_score(r, c, piece, code > 0)
+        score += value if code > 0 else -value
     return score
 
 
@@ -184,3 +698,31 @@ def _get_positional_score(r: int, c: int, piece: Piece, white: bool) -> int:
     elif piece.piece_type == PieceType.KING:
         return kings_table[square]
 
+
+def _print_iteration(result: SearchResult) -> None:
+    print(f'{result}, time: {result.elapsed:.3f} s, nps: {result.nps}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Hledani nejlepsiho tahu v zadane pozici.')
+    parser.add_argument('--fen', default=STARTING_FEN, help='pozice ve FEN notaci')
+    parser.add_argument('-d', '--depth', type=int, help='maximalni hloubka hledani v pultazich (vychozi '
+                        f'{DEFAULT_DEPTH}, s casovym limitem nebo limitem uzlu {MAX_PLY})')
+    parser.add_argument('--time', type=float, help='mekky casovy limit v sekundach (dalsi iterace se nezacne)')
+    parser.add_argument('--hard-time', type=float, help='tvrdy casovy limit v sekundach (hledani se prerusi)')
+    parser.add_argument('--nodes', type=int, help='maximalni pocet uzlu')
+    parser.add_argument('--stats', action='store_true', help='vypsat statistiky hledani')
+    args = parser.parse_args()
+    search_stats.enabled = args.stats
+    limits = SearchLimits(args.time, args.hard_time, args.nodes)
+    depth = args.depth
+    if depth is None:
+        depth = DEFAULT_DEPTH if args.time is None and args.hard_time is None and args.nodes is None else MAX_PLY
+    result = Search(ChessGame(args.fen), depth, limits=limits, on_iteration=_print_iteration).search()
+    print(f'best move: {result.best_move}, nodes: {result.nodes}, time: {result.elapsed:.3f} s')
+    if result.stats is not None:
+        print(result.stats.summary())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+from typing import List, Tuple, Union, Dict
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+import argparse
+import sys
+import time
+from rules import ChessGame, STARTING_FEN, new_move_buffer
+
+# Standardni pozice pro overeni generatoru tahu a ocekavane pocty uzlu pro hloubky 1, 2, 3, ...
+# (https://www.chessprogramming.org/Perft_Results)
+POSITIONS: Dict[str, Tuple[str, List[int]]] = {
+    'startpos': (STARTING_FEN, [20, 400, 8902, 197281, 4865609, 119060324]),
+    'kiwipete': ('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+                 [48, 2039, 97862, 4085603, 193690690]),
+    'position3': ('8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', [14, 191, 2812, 43238, 674624, 11030083]),
+    'position4': ('r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+                  [6, 264, 9467, 422333, 15833292]),
+    'position5': ('rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8', [44, 1486, 62379, 2103487, 89941194]),
+    'position6': ('r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+                  [46, 2079, 89890, 3894594, 164075551]),
+}
+
+
+class PerftCache:
+    """
+    Tabulka pevne velikosti s pocty uzlu pro dvojice (pozice, hloubka). Stejne pozice se v perftu opakuji
+    (transpozice), takze je staci spocitat jednou.
+    """
+    def __init__(self, size_mb: int) -> None:
+        """
+        :param size_mb: velikost tabulky v MB
+        """
+        self.size: int = max(1, size_mb * 1024 * 1024 // 16)
+        self.keys: array = array('Q', bytes(self.size * 8))
+        # pocet uzlu a hloubka zabalene do jednoho cisla (hloubka v nejnizsim bajtu)
+        self.counts: array = array('Q', bytes(self.size * 8))
+
+    def probe(self, key: int, depth: int) -> int:
+        """
+        :return: pocet uzlu, nebo -1, pokud v tabulce neni
+        """
+        index = key % self.size
+        if self.keys[index] == key and self.counts[index] & 0xFF == depth:
+            return self.counts[index] >> 8
+        return -1
+
+    def store(self, key: int, depth: int, count: int) -> None:
+        index = key % self.size
+        self.keys[index] = key
+        self.counts[index] = count << 8 | depth
+
+
+def perft(game: ChessGame, depth: int, cache: Union[PerftCache, None] = None,
+          buffers: Union[List[array], None] = None) -> int:
+    """
+    Funkce spocita pocet listu stromu legalnich tahu do dane hloubky. Posledni pultah se nehraje, listy se jen
+    spocitaji z poctu legalnich tahu (bulk counting). Tahy se generuji jako kody do bufferu pro kazdou hloubku.
+    :param game: objekt partie
+    :param depth: hloubka v pultazich
+    :param cache: volitelna tabulka jiz spocitanych pozic
+    :param buffers: buffery pro tahy indexovane zbyvajici hloubkou (pokud nejsou zadany, vytvori se)
+    :return: pocet listu
+    """
+    if depth == 0:
+        return 1
+    if cache is not None and depth > 1:
+        count = cache.probe(game.zobrist_key, depth)
+        if count >= 0:
+            return count
+    if buffers is None:
+        buffers = [new_move_buffer() for _ in range(depth + 1)]
+    moves = buffers[depth]
+    move_count = game.generate_moves(moves)
+    if depth == 1:
+        return move_count
+    count = 0
+    for i in range(move_count):
+        game.make_move(moves[i])
+        count += perft(game, depth - 1, cache, buffers)
+        game.unmake_move()
+    if cache is not None:
+        cache.store(game.zobrist_key, depth, count)
+    return count
+
+
+# tabulka jednoho procesu pri paralelnim vypoctu, kazdy proces ma vlastni
+_worker_cache: Union[PerftCache, None] = None
+
+
+def _init_worker(cache_mb: int) -> None:
+    global _worker_cache
+    _worker_cache = PerftCache(cache_mb) if cache_mb > 0 else None
+
+
+def _perft_root_move(fen: str, move_index: int, depth: int) -> int:
+    """
+    Funkce pro proces: nastavi pozici, provede jeden tah z korene a spocita perft zbytku stromu. Poradi
+    vygenerovanych tahu je deterministicke, takze tah staci predat indexem.
+    """
+    game = ChessGame(fen)
+    game.do_move(game.generate_legal_moves()[move_index])
+    return perft(game, depth, _worker_cache)
+
+
+def divide(fen: str, depth: int, workers: int = 1, cache_mb: int = 0) -> List[Tuple[str, int]]:
+    """
+    Funkce spocita perft zvlast pro kazdy tah z korene. Tahy z korene lze rozdelit mezi vice procesu.
+    :param fen: pozice ve FEN notaci
+    :param depth: hloubka v pultazich (alespon 1)
+    :param workers: pocet procesu
+    :param cache_mb: velikost tabulky jiz spocitanych pozic v MB pro kazdy proces (0 = bez tabulky)
+    :return: list dvojic (tah v SAN notaci, pocet listu)
+    """
+    game = ChessGame(fen)
+    moves = game.generate_legal_moves()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cache_mb,)) as executor:
+            counts = list(executor.map(_perft_root_move, [fen] * len(moves), range(len(moves)),
+                                       [depth - 1] * len(moves)))
+    else:
+        cache = PerftCache(cache_mb) if cache_mb > 0 else None
+        counts = []
+        for move in moves:
+            game.do_move(move)
+            counts.append(perft(game, depth - 1, cache))
+            game.undo_move()
+    return [(str(move), count) for move, count in zip(moves, counts)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Perft - mereni rychlosti a overeni generatoru tahu.')
+    parser.add_argument('-d', '--depth', type=int, default=4, help='hloubka v pultazich')
+    parser.add_argument('-p', '--position', default='startpos', choices=list(POSITIONS.keys()) + ['all'],
+                        help='standardni pozice (all = vsechny)')
+    parser.add_argument('--fen', help='vlastni pozice ve FEN notaci (ma prednost pred --position)')
+    parser.add_argument('--divide', action='store_true', help='vypsat pocty listu pro kazdy tah z korene')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='pocet procesu pro tahy z korene')
+    parser.add_argument('--hash', type=int, default=0, help='velikost tabulky spocitanych pozic v MB')
+    args = parser.parse_args()
+    if args.depth < 1:
+        parser.error('depth must be at least 1')
+
+    if args.fen is not None:
+        positions = [('fen', args.fen, [])]
+    elif args.position == 'all':
+        positions = [(name, fen, expected) for name, (fen, expected) in POSITIONS.items()]
+    else:
+        positions = [(args.position, *POSITIONS[args.position])]
+
+    failed = False
+    for name, fen, expected in positions:
+        start = time.perf_counter()
+        results = divide(fen, args.depth, args.workers, args.hash)
+        elapsed = time.perf_counter() - start
+        nodes = sum(count for _, count in results)
+        if args.divide:
+            for move, count in results:
+                print(f'{move}: {count}')
+        line = f'{name}: depth {args.depth}, nodes {nodes}, time {elapsed:.2f} s, nps {int(nodes / max(elapsed, 1e-9))}'
+        if args.depth <= len(expected):
+            if nodes == expected[args.depth - 1]:
+                line += ', OK'
+            else:
+                line += f', FAIL (expected {expected[args.depth - 1]})'
+                failed = True
+        print(line)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
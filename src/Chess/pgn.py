@@ -0,0 +1,155 @@
+from typing import Dict, Iterator, List, TextIO
+import argparse
+import re
+import sys
+import time
+from rules import ChessGame, STARTING_FEN
+
+# radek hlavicky, napr. [White "Kasparov, Garry"]
+HEADER_REGEX = re.compile(r'^\[(\w+)\s+"((?:[^"\\]|\\.)*)"\]\s*$')
+# vysledek partie na konci zapisu tahu
+RESULTS = {'1-0', '0-1', '1/2-1/2', '*'}
+# cislo tahu (12. nebo 12...), pripadne spojene s tahem (12.e4)
+MOVE_NUMBER_REGEX = re.compile(r'^\d+\.+')
+
+
+class PgnGame:
+    """
+    Jedna partie z PGN souboru - hlavicky, tahy v SAN notaci (bez komentaru, variant a NAG) a vysledek.
+    """
+    def __init__(self, headers: Dict[str, str], moves: List[str], result: str) -> None:
+        self.headers = headers
+        self.moves = moves
+        self.result = result
+
+    @property
+    def fen(self) -> str:
+        """
+        Vychozi pozice partie (hlavicka FEN, jinak zakladni postaveni).
+        """
+        return self.headers.get('FEN', STARTING_FEN)
+
+    def replay(self) -> ChessGame:
+        """
+        Metoda prehraje tahy partie od vychozi pozice. Kazdy tah se prevede primo na tah (viz ChessGame.parse_san())
+        bez generovani a anotace vsech legalnich tahu.
+        :return: objekt partie po poslednim tahu
+        """
+        game = ChessGame(self.fen)
+        for san in self.moves:
+            try:
+                game.do_move(game.parse_san(san))
+            except Exception as e:
+                raise Exception(f'{e} (move {game.fullmove_number}{"." if game.white_to_move else "..."})')
+        return game
+
+
+def tokenize_movetext(movetext: str) -> Iterator[str]:
+    """
+    Generator vraci tokeny zapisu tahu - tahy a vysledek. Komentare ({...} a ; do konce radku), varianty (i vnorene),
+    NAG ($1), cisla tahu a oznaceni brani mimochodem (e.p.) vynechava.
+    """
+    depth = 0
+    i = 0
+    length = len(movetext)
+    while i < length:
+        char = movetext[i]
+        if char == '{':
+            end = movetext.find('}', i)
+            i = length if end < 0 else end + 1
+        elif char == ';':
+            end = movetext.find('\n', i)
+            i = length if end < 0 else end + 1
+        elif char == '(':
+            depth += 1
+            i += 1
+        elif char == ')':
+            depth -= 1
+            i += 1
+        elif char.isspace():
+            i += 1
+        else:
+            start = i
+            while i < length and not movetext[i].isspace() and movetext[i] not in '{;()':
+                i += 1
+            if depth > 0:
+                continue
+            token = MOVE_NUMBER_REGEX.sub('', movetext[start:i])
+            # oznaceni brani mimochodem (exd6 e.p.) patri k predchozimu tahu, samostatny tah to neni
+            if token and not token.startswith('$') and token != 'e.p.':
+                yield token
+
+
+def read_games(file: TextIO) -> Iterator[PgnGame]:
+    """
+    Generator cte partie z PGN souboru postupne, v pameti je vzdy jen prave ctena partie. Partie zacina hlavickami
+    a pokracuje zapisem tahu az po vysledek (nebo zacatek dalsich hlavicek ci konec souboru).
+    :param file: otevreny PGN soubor
+    :return: iterator partii
+    """
+    headers: Dict[str, str] = {}
+    movetext: List[str] = []
+    # zapis tahu je uvnitr komentare {...} pres vice radku
+    in_comment = False
+    for line in file:
+        stripped = line.strip()
+        if stripped.startswith('%'):
+            # escape radek, podle specifikace se ignoruje
+            continue
+        match = HEADER_REGEX.match(stripped) if stripped.startswith('[') else None
+        if match is not None:
+            if movetext:
+                # hlavicka po zapisu tahu bez vysledku - zacina dalsi partie
+                yield _create_game(headers, movetext)
+                headers, movetext = {}, []
+            headers[match.group(1)] = match.group(2).replace('\\"', '"').replace('\\\\', '\\')
+            continue
+        if stripped or movetext:
+            movetext.append(line)
+            if '{' in stripped or '}' in stripped or in_comment:
+                for char in stripped:
+                    if char == '{':
+                        in_comment = True
+                    elif char == '}':
+                        in_comment = False
+            tokens = stripped.split()
+            if not in_comment and len(tokens) > 0 and tokens[-1] in RESULTS:
+                yield _create_game(headers, movetext)
+                headers, movetext = {}, []
+    if headers or movetext:
+        yield _create_game(headers, movetext)
+
+
+def _create_game(headers: Dict[str, str], movetext: List[str]) -> PgnGame:
+    moves = list(tokenize_movetext(''.join(movetext)))
+    result = headers.get('Result', '*')
+    if len(moves) > 0 and moves[-1] in RESULTS:
+        result = moves.pop()
+    return PgnGame(headers, moves, result)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Kontrola a prehrani partii z PGN souboru.')
+    parser.add_argument('pgn', help='PGN soubor')
+    args = parser.parse_args()
+    games = 0
+    moves = 0
+    errors = 0
+    start = time.perf_counter()
+    with open(args.pgn, encoding='utf-8', errors='replace') as file:
+        for pgn_game in read_games(file):
+            games += 1
+            try:
+                pgn_game.replay()
+                moves += len(pgn_game.moves)
+            except Exception as e:
+                errors += 1
+                print(f'game {games} ({pgn_game.headers.get("White", "?")} - {pgn_game.headers.get("Black", "?")}): '
+                      f'{e}', file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    print(f'games {games}, moves {moves}, errors {errors}, time {elapsed:.1f} s, '
+          f'{moves / max(elapsed, 1e-9):.0f} moves/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,11 @@
 from __future__ import annotations
 from typing import Tuple, List, Union, Dict
 from abc import ABC, abstractmethod
+from array import array
 import enum
+import random
 import re
+from psqt import PIECE_VALUES, PIECE_TABLES
 
 
 class Color(enum.Enum):
@@ -30,6 +33,164 @@ ROOK = PieceType.ROOK
 QUEEN = PieceType.QUEEN
 KING = PieceType.KING
 
+# Kody figur pro reprezentaci sachovnice v poli. Bile figury maji kladny kod, cerne zaporny, prazdne pole ma kod 0.
+EMPTY = 0
+PAWN_CODE = 1
+KNIGHT_CODE = 2
+BISHOP_CODE = 3
+ROOK_CODE = 4
+QUEEN_CODE = 5
+KING_CODE = 6
+PIECE_TYPE_CODES: Dict[PieceType, int] = {PAWN: PAWN_CODE, KNIGHT: KNIGHT_CODE, BISHOP: BISHOP_CODE, ROOK: ROOK_CODE,
+                                          QUEEN: QUEEN_CODE, KING: KING_CODE}
+
+# Sachovnice je ulozena v 0x88 reprezentaci - pole o 128 prvcich, kde index pole je radek * 16 + sloupec. Indexy,
+# ktere maji nastaveny nektery z bitu 0x88, lezi mimo sachovnici, takze kontrola hranic je jedina bitova operace.
+# Radek 0 odpovida osme rade, stejne jako u puvodniho dvourozmerneho listu.
+BOARD_SQUARES: List[int] = [r * 16 + c for r in range(8) for c in range(8)]
+NO_SQUARE = -1
+
+STARTING_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+# symboly figur ve FEN notaci (velka pismena jsou bile figury, mala cerne)
+FEN_PIECE_CODES: Dict[str, int] = {'P': PAWN_CODE, 'N': KNIGHT_CODE, 'B': BISHOP_CODE, 'R': ROOK_CODE, 'Q': QUEEN_CODE,
+                                   'K': KING_CODE}
+FEN_PIECE_SYMBOLS: Dict[int, str] = {code: symbol for symbol, code in FEN_PIECE_CODES.items()}
+
+
+def to_square(r: int, c: int) -> int:
+    """
+    Funkce prevadi radek a sloupec na index pole v 0x88 reprezentaci.
+    :param r: index radku sachovnice
+    :param c: index sloupce sachovnice
+    :return: index pole
+    """
+    return (r << 4) | c
+
+
+def to_row_col(square: int) -> Tuple[int, int]:
+    """
+    Funkce prevadi index pole v 0x88 reprezentaci na radek a sloupec.
+    :param square: index pole
+    :return: radek a sloupec
+    """
+    return square >> 4, square & 7
+
+
+# Tah je zabaleny do jednoho cisla: bity 0-6 jsou vychozi pole, bity 7-13 cilove pole (obe v 0x88 reprezentaci),
+# bity 14-16 kod figury, ve kterou se meni pesec (0 = bez promeny), a nad nimi priznaky tahu. Objekty Move se
+# vytvari jen tam, kde jsou potreba (UI, notace), hledani a perft pracuji primo s cisly.
+MOVE_TO_SHIFT = 7
+MOVE_PROMOTION_SHIFT = 14
+MOVE_CAPTURE = 1 << 17
+MOVE_ENPASSANT = 1 << 18
+MOVE_CASTLE = 1 << 19
+# bity, ktere tah jednoznacne urcuji (vychozi pole, cilove pole a promena) - priznaky se z nich daji odvodit
+MOVE_IDENTITY_MASK = (1 << 17) - 1
+# velikost bufferu pro tahy jedne pozice (nejvice legalnich tahu v jedne pozici je 218)
+MAX_MOVES = 256
+
+
+def encode_move(start_sq: int, end_sq: int, promotion_code: int = 0, flags: int = 0) -> int:
+    """
+    Funkce zabali tah do jednoho cisla.
+    :param start_sq: index pole, odkud se tahne (0x88)
+    :param end_sq: index pole, kam se tahne (0x88)
+    :param promotion_code: kod figury (bez znamenka), ve kterou se meni pesec, 0 pokud nejde o promenu
+    :param flags: priznaky tahu (MOVE_CAPTURE, MOVE_ENPASSANT, MOVE_CASTLE)
+    :return: kod tahu
+    """
+    return start_sq | end_sq << MOVE_TO_SHIFT | promotion_code << MOVE_PROMOTION_SHIFT | flags
+
+
+def new_move_buffer() -> array:
+    """
+    Funkce vytvori buffer pro kody tahu jedne pozice. Generator tahy zapisuje do predem alokovaneho bufferu
+    a vraci jejich pocet, takze se pri hledani nealokuji zadne nove objekty.
+    :return: pole cisel o velikosti MAX_MOVES
+    """
+    return array('i', bytes(4 * MAX_MOVES))
+
+
+# Zobrist klice pro hashovani pozic. Generujeme je z pevneho seedu, aby byl hash pozice stejny i mezi behy programu
+# (napr. pro ulozene tabulky). Klice figur se indexuji kodem figury a polem 0x88 sachovnice.
+_zobrist_random = random.Random(20210516)
+ZOBRIST_PIECES: List[List[int]] = [[_zobrist_random.getrandbits(64) for _ in range(128)] for _ in range(13)]
+ZOBRIST_BLACK_TO_MOVE: int = _zobrist_random.getrandbits(64)
+# klic pro kazdou kombinaci prav na rosadu (bity CASTLING_*)
+ZOBRIST_CASTLING: List[int] = [0] + [_zobrist_random.getrandbits(64) for _ in range(15)]
+# klic pro sloupec pole, kde je mozne brat mimochodem
+ZOBRIST_ENPASSANT: List[int] = [_zobrist_random.getrandbits(64) for _ in range(8)]
+
+
+# Predpocitane tabulky pro generovani tahu a hledani sachu. Vse se indexuje polem 0x88 sachovnice a pocita se jednou
+# pri importu modulu, generatory pak jen prochazi hotova data bez pocitani souradnic a kontrol hranic.
+ORTHOGONAL_DIRECTIONS: Tuple[int, ...] = (-16, -1, 16, 1)
+DIAGONAL_DIRECTIONS: Tuple[int, ...] = (-17, -15, 15, 17)
+# smery od krale v poradi, ve kterem je prochazi check_for_pins_and_checks() (nejdrive kolme, pak diagonalni)
+QUEEN_DIRECTIONS: Tuple[int, ...] = ORTHOGONAL_DIRECTIONS + DIAGONAL_DIRECTIONS
+KNIGHT_DIRECTIONS: Tuple[int, ...] = (-33, -31, -18, -14, 14, 18, 31, 33)
+
+
+def _build_targets(directions: Tuple[int, ...]) -> List[Tuple[int, ...]]:
+    """
+    Funkce pro kazde pole vrati pole, na ktera lze skocit jednim z danych smeru (tahy jezdce a krale).
+    """
+    targets: List[Tuple[int, ...]] = [()] * 128
+    for sq in BOARD_SQUARES:
+        targets[sq] = tuple(sq + d for d in directions if not (sq + d) & 0x88)
+    return targets
+
+
+def _build_rays(directions: Tuple[int, ...]) -> List[Tuple[Tuple[int, Tuple[int, ...]], ...]]:
+    """
+    Funkce pro kazde pole vrati dvojice (smer, paprsek), kde paprsek jsou vsechna pole od daneho pole v danem smeru az
+    k okraji sachovnice. Smery, ve kterych uz zadne pole neni, vynechavame.
+    """
+    rays: List[Tuple[Tuple[int, Tuple[int, ...]], ...]] = [()] * 128
+    for sq in BOARD_SQUARES:
+        square_rays = []
+        for d in directions:
+            ray = []
+            end_sq = sq + d
+            while not end_sq & 0x88:
+                ray.append(end_sq)
+                end_sq += d
+            if ray:
+                square_rays.append((d, tuple(ray)))
+        rays[sq] = tuple(square_rays)
+    return rays
+
+
+KNIGHT_TARGETS: List[Tuple[int, ...]] = _build_targets(KNIGHT_DIRECTIONS)
+KING_TARGETS: List[Tuple[int, ...]] = _build_targets(QUEEN_DIRECTIONS)
+ORTHOGONAL_RAYS: List[Tuple[Tuple[int, Tuple[int, ...]], ...]] = _build_rays(ORTHOGONAL_DIRECTIONS)
+DIAGONAL_RAYS: List[Tuple[Tuple[int, Tuple[int, ...]], ...]] = _build_rays(DIAGONAL_DIRECTIONS)
+# paprsky vsemi osmi smery - indexujeme je smerem v poradi QUEEN_DIRECTIONS (i pro smery bez poli, kvuli indexum)
+RAYS: List[List[Tuple[int, ...]]] = [[()] * 8 for _ in range(128)]
+for _sq in BOARD_SQUARES:
+    for _d, _ray in ORTHOGONAL_RAYS[_sq] + DIAGONAL_RAYS[_sq]:
+        RAYS[_sq][QUEEN_DIRECTIONS.index(_d)] = _ray
+# bitove masky poli, na ktera utoci jezdec, kral a bily/cerny pesec z daneho pole (pro mapu utoku, viz
+# ChessGame.compute_attack_map())
+KNIGHT_ATTACKS: List[int] = [sum(1 << _end_sq for _end_sq in _targets) for _targets in KNIGHT_TARGETS]
+KING_ATTACKS: List[int] = [sum(1 << _end_sq for _end_sq in _targets) for _targets in KING_TARGETS]
+WHITE_PAWN_ATTACKS: List[int] = [0] * 128
+BLACK_PAWN_ATTACKS: List[int] = [0] * 128
+for _sq in BOARD_SQUARES:
+    WHITE_PAWN_ATTACKS[_sq] = sum(1 << (_sq + _d) for _d in (-17, -15) if not (_sq + _d) & 0x88)
+    BLACK_PAWN_ATTACKS[_sq] = sum(1 << (_sq + _d) for _d in (15, 17) if not (_sq + _d) & 0x88)
+
+
+# tah v SAN pro ChessGame.parse_san() - rosada, nebo figura, nepovinny sloupec a radek vychoziho pole, nepovinne
+# brani, cilove pole a nepovinna promena; pripousti i zapis 'O-O', '=Q', ' e.p.' a znaky sachu a hodnoceni tahu
+SAN_REGEX = re.compile(r'''
+    ^(?:
+        (?P<castle>[0O]-[0O](?:-[0O])?)
+        |(?P<piece>[NBRQK])?(?P<file>[a-h])?(?P<rank>[1-8])?x?(?P<target>[a-h][1-8])(?:=?(?P<promotion>[NBRQ]))?
+        (?:\s?e\.p\.)?
+    )[+#]?[!?]*$
+    ''', re.VERBOSE)
+
 
 def create_piece(color: Color, piece_type: PieceType) -> Union[BISHOP, KNIGHT, ROOK, QUEEN]:
     """
@@ -103,34 +264,64 @@ def get_piece_type_value(piece_type: PieceType) -> int:
 
 class GameResult(enum.Enum):
     """
-    Enum vsechn moznych vysledku sachove partie. Implementovany jsou zatim prvni tri.
+    Enum vsechn moznych vysledku sachove partie.
     """
     WHITE_WIN = 0,
     BLACK_WIN = 1,
     STALEMATE = 2,
-    THREEFOLD_REPETITION_DRAW = 3,  # zatim neni implementovano
-    FIFTY_MOVE_RULE_DRAW = 4,  # zatim neni implementovano
-    INSUFFICIENT_MATERIAL_DRAW = 5  # zatim neni implementovano
-
-
-class CastlingRights:
+    THREEFOLD_REPETITION_DRAW = 3,
+    FIFTY_MOVE_RULE_DRAW = 4,
+    INSUFFICIENT_MATERIAL_DRAW = 5
+
+
+# Prava na rosadu jako bity (wk - white kingside, wq - white queenside, bk, bq pro cerneho)
+CASTLING_WK = 1
+CASTLING_WQ = 2
+CASTLING_BK = 4
+CASTLING_BQ = 8
+CASTLING_ALL = CASTLING_WK | CASTLING_WQ | CASTLING_BK | CASTLING_BQ
+# CASTLING_MASKS[pole] jsou prava, ktera zustanou po tahu z pole nebo na pole (tah krale nebo veze z vychoziho pole,
+# sebrani veze na vychozim poli), pro ostatni pole se prava nemeni
+CASTLING_MASKS: array = array('b', [CASTLING_ALL] * 128)
+CASTLING_MASKS[to_square(7, 4)] = CASTLING_BK | CASTLING_BQ
+CASTLING_MASKS[to_square(7, 7)] = CASTLING_ALL & ~CASTLING_WK
+CASTLING_MASKS[to_square(7, 0)] = CASTLING_ALL & ~CASTLING_WQ
+CASTLING_MASKS[to_square(0, 4)] = CASTLING_WK | CASTLING_WQ
+CASTLING_MASKS[to_square(0, 7)] = CASTLING_ALL & ~CASTLING_BK
+CASTLING_MASKS[to_square(0, 0)] = CASTLING_ALL & ~CASTLING_BQ
+
+# Stav pozice, ktery nejde odvodit z tahu, je zabaleny do jednoho cisla: bity 0-3 prava na rosadu, bity 4-11 pole
+# pro brani mimochodem (STATE_NO_ENPASSANT, pokud brat nelze), bity 12-15 kod figury sebrane tahem, ktery do pozice
+# vedl (posunuty o 6, aby byl nezaporny), a od bitu 16 pocet pultahu od posledniho brani nebo tahu pescem.
+STATE_ENPASSANT_SHIFT = 4
+STATE_CAPTURED_SHIFT = 12
+STATE_HALFMOVE_SHIFT = 16
+STATE_NO_ENPASSANT = 0xFF
+# pocet pultahu bez brani a tahu pescem, po kterem je partie remiza (pravidlo 50 tahu)
+FIFTY_MOVE_RULE_PLIES = 100
+
+
+def pack_state(castling_rights: int, enpassant_square: int, captured: int, halfmove_clock: int) -> int:
     """
-    Trida slouzi pouze pro udrzovani dat o pravech k obema typum rosady obou hracu.
+    Funkce zabali stav pozice do jednoho cisla (viz ChessGame.state_stack).
+    :param castling_rights: prava na rosadu (bity CASTLING_*)
+    :param enpassant_square: pole pro brani mimochodem, nebo NO_SQUARE
+    :param captured: kod figury sebrane tahem, ktery do pozice vedl (EMPTY, pokud tah nic nebral)
+    :param halfmove_clock: pocet pultahu od posledniho brani nebo tahu pescem
+    :return: zabaleny stav
     """
-    def __init__(self, wk: bool, bk: bool, wq: bool, bq: bool):
-        self.wk = wk  # wk - white kingside - pravo bileho na kingside rosadu
-        self.bk = bk  # bk - black kingside - pravo cerneho na kingside rosadu
-        self.wq = wq  # wq - white queenside - pravo bileho na queenside rosadu
-        self.bq = bq  # bq - black queenside - pravo cerneho na queenside rosadu
-
-    def __str__(self) -> str:
-        return f'wk: {self.wk}, bk: {self.bk}, wq: {self.wq}, bq: {self.bq}'
+    enpassant = enpassant_square if enpassant_square != NO_SQUARE else STATE_NO_ENPASSANT
+    return castling_rights | enpassant << STATE_ENPASSANT_SHIFT | (captured + 6) << STATE_CAPTURED_SHIFT | \
+        halfmove_clock << STATE_HALFMOVE_SHIFT
 
 
 class Move:
     """
-    Trida pro reprezentaci sachoveho tahu. V soucasne dobe implementovana pouze standardni notace (SAN).
+    Trida pro reprezentaci sachoveho tahu. Tah samotny je ulozeny jako cislo (viz encode_move()), objekt k nemu
+    pridava kody tahnouci a brane figury a notaci. V soucasne dobe implementovana pouze standardni notace (SAN).
     """
+    __slots__ = ('code', 'moved_code', 'captured_code', '_san', '_siblings')
+
     ranks_to_rows = {'1': 7, '2': 6, '3': 5, '4': 4, '5': 3, '6': 2, '7': 1, '8': 0}
     rows_to_ranks = {v: k for k, v in ranks_to_rows.items()}
     files_to_cols = {'a': 0, 'b': 1, 'c': 2, 'd': 3, 'e': 4, 'f': 5, 'g': 6, 'h': 7}
@@ -138,60 +329,143 @@ class Move:
     files = files_to_cols.keys()
     ranks = ranks_to_rows.keys()
 
-    def __init__(self, from_square: Tuple[int, int], to_square: Tuple[int, int], board: List[List[Piece]],
+    def __init__(self, from_square: Tuple[int, int], to_square: Tuple[int, int], board: BoardView,
                  promotion_type: PieceType = QUEEN, is_enpassant: bool = False, is_castle: bool = False) -> None:
-        self.start_row: int = from_square[0]
-        self.start_col: int = from_square[1]
-        self.end_row: int = to_square[0]
-        self.end_col: int = to_square[1]
-        self.piece_moved: Piece = board[self.start_row][self.start_col]
-        self.piece_captured: Piece = board[self.end_row][self.end_col]
-        # promena pesce
-        self.promotion_type: PieceType = promotion_type
-        self.is_pawn_promotion: bool = (self.piece_moved.color == WHITE and self.piece_moved.piece_type == PAWN and
-                                        self.end_row == 0) or \
-                                       (self.piece_moved.color == BLACK and self.piece_moved.piece_type == PAWN and
-                                        self.end_row == 7)
-        # brani mimochodem
-        self.is_enpassant: bool = is_enpassant
-        if self.is_enpassant:
-            if self.piece_moved.color == WHITE:
-                self.piece_captured = board[self.end_row + 1][self.end_col]
-            else:
-                self.piece_captured = board[self.end_row - 1][self.end_col]
-        # rosada
-        self.is_castle = is_castle
-        # notace tahu - priradime pozdeji, potrebujeme k tomu znat vsechny mozne tahy daneho pultahu kvuli
-        # nejednoznacnym tahum
-        self.san = None
+        # parametr to_square zakryva stejnojmennou funkci modulu, proto prevadime primo
+        start_sq = (from_square[0] << 4) | from_square[1]
+        end_sq = (to_square[0] << 4) | to_square[1]
+        squares = board.squares
+        moved = squares[start_sq]
+        promotion_code = 0
+        if (moved == PAWN_CODE and end_sq < 0x10) or (moved == -PAWN_CODE and end_sq >= 0x70):
+            promotion_code = PIECE_TYPE_CODES[promotion_type]
+        flags = MOVE_CASTLE if is_castle else 0
+        if is_enpassant:
+            flags |= MOVE_ENPASSANT | MOVE_CAPTURE
+        elif squares[end_sq] != EMPTY:
+            flags |= MOVE_CAPTURE
+        self._setup(encode_move(start_sq, end_sq, promotion_code, flags), squares)
+
+    @classmethod
+    def from_code(cls, code: int, squares: array) -> Move:
+        """
+        Metoda vytvari objekt tahu z kodu tahu. Kody figur se ctou ze sachovnice, takze ji musime volat v pozici
+        pred provedenim tahu.
+        :param code: kod tahu (viz encode_move())
+        :param squares: pole sachovnice (ChessGame.squares)
+        :return: objekt tahu
+        """
+        move = cls.__new__(cls)
+        move._setup(code, squares)
+        return move
+
+    def _setup(self, code: int, squares: array) -> None:
+        self.code: int = code
+        # kody figur si drzime kvuli rychlemu porovnavani, objekty figur (piece_moved, piece_captured) kvuli notaci
+        # a UI
+        self.moved_code: int = squares[code & 0x7F]
+        if code & MOVE_ENPASSANT:
+            # brany pesec nestoji na cilovem poli, je to vzdy pesec opacne barvy
+            self.captured_code: int = -self.moved_code
+        else:
+            self.captured_code: int = squares[(code >> MOVE_TO_SHIFT) & 0x7F]
+        # notace tahu - pocita se az pri prvnim cteni (viz san), potrebujeme k tomu znat vsechny mozne tahy daneho
+        # pultahu kvuli nejednoznacnym tahum
+        self._san: Union[str, None] = None
+        self._siblings: Union[List[Move], None] = None
+
+    @property
+    def start_sq(self) -> int:
+        return self.code & 0x7F
+
+    @property
+    def end_sq(self) -> int:
+        return (self.code >> MOVE_TO_SHIFT) & 0x7F
+
+    @property
+    def start_row(self) -> int:
+        return (self.code & 0x7F) >> 4
+
+    @property
+    def start_col(self) -> int:
+        return self.code & 7
+
+    @property
+    def end_row(self) -> int:
+        return (self.code >> MOVE_TO_SHIFT & 0x7F) >> 4
+
+    @property
+    def end_col(self) -> int:
+        return (self.code >> MOVE_TO_SHIFT) & 7
+
+    @property
+    def is_pawn_promotion(self) -> bool:
+        return (self.code >> MOVE_PROMOTION_SHIFT) & 7 != 0
+
+    @property
+    def promotion_type(self) -> Union[PieceType, None]:
+        promotion_code = (self.code >> MOVE_PROMOTION_SHIFT) & 7
+        return PIECES[promotion_code].piece_type if promotion_code else None
+
+    @property
+    def is_enpassant(self) -> bool:
+        return self.code & MOVE_ENPASSANT != 0
+
+    @property
+    def is_castle(self) -> bool:
+        return self.code & MOVE_CASTLE != 0
+
+    @property
+    def piece_moved(self) -> Piece:
+        return PIECES[self.moved_code]
+
+    @property
+    def piece_captured(self) -> Union[Piece, None]:
+        return PIECES[self.captured_code]
+
+    @property
+    def san(self) -> Union[str, None]:
+        """
+        Notace tahu. Tahy z ChessGame.generate_legal_moves() znaji ostatni legalni tahy sveho pultahu a notaci si
+        spocitaji az pri prvnim cteni, hledani tak za notaci nic neplati. Ostatni tahy maji notaci None, dokud ji
+        nekdo nevyplni (napr. annotate_moves_san()).
+        """
+        if self._san is None and self._siblings is not None:
+            self._san = self.get_san(self._siblings)
+            self._siblings = None
+        return self._san
+
+    @san.setter
+    def san(self, san: Union[str, None]) -> None:
+        self._san = san
+
+    @property
+    def uci(self) -> str:
+        """
+        Tah v notaci protokolu UCI (pocatecni a cilove pole, pripadne figura promeny malym pismenem, napr. e7e8q).
+        """
+        uci = self.cols_to_files[self.start_col] + self.rows_to_ranks[self.start_row] + \
+            self.cols_to_files[self.end_col] + self.rows_to_ranks[self.end_row]
+        if self.is_pawn_promotion:
+            uci += get_promotion_type_str(self.promotion_type).lower()
+        return uci
 
     def __eq__(self, other: Move) -> bool:
         """
-        Metoda porovnava dva tahy podle jejich hash hodnoty.
+        Metoda porovnava dva tahy podle vychoziho pole, ciloveho pole a promeny pesce.
         :param other: Tah, se kterym srovnavame
         :return: True/False zda jsou tahy stejne
         """
         if isinstance(other, Move):
-            return hash(self) == hash(other)
+            return (self.code ^ other.code) & MOVE_IDENTITY_MASK == 0
         return False
 
     def __hash__(self) -> int:
         """
-        Metoda pocita hodnotu tahu pro porovnavani tahu, zda jsou stejne.
-        :return: hodnota tahu pro porovnavani (hashovani)
+        Metoda vraci hodnotu tahu pro hashovani, shodne tahy (viz __eq__()) maji stejnou hodnotu.
+        :return: hodnota tahu pro hashovani
         """
-        promotion_type_value = 0
-
-        if self.promotion_type == QUEEN:
-            promotion_type_value = 1
-        elif self.promotion_type == ROOK:
-            promotion_type_value = 2
-        elif self.promotion_type == KNIGHT:
-            promotion_type_value = 3
-        elif self.promotion_type == BISHOP:
-            promotion_type_value = 4
-        # pro porovnavani tahu
-        return self.start_row * 10000 + self.start_col * 1000 + self.end_row * 100 + self.end_col * 10 + promotion_type_value
+        return self.code & MOVE_IDENTITY_MASK
 
     def __str__(self) -> str:
         """
@@ -230,63 +504,81 @@ class Move:
     @classmethod
     def annotate_moves_san(cls, moves: List[Move]) -> None:
         """
-        Metoda vyplnuje SAN (Standard Algebraic Notation) ke kazdemu tahu, ktery dostane na vstupu. Nemuzeme
-        delat pro jednotlive tahy, protoze potrebujeme znat vsechny tahy z daneho pultahu kvuli moznym nejednoznacnym
-        tahum (kdy mohou dve figury skocit na stejne pole).
+        Metoda vyplnuje SAN (Standard Algebraic Notation) ke kazdemu tahu, ktery dostane na vstupu, najednou. Tahy
+        z generate_legal_moves() si notaci spocitaji samy pri prvnim cteni (viz san), tato metoda se hodi, pokud
+        potrebujeme notaci vsech tahu. Tahy si nejdrive rozdelime podle ciloveho pole a tahnouci figury, takze
+        nejednoznacne tahy hledame jen mezi tahy stejne skupiny.
         :param moves: Tahy k anotaci (vsechny legalni tahy daneho pultahu)
         """
+        groups: Dict[Tuple[int, int], List[Move]] = {}
         for move in moves:
-            start_file = cls.cols_to_files[move.start_col]
-            end_file = cls.cols_to_files[move.end_col]
-            end_rank = cls.rows_to_ranks[move.end_row]
-            if move.is_castle:
-                if move.start_col < move.end_col:
-                    move.san = '0-0'
-                else:
-                    move.san = '0-0-0'
-            elif move.is_enpassant:
-                start_file = cls.cols_to_files[move.start_col]
-                end_file = cls.cols_to_files[move.end_col]
-                end_rank = cls.rows_to_ranks[move.end_row]
-                move.san = f'{start_file}x{end_file}{end_rank} e.p.'
-            elif move.is_pawn_promotion:
-                promotion_type = get_promotion_type_str(move.promotion_type)
-                if move.piece_captured is None:
-                    move.san = f'{end_file}{end_rank}{promotion_type}'
-                else:
-                    move.san = f'{start_file}x{end_file}{end_rank}{promotion_type}'
-            else:  # ostatni (bezne) tahy
-                piece_type = move.piece_moved.symbol if move.piece_moved.piece_type != PAWN else ''
-                ambiguous_piece_identification = cls.get_ambiguous_piece_identification(move, moves)
-                if move.piece_captured is None:
-                    move.san = f'{piece_type}{ambiguous_piece_identification}{end_file}{end_rank}'
-                else:
-                    if move.piece_moved.piece_type == PAWN:
-                        move.san = f'{start_file}x{end_file}{end_rank}'
-                    else:
-                        move.san = f'{piece_type}{ambiguous_piece_identification}x{end_file}{end_rank}'
+            groups.setdefault((move.end_sq, move.moved_code), []).append(move)
+        for move in moves:
+            move.san = move.get_san(groups[(move.end_sq, move.moved_code)])
+
+    def get_san(self, moves: List[Move]) -> str:
+        """
+        Metoda vraci notaci tahu.
+        :param moves: Legalni tahy daneho pultahu (staci ty, ktere mohou byt s tahem zameneny)
+        :return: Tah v SAN notaci
+        """
+        start_file = self.cols_to_files[self.start_col]
+        end_file = self.cols_to_files[self.end_col]
+        end_rank = self.rows_to_ranks[self.end_row]
+        if self.is_castle:
+            if self.start_col < self.end_col:
+                return '0-0'
+            else:
+                return '0-0-0'
+        elif self.is_enpassant:
+            return f'{start_file}x{end_file}{end_rank} e.p.'
+        elif self.is_pawn_promotion:
+            promotion_type = get_promotion_type_str(self.promotion_type)
+            if self.piece_captured is None:
+                return f'{end_file}{end_rank}{promotion_type}'
+            else:
+                return f'{start_file}x{end_file}{end_rank}{promotion_type}'
+        else:  # ostatni (bezne) tahy
+            if self.piece_moved.piece_type == PAWN:
+                if self.piece_captured is None:
+                    return f'{end_file}{end_rank}'
+                return f'{start_file}x{end_file}{end_rank}'
+            piece_type = self.piece_moved.symbol
+            ambiguous_piece_identification = self.get_ambiguous_piece_identification(self, moves)
+            if self.piece_captured is None:
+                return f'{piece_type}{ambiguous_piece_identification}{end_file}{end_rank}'
+            else:
+                return f'{piece_type}{ambiguous_piece_identification}x{end_file}{end_rank}'
 
     @classmethod
     def get_ambiguous_piece_identification(cls, move: Move, moves: List[Move]) -> str:
         """
-        Metoda zkouma tah, jestli je jednoznacny, to znamena, jestli nemuze vice figur skocit na stejne pole
-        a v pripade, ze tah vyhodnoti jako nejednoznacny, tak se snazi najit spravnou identifikaci figury.
+        Metoda zkouma tah, jestli je jednoznacny, to znamena, jestli nemuze vice figur stejneho typu skocit na stejne
+        pole (napr. i dve damy po promene pesce) a v pripade, ze tah vyhodnoti jako nejednoznacny, tak najde
+        identifikaci figury - sloupec, pokud ho jina figura nesdili, jinak radek, pripadne oboje.
         :param move: Tah, ktery zkoumame
         :param moves: Vsechny tahy v danem pultahu
-        :return: Identifikace figury, tj. sloupec nebo radek napr. "a" nebo "3"
+        :return: Identifikace figury, tj. sloupec nebo radek napr. "a" nebo "3" (pripadne pole napr. "a3")
         """
-        if move.piece_moved.piece_type != KNIGHT and move.piece_moved.piece_type != ROOK:
-            # nejezdnoznacne mohou byt pouze tahy jezdcem nebo vezi
+        if move.moved_code == KING_CODE or move.moved_code == -KING_CODE:
             return ''
-        else:
-            for m in filter(lambda x: x.end_row == move.end_row and x.end_col == move.end_col and
-                                      x.piece_moved.piece_type == move.piece_moved.piece_type, moves):
-                if move != m:
-                    if m.start_col == move.start_col:
-                        return cls.rows_to_ranks[move.start_row]
-                    else:
-                        return cls.cols_to_files[move.start_col]
+        ambiguous = False
+        same_col = False
+        same_row = False
+        end_sq = move.end_sq
+        start_sq = move.start_sq
+        for m in moves:
+            if m.end_sq == end_sq and m.moved_code == move.moved_code and m.start_sq != start_sq:
+                ambiguous = True
+                same_col = same_col or m.start_col == move.start_col
+                same_row = same_row or m.start_row == move.start_row
+        if not ambiguous:
             return ''
+        if not same_col:
+            return cls.cols_to_files[move.start_col]
+        if not same_row:
+            return cls.rows_to_ranks[move.start_row]
+        return cls.cols_to_files[move.start_col] + cls.rows_to_ranks[move.start_row]
 
 
 class Piece(ABC):
@@ -305,6 +597,8 @@ class Piece(ABC):
 
     def __init__(self, color: Color):
         self.color = color
+        # kod figury v poli sachovnice (ChessGame.squares)
+        self.code: int = PIECE_TYPE_CODES[self.piece_type] if color == WHITE else -PIECE_TYPE_CODES[self.piece_type]
 
     def __str__(self) -> str:
         """
@@ -315,465 +609,845 @@ class Piece(ABC):
 
     # abstraktni metoda pro generovani pseudo-legalnich tahu, musi vyplnit potomci
     @abstractmethod
-    def generate_pseudo_legal_moves(self, r: int, c: int, game: ChessGame) -> List[Move]:
+    def generate_pseudo_legal_moves(self, sq: int, game: ChessGame, moves: array, count: int,
+                                    captures_only: bool = False) -> int:
         """
-        Abstraktni metoda pro generovani pseudo-legalnich tahu, musi vyplnit potomci.
-        :param r: index radku sachovnice
-        :param c: index sloupce sachovnice
+        Abstraktni metoda pro generovani pseudo-legalnich tahu, musi vyplnit potomci. Kody tahu se zapisuji do
+        bufferu moves od indexu count.
+        :param sq: index pole sachovnice (0x88)
         :param game: objekt partie
-        :return: list pseudo-legalnich tahu
+        :param moves: buffer pro kody tahu (viz new_move_buffer())
+        :param count: pocet tahu, ktere uz v bufferu jsou
+        :param captures_only: generovat pouze brani a promeny pesce (pro quiescence search)
+        :return: pocet tahu v bufferu po pridani tahu figury
         """
         pass
 
     @staticmethod
-    def generate_pseudo_legal_diagonal_moves(r: int, c: int, game: ChessGame) -> List[Move]:
+    def generate_pseudo_legal_diagonal_moves(sq: int, game: ChessGame, moves: array, count: int,
+                                             captures_only: bool = False) -> int:
         """
-        Metoda vraci vsechny pseudo-legalni tahy po diagonalach a pouziva se pro generovani tahu strelce a damy
-        :param r: index radku sachovnice
-        :param c: index sloupce sachovnice
+        Metoda generuje vsechny pseudo-legalni tahy po diagonalach a pouziva se pro generovani tahu strelce a damy
+        :param sq: index pole sachovnice (0x88)
         :param game: objekt partie
-        :return: list pseudo-legalnich tahu
-        """
-        moves = []
-        piece_pinned = False
-        pin_direction = ()
-        for i in range(len(game.pins) - 1, -1, -1):
-            if game.pins[i][0] == r and game.pins[i][1] == c:
-                piece_pinned = True
-                pin_direction = (game.pins[i][2], game.pins[i][3])
-                # damu chceme z pinu odstranit az ve chvili, kdy generujeme ortogonalni tahy
-                if game.board[r][c].piece_type != QUEEN:
-                    game.pins.remove(game.pins[i])
-                break
-        directions = ((-1, 1), (1, -1), (1, 1), (-1, -1))
-        enemy_color = BLACK if game.white_to_move else WHITE
-        for direction in directions:
-            for i in range(1, 8):
-                end_row = r + direction[0] * i
-                end_col = c + direction[1] * i
-                if 0 <= end_row < 8 and 0 <= end_col < 8:  # kontrola, ze jsme na sachovnici
-                    if not piece_pinned or pin_direction == direction or pin_direction == (
-                            -direction[0], -direction[0]):
-                        end_piece = game.board[end_row][end_col]
-                        if end_piece is None:
-                            moves.append(Move((r, c), (end_row, end_col), game.board))
-                        elif end_piece.color == enemy_color:
-                            moves.append(Move((r, c), (end_row, end_col), game.board))
-                            break
-                        else:
-                            # spratelena figura
-                            break
-        return moves
+        :param moves: buffer pro kody tahu
+        :param count: pocet tahu, ktere uz v bufferu jsou
+        :param captures_only: generovat pouze brani
+        :return: pocet tahu v bufferu
+        """
+        # figura v pinu se smi pohybovat jen po primce pinu
+        pin_direction = game.pin_table[sq]
+        squares = game.squares
+        enemy_sign = -1 if game.white_to_move else 1
+        for direction, ray in DIAGONAL_RAYS[sq]:
+            if not pin_direction or pin_direction == direction or pin_direction == -direction:
+                for end_sq in ray:
+                    end_piece = squares[end_sq]
+                    if end_piece == EMPTY:
+                        if not captures_only:
+                            moves[count] = sq | end_sq << MOVE_TO_SHIFT
+                            count += 1
+                    elif end_piece * enemy_sign > 0:
+                        moves[count] = sq | end_sq << MOVE_TO_SHIFT | MOVE_CAPTURE
+                        count += 1
+                        break
+                    else:
+                        # spratelena figura
+                        break
+        return count
 
     @staticmethod
-    def generate_pseudo_legal_orthogonal_moves(r: int, c: int, game: ChessGame) -> List[Move]:
+    def generate_pseudo_legal_orthogonal_moves(sq: int, game: ChessGame, moves: array, count: int,
+                                               captures_only: bool = False) -> int:
         """
-        Metoda vraci vsechny pseudo-legalni tahy po primkach a pouziva se pro generovani tahu veze a damy
-        :param r: index radku sachovnice
-        :param c: index sloupce sachovnice
+        Metoda generuje vsechny pseudo-legalni tahy po primkach a pouziva se pro generovani tahu veze a damy
+        :param sq: index pole sachovnice (0x88)
         :param game: objekt partie
-        :return: list pseudo-legalnich tahu
-        """
-        moves = []
-        piece_pinned = False
-        pin_direction = ()
-        for i in range(len(game.pins) - 1, -1, -1):
-            if game.pins[i][0] == r and game.pins[i][1] == c:
-                piece_pinned = True
-                pin_direction = (game.pins[i][2], game.pins[i][3])
-                game.pins.remove(game.pins[i])
-                break
-        directions = ((-1, 0), (0, -1), (1, 0), (0, 1))
-        enemy_color = BLACK if game.white_to_move else WHITE
-        for direction in directions:
-            for i in range(1, 8):
-                end_row = r + direction[0] * i
-                end_col = c + direction[1] * i
-                if 0 <= end_row < 8 and 0 <= end_col < 8:  # kontrola, ze jsme na sachovnici
-                    if not piece_pinned or pin_direction == direction or pin_direction == (
-                            -direction[0], -direction[0]):
-                        end_piece = game.board[end_row][end_col]
-                        if end_piece is None:
-                            moves.append(Move((r, c), (end_row, end_col), game.board))
-                        elif end_piece.color == enemy_color:
-                            moves.append(Move((r, c), (end_row, end_col), game.board))
-                            break
-                        else:
-                            # spratelena figura
-                            break
-        return moves
+        :param moves: buffer pro kody tahu
+        :param count: pocet tahu, ktere uz v bufferu jsou
+        :param captures_only: generovat pouze brani
+        :return: pocet tahu v bufferu
+        """
+        # figura v pinu se smi pohybovat jen po primce pinu
+        pin_direction = game.pin_table[sq]
+        squares = game.squares
+        enemy_sign = -1 if game.white_to_move else 1
+        for direction, ray in ORTHOGONAL_RAYS[sq]:
+            if not pin_direction or pin_direction == direction or pin_direction == -direction:
+                for end_sq in ray:
+                    end_piece = squares[end_sq]
+                    if end_piece == EMPTY:
+                        if not captures_only:
+                            moves[count] = sq | end_sq << MOVE_TO_SHIFT
+                            count += 1
+                    elif end_piece * enemy_sign > 0:
+                        moves[count] = sq | end_sq << MOVE_TO_SHIFT | MOVE_CAPTURE
+                        count += 1
+                        break
+                    else:
+                        # spratelena figura
+                        break
+        return count
 
 
 class Pawn(Piece):
     piece_type = PieceType.PAWN
     symbol = 'p'
 
-    def generate_pseudo_legal_moves(self, r: int, c: int, game: ChessGame) -> List[Move]:
+    def generate_pseudo_legal_moves(self, sq: int, game: ChessGame, moves: array, count: int,
+                                    captures_only: bool = False) -> int:
         """
         Metoda generuje vsechny pseudo-legalni tahy pesce. Zde zkoumame moznost posunu o jedno nebo dve pole dopredu,
         brani doprava a doleva, brani mimochodem i promenu pesce
-        :param r: index radku sachovnice
-        :param c: index sloupce sachovnice
+        :param sq: index pole sachovnice (0x88)
         :param game: objekt partie
-        :return: list pseudo-legalnich tahu
-        """
-        moves: List[Move] = []
-        piece_pinned = False
-        pin_direction = ()
-        # nejprve projdeme vsechny piny a zjistime, zda je nas pesec v pinu
-        for i in range(len(game.pins) - 1, -1, -1):
-            if game.pins[i][0] == r and game.pins[i][1] == c:
-                piece_pinned = True
-                pin_direction = (game.pins[i][2], game.pins[i][3])
-                game.pins.remove(game.pins[i])
-                break
+        :param moves: buffer pro kody tahu
+        :param count: pocet tahu, ktere uz v bufferu jsou
+        :param captures_only: generovat pouze brani (a u pesce promeny)
+        :return: pocet tahu v bufferu
+        """
+        # smer pinu (0, pokud pesec neni v pinu)
+        pin_direction = game.pin_table[sq]
 
+        squares = game.squares
         if self.color == WHITE:
-            # kontrola, zda je mozny posun o jedno pole dopredu
-            if game.board[r - 1][c] is None:
-                if not piece_pinned or pin_direction == (-1, 0):
-                    self.append_moves(r, c, r - 1, c, game, moves)
-                    # kontrola, zda je mozny posun o dve pole dopredu
-                    if r == 6 and game.board[r - 2][c] is None:
-                        self.append_moves(r, c, r - 2, c, game, moves)
-            if c < 7:  # brani doprava
-                # kontrola, jestli na policku, kde chceme brat je souperova figura
-                if game.board[r - 1][c + 1] is not None and game.board[r - 1][c + 1].color == BLACK:
-                    if not piece_pinned or pin_direction == (-1, 1):
-                        self.append_moves(r, c, r - 1, c + 1, game, moves)
-                elif len(game.enpassant_square_log) > 0 and (r - 1, c + 1) == game.enpassant_square_log[-1]:
-                    if not piece_pinned or pin_direction == (-1, 1):
-                        self.append_moves(r, c, r - 1, c + 1, game, moves)
-            if c > 0:  # brani doleva
-                # kontrola, jestli na policku, kde chceme brat je souperova figura
-                if game.board[r - 1][c - 1] is not None and game.board[r - 1][c - 1].color == BLACK:
-                    if not piece_pinned or pin_direction == (-1, -1):
-                        self.append_moves(r, c, r - 1, c - 1, game, moves)
-                elif len(game.enpassant_square_log) > 0 and (r - 1, c - 1) == game.enpassant_square_log[-1]:
-                    if not piece_pinned or pin_direction == (-1, -1):
-                        self.append_moves(r, c, r - 1, c - 1, game, moves)
+            forward, start_row, enemy_sign = -16, 6, -1
         else:
-            # kontrola, zda je mozny posun o jedno pole dopredu
-            if game.board[r + 1][c] is None:
-                if not piece_pinned or pin_direction == (1, 0):
-                    self.append_moves(r, c, r + 1, c, game, moves)
-                    # kontrola, zda je mozny posun o dve pole dopredu
-                    if r == 1 and game.board[r + 2][c] is None:
-                        self.append_moves(r, c, r + 2, c, game, moves)
-            if c < 7:  # brani doprava
-                # kontrola, jestli na policku, kde chceme brat je souperova figura
-                if game.board[r + 1][c + 1] is not None and game.board[r + 1][c + 1].color == WHITE:
-                    if not piece_pinned or pin_direction == (1, 1):
-                        self.append_moves(r, c, r + 1, c + 1, game, moves)
-                elif len(game.enpassant_square_log) > 0 and (r + 1, c + 1) == game.enpassant_square_log[-1]:
-                    if not piece_pinned or pin_direction == (1, 1):
-                        self.append_moves(r, c, r + 1, c + 1, game, moves, is_enpassant=True)
-            if c > 0:  # brani doleva
-                # kontrola, jestli na policku, kde chceme brat je souperova figura
-                if game.board[r + 1][c - 1] is not None and game.board[r + 1][c - 1].color == WHITE:
-                    if not piece_pinned or pin_direction == (1, -1):
-                        self.append_moves(r, c, r + 1, c - 1, game, moves)
-                elif len(game.enpassant_square_log) > 0 and (r + 1, c - 1) == game.enpassant_square_log[-1]:
-                    if not piece_pinned or pin_direction == (1, -1):
-                        self.append_moves(r, c, r + 1, c - 1, game, moves, is_enpassant=True)
-        return moves
+            forward, start_row, enemy_sign = 16, 1, 1
+        # kontrola, zda je mozny posun o jedno pole dopredu (pri generovani brani jen pokud jde o promenu)
+        if squares[sq + forward] == EMPTY and (not captures_only or not 0x10 <= sq + forward < 0x70):
+            if not pin_direction or pin_direction == forward or pin_direction == -forward:
+                count = self.append_moves(sq, sq + forward, moves, count)
+                # kontrola, zda je mozny posun o dve pole dopredu
+                if not captures_only and sq >> 4 == start_row and squares[sq + 2 * forward] == EMPTY:
+                    count = self.append_moves(sq, sq + 2 * forward, moves, count)
+        enpassant_square = game.enpassant_square
+        for capture_direction in (forward - 1, forward + 1):  # brani doleva a doprava
+            end_sq = sq + capture_direction
+            if end_sq & 0x88:
+                continue
+            if pin_direction and pin_direction != capture_direction and pin_direction != -capture_direction:
+                continue
+            # kontrola, jestli na policku, kde chceme brat je souperova figura
+            if squares[end_sq] * enemy_sign > 0:
+                count = self.append_moves(sq, end_sq, moves, count, MOVE_CAPTURE)
+            elif end_sq == enpassant_square and game.is_enpassant_safe(sq, end_sq):
+                count = self.append_moves(sq, end_sq, moves, count, MOVE_CAPTURE | MOVE_ENPASSANT)
+        return count
 
     @staticmethod
-    def append_moves(start_row: int, start_col: int, end_row: int, end_col: int, game: ChessGame, moves: List[Move],
-                     is_enpassant: bool = False) -> None:
+    def append_moves(start_sq: int, end_sq: int, moves: array, count: int, flags: int = 0) -> int:
         """
         Metoda je ciste kvuli tomu, abychom mohli pridat vsechny mozne promeny pesce, jinak by slo tahy pridavat
         primo v metode generate_pseudo_legal_moves.
         """
-        if (game.white_to_move and end_row > 0) or (not game.white_to_move and end_row < 7):
-            moves.append(Move((start_row, start_col), (end_row, end_col), game.board, is_enpassant=is_enpassant))
-        else:
-            moves.append(Move((start_row, start_col), (end_row, end_col), game.board, promotion_type=QUEEN))
-            moves.append(Move((start_row, start_col), (end_row, end_col), game.board, promotion_type=ROOK))
-            moves.append(Move((start_row, start_col), (end_row, end_col), game.board, promotion_type=BISHOP))
-            moves.append(Move((start_row, start_col), (end_row, end_col), game.board, promotion_type=KNIGHT))
+        code = start_sq | end_sq << MOVE_TO_SHIFT | flags
+        if 0x10 <= end_sq < 0x70:  # cilove pole neni na prvni ani posledni rade
+            moves[count] = code
+            return count + 1
+        for promotion_code in (QUEEN_CODE, ROOK_CODE, BISHOP_CODE, KNIGHT_CODE):
+            moves[count] = code | promotion_code << MOVE_PROMOTION_SHIFT
+            count += 1
+        return count
 
 
 class Rook(Piece):
     piece_type = PieceType.ROOK
     symbol = 'R'
 
-    def generate_pseudo_legal_moves(self, r: int, c: int, game: ChessGame) -> List[Move]:
+    def generate_pseudo_legal_moves(self, sq: int, game: ChessGame, moves: array, count: int,
+                                    captures_only: bool = False) -> int:
         """
         Metoda generuje vsechny pseudo-legalni tahy veze. Zde pouze pouzijeme metodu pro generovani tahu po primkach,
         ktera je spolecna pro vez i damu.
-        :param r: index radku sachovnice
-        :param c: index sloupce sachovnice
+        :param sq: index pole sachovnice (0x88)
         :param game: objekt partie
-        :return: list pseudo-legalnich tahu
+        :param moves: buffer pro kody tahu
+        :param count: pocet tahu, ktere uz v bufferu jsou
+        :param captures_only: generovat pouze brani (a u pesce promeny)
+        :return: pocet tahu v bufferu
         """
-        moves: List[Move] = []
-
-        moves.extend(Piece.generate_pseudo_legal_orthogonal_moves(r, c, game) or [])
-
-        return moves
+        return Piece.generate_pseudo_legal_orthogonal_moves(sq, game, moves, count, captures_only)
 
 
 class Knight(Piece):
     piece_type = PieceType.KNIGHT
     symbol = 'N'
 
-    def generate_pseudo_legal_moves(self, r: int, c: int, game: ChessGame) -> List[Move]:
+    def generate_pseudo_legal_moves(self, sq: int, game: ChessGame, moves: array, count: int,
+                                    captures_only: bool = False) -> int:
         """
         Metoda generuje vsechny pseudo-legalni tahy jezdce. Zde musime prozkoumat vsech 8 moznych poli,
         kam muze jezdec tahnout
-        :param r: index radku sachovnice
-        :param c: index sloupce sachovnice
+        :param sq: index pole sachovnice (0x88)
         :param game: objekt partie
-        :return: list pseudo-legalnich tahu
-        """
-        moves: List[Move] = []
-        piece_pinned = False
-        for i in range(len(game.pins) - 1, -1, -1):
-            if game.pins[i][0] == r and game.pins[i][1] == c:
-                piece_pinned = True
-                game.pins.remove(game.pins[i])
-                break
-        directions = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
-        ally_color = WHITE if game.white_to_move else BLACK
-        for direction in directions:
-            end_row = r + direction[0]
-            end_col = c + direction[1]
-            if 0 <= end_row < 8 and 0 <= end_col < 8:
-                if not piece_pinned:
-                    end_piece = game.board[end_row][end_col]
-                    if end_piece is None:
-                        moves.append(Move((r, c), (end_row, end_col), game.board))
-                    elif end_piece.color != ally_color:
-                        moves.append(Move((r, c), (end_row, end_col), game.board))
-        return moves
+        :param moves: buffer pro kody tahu
+        :param count: pocet tahu, ktere uz v bufferu jsou
+        :param captures_only: generovat pouze brani (a u pesce promeny)
+        :return: pocet tahu v bufferu
+        """
+        if game.pin_table[sq]:
+            # jezdec v pinu se nemuze pohnout vubec
+            return count
+        squares = game.squares
+        ally_sign = 1 if game.white_to_move else -1
+        for end_sq in KNIGHT_TARGETS[sq]:
+            # prazdne pole nebo souperova figura
+            end_piece = squares[end_sq] * ally_sign
+            if end_piece < 0:
+                moves[count] = sq | end_sq << MOVE_TO_SHIFT | MOVE_CAPTURE
+                count += 1
+            elif end_piece == EMPTY and not captures_only:
+                moves[count] = sq | end_sq << MOVE_TO_SHIFT
+                count += 1
+        return count
 
 
 class Bishop(Piece):
     piece_type = PieceType.BISHOP
     symbol = 'B'
 
-    def generate_pseudo_legal_moves(self, r: int, c: int, game: ChessGame) -> List[Move]:
+    def generate_pseudo_legal_moves(self, sq: int, game: ChessGame, moves: array, count: int,
+                                    captures_only: bool = False) -> int:
         """
-        Metoda generuje vsechny pseudo-legalni tahy strelce. Zde pouze pouzijeme metodu pro generovani tahu po diagonalach,
-        ktera je spolecna pro strelce i damu
-        :param r: index radku sachovnice
-        :param c: index sloupce sachovnice
+        Metoda generuje vsechny pseudo-legalni tahy strelce. Zde pouze pouzijeme metodu pro generovani tahu po
+        diagonalach, ktera je spolecna pro strelce i damu
+        :param sq: index pole sachovnice (0x88)
         :param game: objekt partie
-        :return: list pseudo-legalnich tahu
+        :param moves: buffer pro kody tahu
+        :param count: pocet tahu, ktere uz v bufferu jsou
+        :param captures_only: generovat pouze brani (a u pesce promeny)
+        :return: pocet tahu v bufferu
         """
-        moves: List[Move] = []
-
-        moves.extend(Piece.generate_pseudo_legal_diagonal_moves(r, c, game) or [])
-
-        return moves
+        return Piece.generate_pseudo_legal_diagonal_moves(sq, game, moves, count, captures_only)
 
 
 class Queen(Piece):
     piece_type = PieceType.QUEEN
     symbol = 'Q'
 
-    def generate_pseudo_legal_moves(self, r: int, c: int, game: ChessGame) -> List[Move]:
+    def generate_pseudo_legal_moves(self, sq: int, game: ChessGame, moves: array, count: int,
+                                    captures_only: bool = False) -> int:
         """
         Metoda generuje vsechny pseudo-legalni tahy damy. Zde pouzijeme metodu pro generovani tahu po primkach,
         ktera je spolecna pro vez i damu a metodu pro generovani tahu po diagonalach, ktera je spolecne pro strelce a
         damu.
-        :param r: index radku sachovnice
-        :param c: index sloupce sachovnice
+        :param sq: index pole sachovnice (0x88)
         :param game: objekt partie
-        :return: list pseudo-legalnich tahu
+        :param moves: buffer pro kody tahu
+        :param count: pocet tahu, ktere uz v bufferu jsou
+        :param captures_only: generovat pouze brani (a u pesce promeny)
+        :return: pocet tahu v bufferu
         """
-        moves: List[Move] = []
-
-        moves.extend(Piece.generate_pseudo_legal_diagonal_moves(r, c, game) or [])
-        moves.extend(Piece.generate_pseudo_legal_orthogonal_moves(r, c, game) or [])
-
-        return moves
+        count = Piece.generate_pseudo_legal_diagonal_moves(sq, game, moves, count, captures_only)
+        return Piece.generate_pseudo_legal_orthogonal_moves(sq, game, moves, count, captures_only)
 
 
 class King(Piece):
     piece_type = PieceType.KING
     symbol = 'K'
 
-    def generate_pseudo_legal_moves(self, r: int, c: int, game: ChessGame) -> List[Move]:
+    def generate_pseudo_legal_moves(self, sq: int, game: ChessGame, moves: array, count: int,
+                                    captures_only: bool = False) -> int:
         """
-        Metoda generuje vsechny kandidaty na tahy pro krale. Zde musime prozkoumat vsech 8 moznych poli, kam muze kral
-        tahnout. Schvalne nevolame metodu pro tahy rosady, protoze se tim dostavame do nekonecne rekurze kvuli volani
-        metody is_square_attacked(), ktera generuje vsechny tahy soupere a tedy i rosadu. Tahy rosady pridavame az v
-        metode generate_legal_moves(). Zde na rozdil od ostatnich figur neresime piny.
-        :param r: index radku sachovnice
-        :param c: index sloupce sachovnice
+        Metoda generuje vsechny tahy krale. Kral muze na kazde z 8 okolnich poli, na ktere neutoci souper - to
+        cteme z mapy utoku (ChessGame.attacked_squares), kterou generate_moves() spocita jednou pro celou pozici.
+        Tahy rosady pridavame az v metode generate_moves(). Zde na rozdil od ostatnich figur neresime piny.
+        :param sq: index pole sachovnice (0x88)
         :param game: objekt partie
-        :return: list pseudo-legalnich tahu
-        """
-        moves: List[Move] = []
-        directions = ((-1, -1), (-1, 0), (-1, 1), (1, 0), (1, 1), (1, -1), (0, -1), (0, 1))
-        ally_color = WHITE if game.white_to_move else BLACK
-        for direction in directions:
-            end_row = r + direction[0]
-            end_col = c + direction[1]
-            if 0 <= end_row < 8 and 0 <= end_col < 8:
-                end_piece = game.board[end_row][end_col]
-                if end_piece is None or end_piece.color != ally_color:
-                    # zkusime krale posunout na cilove pole
-                    if ally_color == WHITE:
-                        game.white_king_position = (end_row, end_col)
-                    else:
-                        game.black_king_position = (end_row, end_col)
-                    in_check, pins, checks = game.check_for_pins_and_checks()
-                    # pokud neni v sachu, tah muzeme pridat
-                    if not in_check:
-                        moves.append(Move((r, c), (end_row, end_col), game.board))
-                    # vracime krale na puvodni pole
-                    if ally_color == WHITE:
-                        game.white_king_position = (r, c)
-                    else:
-                        game.black_king_position = (r, c)
-
-        return moves
+        :param moves: buffer pro kody tahu
+        :param count: pocet tahu, ktere uz v bufferu jsou
+        :param captures_only: generovat pouze brani (a u pesce promeny)
+        :return: pocet tahu v bufferu
+        """
+        squares = game.squares
+        attacked = game.attacked_squares
+        ally_sign = 1 if game.white_to_move else -1
+        for end_sq in KING_TARGETS[sq]:
+            # napadene pole - kral by tam byl v sachu
+            if attacked >> end_sq & 1:
+                continue
+            end_piece = squares[end_sq] * ally_sign
+            if end_piece < 0:
+                moves[count] = sq | end_sq << MOVE_TO_SHIFT | MOVE_CAPTURE
+                count += 1
+            elif end_piece == EMPTY and not captures_only:
+                moves[count] = sq | end_sq << MOVE_TO_SHIFT
+                count += 1
+        return count
 
     @staticmethod
-    def generate_castling_moves(r: int, c: int, game: ChessGame) -> List[Move]:
-        moves = []
+    def generate_castling_moves(sq: int, game: ChessGame, moves: array, count: int) -> int:
         if game.in_check:
-            return moves
+            return count
+        squares = game.squares
+        attacked = game.attacked_squares
+        castling_rights = game.castling_rights
         # kingside rosada - dve pole napravo od krale musi byt na sachovnici, musi byt prazdna a nesmi na ne
         # utocit zadna souperova figura
-        if 0 <= c + 2 < 8 and game.board[r][c + 1] is None and game.board[r][c + 2] is None and \
-                not game.is_square_attacked(r, c + 1) and not game.is_square_attacked(r, c + 2):
-            if (game.white_to_move and game.castling_rights_log[-1].wk) or \
-                    (not game.white_to_move and game.castling_rights_log[-1].bk):
-                moves.append(Move((r, c), (r, c + 2), game.board, is_castle=True))
+        if castling_rights & (CASTLING_WK if game.white_to_move else CASTLING_BK):
+            if (sq & 7) + 2 < 8 and squares[sq + 1] == EMPTY and squares[sq + 2] == EMPTY and \
+                    not attacked & (1 << (sq + 1) | 1 << (sq + 2)):
+                moves[count] = sq | (sq + 2) << MOVE_TO_SHIFT | MOVE_CASTLE
+                count += 1
         # queenside rosada - tri pole nalevo od krale musi byt na sachovnici, musi byt prazdna a na prvni dve nesmi
         # utocit zadna souperova figura
-        if 0 <= c - 3 < 8 and game.board[r][c - 1] is None and game.board[r][c - 2] is None and game.board[r][
-            c - 3] is None and \
-                not game.is_square_attacked(r, c - 1) and not game.is_square_attacked(r, c - 2):
-            if (game.white_to_move and game.castling_rights_log[-1].wq) or \
-                    (not game.white_to_move and game.castling_rights_log[-1].bq):
-                moves.append(Move((r, c), (r, c - 2), game.board, is_castle=True))
+        if castling_rights & (CASTLING_WQ if game.white_to_move else CASTLING_BQ):
+            if (sq & 7) - 3 >= 0 and squares[sq - 1] == EMPTY and squares[sq - 2] == EMPTY and \
+                    squares[sq - 3] == EMPTY and \
+                    not attacked & (1 << (sq - 1) | 1 << (sq - 2)):
+                moves[count] = sq | (sq - 2) << MOVE_TO_SHIFT | MOVE_CASTLE
+                count += 1
+
+        return count
+
+
+# Hodnota figury (material) a jeji pozicni hodnota (piece-square table) pro kazdy kod figury a kazde pole 0x88
+# sachovnice, obe z pohledu barvy dane figury. Indexuje se kodem figury stejne jako PIECES.
+MATERIAL_SCORES: List[int] = [0] * 13
+POSITIONAL_SCORES: List[List[int]] = [[0] * 128 for _ in range(13)]
+for _code in range(1, 7):
+    MATERIAL_SCORES[_code] = MATERIAL_SCORES[-_code] = PIECE_VALUES[_code]
+    for _sq in BOARD_SQUARES:
+        _index = (_sq >> 4) * 8 + (_sq & 7)
+        POSITIONAL_SCORES[_code][_sq] = PIECE_TABLES[_code][63 - _index]
+        POSITIONAL_SCORES[-_code][_sq] = PIECE_TABLES[_code][_index]
+
+
+# Kazda figura je bezstavova (krome barvy), takze pro kazdy kod staci jedna sdilena instance. List se indexuje primo
+# kodem figury - zaporne kody cernych figur diky zapornym indexum v Pythonu miri na konec listu.
+PIECES: List[Union[Piece, None]] = [None] * 13
+for _piece_class in (Pawn, Knight, Bishop, Rook, Queen, King):
+    PIECES[PIECE_TYPE_CODES[_piece_class.piece_type]] = _piece_class(WHITE)
+    PIECES[-PIECE_TYPE_CODES[_piece_class.piece_type]] = _piece_class(BLACK)
+# kody figur jednotlivych barev (pro pruchod seznamy poli figur, viz ChessGame.piece_squares)
+WHITE_PIECE_CODES: Tuple[int, ...] = (PAWN_CODE, KNIGHT_CODE, BISHOP_CODE, ROOK_CODE, QUEEN_CODE, KING_CODE)
+BLACK_PIECE_CODES: Tuple[int, ...] = tuple(-code for code in WHITE_PIECE_CODES)
+
+
+class BoardRowView:
+    """
+    Jeden radek pohledu BoardView.
+    """
+    def __init__(self, squares: array, r: int) -> None:
+        self.squares = squares
+        self.offset = r << 4
 
-        return moves
+    def __getitem__(self, c: int) -> Union[Piece, None]:
+        if not 0 <= c < 8:
+            raise IndexError(c)
+        return PIECES[self.squares[self.offset + c]]
+
+    def __setitem__(self, c: int, piece: Union[Piece, None]) -> None:
+        if not 0 <= c < 8:
+            raise IndexError(c)
+        self.squares[self.offset + c] = piece.code if piece is not None else EMPTY
+
+    def __len__(self) -> int:
+        return 8
+
+
+class BoardView:
+    """
+    Tenky pohled na sachovnici ve tvaru puvodniho dvourozmerneho listu board[radek][sloupec], ktery vraci objekty
+    figur. Slouzi pro uzivatelske rozhrani, vnitrne se se sachovnici pracuje primo nad polem ChessGame.squares.
+    """
+    def __init__(self, squares: array) -> None:
+        self.squares = squares
+
+    def __getitem__(self, r: int) -> BoardRowView:
+        if not 0 <= r < 8:
+            raise IndexError(r)
+        return BoardRowView(self.squares, r)
+
+    def __len__(self) -> int:
+        return 8
 
 
 class ChessGame:
     """
     Trida pro sachovou partii.
     """
-    def __init__(self) -> None:
-        self.board: List[List[Union[Piece, None]]] = [
-            [Rook(BLACK), Knight(BLACK), Bishop(BLACK), Queen(BLACK), King(BLACK), Bishop(BLACK), Knight(BLACK),
-             Rook(BLACK)],
-            [Pawn(BLACK), Pawn(BLACK), Pawn(BLACK), Pawn(BLACK), Pawn(BLACK),
-             Pawn(BLACK), Pawn(BLACK), Pawn(BLACK)],
-            [None, None, None, None, None, None, None, None],
-            [None, None, None, None, None, None, None, None],
-            [None, None, None, None, None, None, None, None],
-            [None, None, None, None, None, None, None, None],
-            [Pawn(WHITE), Pawn(WHITE), Pawn(WHITE), Pawn(WHITE), Pawn(WHITE),
-             Pawn(WHITE), Pawn(WHITE), Pawn(WHITE)],
-            [Rook(WHITE), Knight(WHITE), Bishop(WHITE), Queen(WHITE), King(WHITE), Bishop(WHITE), Knight(WHITE),
-             Rook(WHITE)]]
+    def __init__(self, fen: str = STARTING_FEN) -> None:
+        """
+        :param fen: vychozi pozice ve FEN notaci, standardne zakladni postaveni
+        """
+        # sachovnice v 0x88 reprezentaci, viz BOARD_SQUARES
+        self.squares: array = array('b', [EMPTY] * 128)
+        # pohled radek/sloupec pro UI
+        self.board: BoardView = BoardView(self.squares)
 
         self.white_to_move: bool = True
-        self.move_stack: List[Move] = []
-        self.white_king_position: Tuple[int, int] = (7, 4)
-        self.black_king_position: Tuple[int, int] = (0, 4)
+        # provedene tahy (kody tahu) kvuli vraceni tahu
+        self.move_stack: List[int] = []
+        self.white_king_square: int = NO_SQUARE
+        self.black_king_square: int = NO_SQUARE
         self.in_check = False
+        # piny a sachy jsou dvojice (pole, smer od krale)
         self.pins: List[Tuple[int, int]] = []
         self.checks: List[Tuple[int, int]] = []
+        # pin_table[pole] je smer od krale k figure v pinu na danem poli, 0 pro figury, ktere v pinu nejsou. Nastavuje
+        # se v generate_moves() podle self.pins a generatory ji jen ctou, takze je lze volat v libovolnem poradi.
+        self.pin_table: array = array('b', bytes(128))
         self.game_result: Union[GameResult, None] = None
-        # list souradnic poli, kde bylo mozne brat mimochodem - je potreba udrzovat list jako vyvoj tohoto
-        # pole kvuli vraceni tahu, abychom mohli obnovovat spravne pole pro brani mimochodem
-        self.enpassant_square_log: List[Tuple] = []
-        # log prav pro rosady, kvuli vraceni tahu musime udrzovat
-        self.castling_rights_log: List[CastlingRights] = [CastlingRights(True, True, True, True)]
+        # zasobnik stavu pozic (viz pack_state()) - prava na rosadu, pole pro brani mimochodem, brana figura a pocet
+        # pultahu pro pravidlo 50 tahu. Prvek se prida pri kazdem tahu, vraceni tahu stav obnovi jednim odebranim,
+        # posledni prvek plati pro aktualni pozici.
+        self.state_stack: List[int] = [pack_state(CASTLING_ALL, NO_SQUARE, EMPTY, 0)]
+        # cislo tahu, zvysuje se po kazdem tahu cerneho
+        self.fullmove_number: int = 1
+        # Zobrist hash pozice, aktualizuje se prubezne v make_move() a unmake_move()
+        self.zobrist_key: int = 0
+        # hashe pozic pred kazdym provedenym tahem (zasobnik paralelni s move_stack) pro zjistovani opakovani pozice
+        self.key_history: List[int] = []
+        # prubezne udrzovany material a pozicni hodnota figur [bily, cerny], aktualizuje se v make_move()
+        # a unmake_move()
+        self.material_score: List[int] = [0, 0]
+        self.positional_score: List[int] = [0, 0]
+        # pole figur podle kodu figury (indexuje se kodem stejne jako PIECES) a pocet figur [bily, cerny] vcetne
+        # kralu, udrzuji se prubezne v make_move() a unmake_move(), aby se figury nemusely hledat na cele sachovnici
+        self.piece_squares: List[List[int]] = [[] for _ in range(13)]
+        self.piece_counts: List[int] = [0, 0]
+        # buffer pro generate_legal_moves(), hledani si drzi vlastni buffery pro kazdy pultah
+        self._move_buffer: array = new_move_buffer()
+        # mapa utoku soupere hrace na tahu (bitova maska poli 0x88), pocita se v generate_moves()
+        self.attacked_squares: int = 0
+        # rozmisteni figur a zbyvajici stav nastavime podle FEN
+        self.load_fen(fen)
+
+    def load_fen(self, fen: str) -> None:
+        """
+        Metoda nastavi pozici podle FEN notace (rozmisteni figur, hrac na tahu, prava na rosadu, pole pro brani
+        mimochodem, pocet pultahu od brani nebo tahu pescem a cislo tahu). Posledni dve pole jsou nepovinna (chybi
+        napr. v EPD), vychozi hodnoty jsou 0 a 1. Historie tahu se smaze.
+        :param fen: pozice ve FEN notaci
+        """
+        fields = fen.split()
+        if len(fields) < 4 or len(fields) > 6 or not all(field.isdigit() for field in fields[4:]):
+            raise Exception(f'Invalid FEN: {fen}')
+        rows = fields[0].split('/')
+        if len(rows) != 8:
+            raise Exception(f'Invalid FEN: {fen}')
+        for sq in BOARD_SQUARES:
+            self.squares[sq] = EMPTY
+        king_squares = {KING_CODE: NO_SQUARE, -KING_CODE: NO_SQUARE}
+        for r in range(8):
+            c = 0
+            for symbol in rows[r]:
+                if symbol.isdigit():
+                    c += int(symbol)
+                    continue
+                if symbol.upper() not in FEN_PIECE_CODES or c > 7:
+                    raise Exception(f'Invalid FEN: {fen}')
+                code = FEN_PIECE_CODES[symbol.upper()] if symbol.isupper() else -FEN_PIECE_CODES[symbol.upper()]
+                self.squares[to_square(r, c)] = code
+                if code in king_squares:
+                    king_squares[code] = to_square(r, c)
+                c += 1
+            if c != 8:
+                raise Exception(f'Invalid FEN: {fen}')
+        if NO_SQUARE in king_squares.values() or fields[1] not in ('w', 'b'):
+            raise Exception(f'Invalid FEN: {fen}')
+        self.white_king_square = king_squares[KING_CODE]
+        self.black_king_square = king_squares[-KING_CODE]
+        self.white_to_move = fields[1] == 'w'
+        castling_rights = ('K' in fields[2]) * CASTLING_WK | ('Q' in fields[2]) * CASTLING_WQ | \
+            ('k' in fields[2]) * CASTLING_BK | ('q' in fields[2]) * CASTLING_BQ
+        enpassant_square = NO_SQUARE
+        if fields[3] != '-':
+            if len(fields[3]) != 2 or fields[3][0] not in Move.files or fields[3][1] not in Move.ranks:
+                raise Exception(f'Invalid FEN: {fen}')
+            enpassant_square = to_square(Move.ranks_to_rows[fields[3][1]], Move.files_to_cols[fields[3][0]])
+        self.state_stack = [pack_state(castling_rights, enpassant_square, EMPTY,
+                                       int(fields[4]) if len(fields) > 4 else 0)]
+        self.fullmove_number = max(1, int(fields[5])) if len(fields) > 5 else 1
+        self.move_stack = []
+        self.key_history = []
+        self.in_check = False
+        self.pins = []
+        self.checks = []
+        self.pin_table = array('b', bytes(128))
+        self.game_result = None
+        self.zobrist_key = self.compute_zobrist_key()
+        self.compute_scores()
+        self.compute_piece_squares()
+
+    def get_fen(self) -> str:
+        """
+        Metoda vraci aktualni pozici ve FEN notaci (opak load_fen()).
+        :return: pozice ve FEN notaci
+        """
+        rows = []
+        for r in range(8):
+            row = ''
+            empty = 0
+            for c in range(8):
+                code = self.squares[to_square(r, c)]
+                if code == EMPTY:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                symbol = FEN_PIECE_SYMBOLS[abs(code)]
+                row += symbol if code > 0 else symbol.lower()
+            if empty:
+                row += str(empty)
+            rows.append(row)
+        castling_rights = self.castling_rights
+        castling = ('K' if castling_rights & CASTLING_WK else '') + ('Q' if castling_rights & CASTLING_WQ else '') + \
+            ('k' if castling_rights & CASTLING_BK else '') + ('q' if castling_rights & CASTLING_BQ else '')
+        enpassant_square = self.enpassant_square
+        if enpassant_square != NO_SQUARE:
+            r, c = to_row_col(enpassant_square)
+            enpassant = Move.cols_to_files[c] + Move.rows_to_ranks[r]
+        else:
+            enpassant = '-'
+        return f'{"/".join(rows)} {"w" if self.white_to_move else "b"} {castling or "-"} {enpassant} ' \
+               f'{self.halfmove_clock} {self.fullmove_number}'
+
+    @property
+    def halfmove_clock(self) -> int:
+        """
+        Pocet pultahu od posledniho brani nebo tahu pescem.
+        """
+        return self.state_stack[-1] >> STATE_HALFMOVE_SHIFT
+
+    @property
+    def castling_rights(self) -> int:
+        """
+        Prava na rosadu v aktualni pozici (bity CASTLING_*).
+        """
+        return self.state_stack[-1] & CASTLING_ALL
+
+    @property
+    def enpassant_square(self) -> int:
+        """
+        Pole, kam lze v aktualni pozici brat mimochodem, nebo NO_SQUARE.
+        """
+        enpassant = (self.state_stack[-1] >> STATE_ENPASSANT_SHIFT) & 0xFF
+        return enpassant if enpassant != STATE_NO_ENPASSANT else NO_SQUARE
+
+    def repetition_count(self) -> int:
+        """
+        Metoda spocita, kolikrat se aktualni pozice v partii vyskytla (vcetne aktualniho vyskytu). Prohledavaji se
+        jen pozice se stejnym hracem na tahu od posledniho nevratneho tahu (brani nebo tahu pescem) - pred nim se
+        stejna pozice vyskytnout nemohla.
+        :return: pocet vyskytu aktualni pozice
+        """
+        key = self.zobrist_key
+        history = self.key_history
+        count = 1
+        for i in range(len(history) - 4, len(history) - 1 - min(self.halfmove_clock, len(history)), -2):
+            if history[i] == key:
+                count += 1
+        return count
+
+    def is_repetition(self) -> bool:
+        """
+        Metoda zjisti, zda se aktualni pozice uz v partii vyskytla (pro hledani, kde se opakovani hodnoti jako
+        remiza hned, viz repetition_count()).
+        """
+        key = self.zobrist_key
+        history = self.key_history
+        for i in range(len(history) - 4, len(history) - 1 - min(self.halfmove_clock, len(history)), -2):
+            if history[i] == key:
+                return True
+        return False
 
     def do_move(self, move: Move) -> None:
+        """
+        Metoda provadi tah, ktery ji byl predan na vstupu (viz make_move()).
+        :param move: objekt tahu, ktery ma metoda provest
+        """
+        self.make_move(move.code)
+
+    def undo_move(self) -> Union[Move, None]:
+        """
+        Metoda vraci posledni tah (viz unmake_move()).
+        :return: objekt vraceneho tahu, nebo None, pokud neni co vracet
+        """
+        if len(self.move_stack) == 0:
+            return None
+        code = self.unmake_move()
+        return Move.from_code(code, self.squares)
+
+    def make_move(self, code: int) -> None:
         """
         Metoda provadi tah, ktery ji byl predan na vstupu. Uvolni puvodni pole a na cilove pole umisti figuru,
         ktera tahne. Tah se ulozi do seznamu tahu. Pote se prehodi hrac, ktery je na tahu a updatuje se pozice krale,
         pokud se tahlo kralem. Dale se zkoumaji specialni typy tahu: promena pesce, brani mimochodem a rosada
-        :param move: objekt tahu, ktery ma metoda provest
+        :param code: kod tahu (viz encode_move())
         """
-        self.board[move.start_row][move.start_col] = None
-        self.board[move.end_row][move.end_col] = move.piece_moved
-        self.move_stack.append(move)  # ulozime si tah, abychom ho pozdeji mohli vratit
+        squares = self.squares
+        start_sq = code & 0x7F
+        end_sq = (code >> MOVE_TO_SHIFT) & 0x7F
+        moved = squares[start_sq]
+        # brany pesec pri brani mimochodem stoji na radku vychoziho pole a ve sloupci ciloveho pole
+        captured_sq = end_sq if not code & MOVE_ENPASSANT else (start_sq & 0x70) | (end_sq & 7)
+        captured = squares[captured_sq]
+        key = self.zobrist_key
+        # z hashe odebereme prava na rosadu a pole pro brani mimochodem pred tahem, figury a hrace na tahu
+        self.zobrist_key ^= self._get_state_zobrist_key() ^ self._get_move_zobrist_key(code, moved, captured) ^ \
+            ZOBRIST_BLACK_TO_MOVE
+        squares[start_sq] = EMPTY
+        squares[captured_sq] = EMPTY
+        squares[end_sq] = moved
+        # ulozime si tah a brane figury, abychom tah pozdeji mohli vratit
+        self.key_history.append(key)
+        self.move_stack.append(code)
+        if moved < 0:
+            self.fullmove_number += 1
         self.change_turn()
-        if move.piece_moved.piece_type == KING and move.piece_moved.color == WHITE:
-            self.white_king_position = (move.end_row, move.end_col)
-        elif move.piece_moved.piece_type == KING and move.piece_moved.color == BLACK:
-            self.black_king_position = (move.end_row, move.end_col)
+        if moved == KING_CODE:
+            self.white_king_square = end_sq
+        elif moved == -KING_CODE:
+            self.black_king_square = end_sq
         # promena pesce
-        if move.is_pawn_promotion:
-            new_piece = create_piece(move.piece_moved.color, move.promotion_type)
-            self.board[move.end_row][move.end_col] = new_piece
-
-        # brani mimochodem
-        if move.is_enpassant:
-            # tady specialne musime odstranit figuru z jineho pole nez kam smeroval tah
-            self.board[move.start_row][move.end_col] = None
-
-        # enpassant_square update
-        # jestlize mame tah pescem a o 2 pole, tak je jedno pole jako kandidat pro brani mimochodem
-        if move.piece_moved.piece_type == PAWN and abs(move.start_row - move.end_row) == 2:
-            self.enpassant_square_log.append(((move.start_row + move.end_row) // 2, move.end_col))
-        else:
-            self.enpassant_square_log.append(())  # resetujeme enpassant pole
+        promotion_code = (code >> MOVE_PROMOTION_SHIFT) & 7
+        if promotion_code:
+            squares[end_sq] = promotion_code if moved > 0 else -promotion_code
 
         # rosada
-        if move.is_castle:
-            if move.end_col - move.start_col == 2:  # kingside rosada
+        if code & MOVE_CASTLE:
+            if end_sq - start_sq == 2:  # kingside rosada
                 # kral uz je presunuty, takze musime presunout uz pouze vez
                 # vime, ze vez skonci vlevo vedle krale a ze byla o jedno pole vpravo od ciloveho pole krale
-                self.board[move.end_row][move.end_col - 1] = self.board[move.end_row][move.end_col + 1]
+                squares[end_sq - 1] = squares[end_sq + 1]
                 # odstranime vez puvodniho pole
-                self.board[move.end_row][move.end_col + 1] = None
+                squares[end_sq + 1] = EMPTY
             else:  # queenside rosada
                 # kral uz je presunuty, takze musime presunout uz pouze vez
                 # vime, ze vez skonci vpravo vedle krale a ze byla o dve pole vlevo od ciloveho pole krale
-                self.board[move.end_row][move.end_col + 1] = self.board[move.end_row][move.end_col - 2]
+                squares[end_sq + 1] = squares[end_sq - 2]
                 # odstranime vez puvodniho pole
-                self.board[move.end_row][move.end_col - 2] = None
-
-        # pravo na rosadu
-        self.update_castling_rights(move)
-        print(f'Do move: {len(self.castling_rights_log)}')
-
-    def undo_move(self) -> Union[Move, None]:
+                squares[end_sq - 2] = EMPTY
+
+        # material a pozicni hodnota, seznamy poli figur
+        self._update_scores(code, moved, captured, 1)
+        self._update_piece_squares(code, moved, captured, 1)
+
+        # novy stav pozice: tah krale nebo veze z vychoziho pole a sebrani veze na vychozim poli rusi pravo na rosadu,
+        # po tahu pescem o dve pole lze brat mimochodem, brani a tah pescem nuluji pocet pultahu
+        state = self.state_stack[-1]
+        castling_rights = state & CASTLING_MASKS[start_sq] & CASTLING_MASKS[end_sq] & CASTLING_ALL
+        if moved == PAWN_CODE or moved == -PAWN_CODE:
+            enpassant = (start_sq + end_sq) // 2 if abs(start_sq - end_sq) == 32 else STATE_NO_ENPASSANT
+            halfmove_clock = 0
+        else:
+            enpassant = STATE_NO_ENPASSANT
+            halfmove_clock = 0 if captured else (state >> STATE_HALFMOVE_SHIFT) + 1
+        self.state_stack.append(castling_rights | enpassant << STATE_ENPASSANT_SHIFT |
+                                (captured + 6) << STATE_CAPTURED_SHIFT | halfmove_clock << STATE_HALFMOVE_SHIFT)
+        # do hashe pridame nova prava na rosadu a nove pole pro brani mimochodem
+        self.zobrist_key ^= self._get_state_zobrist_key()
+
+    def unmake_move(self) -> int:
         """
-        Metoda vraci tah. Tah si vezme ze seznamu tahu, vyhozenou figuru (pokud nejaka je) vrati zpatky a figuru,
-        ktera tahla vrati na puvodni pole. Dale prehodi hrace, ktery je na tahu. Pokud byl tah specialni (rosada,
-        en passant nebo promena pesce), musime vse dat do puvodniho stavu, k tomu mame napr. log prav na rosadu
+        Metoda vraci posledni tah. Tah si vezme ze seznamu tahu, vyhozenou figuru (pokud nejaka je) vrati zpatky a
+        figuru, ktera tahla vrati na puvodni pole. Dale prehodi hrace, ktery je na tahu. Pokud byl tah specialni
+        (rosada, en passant nebo promena pesce), musime vse dat do puvodniho stavu. Stav pozice pred tahem (prava na
+        rosadu, pole pro brani mimochodem, pocet pultahu) obnovi odebrani posledniho prvku state_stack, hash pozice
+        pred tahem je v key_history.
+        :return: kod vraceneho tahu
         """
-        if len(self.move_stack) == 0:
-            return None
-        move = self.move_stack.pop()
-        self.board[move.start_row][move.start_col] = move.piece_moved
-        self.board[move.end_row][move.end_col] = move.piece_captured
+        code = self.move_stack.pop()
+        captured = ((self.state_stack.pop() >> STATE_CAPTURED_SHIFT) & 0xF) - 6
+        self.zobrist_key = self.key_history.pop()
+        squares = self.squares
+        start_sq = code & 0x7F
+        end_sq = (code >> MOVE_TO_SHIFT) & 0x7F
+        moved = squares[end_sq]
+        if (code >> MOVE_PROMOTION_SHIFT) & 7:
+            # na cilovem poli stoji figura, ve kterou se pesec promenil
+            moved = PAWN_CODE if moved > 0 else -PAWN_CODE
+        squares[start_sq] = moved
+        if code & MOVE_ENPASSANT:
+            squares[end_sq] = EMPTY
+            squares[(start_sq & 0x70) | (end_sq & 7)] = captured
+        else:
+            squares[end_sq] = captured
         self.change_turn()
-        if move.piece_moved.piece_type == KING and move.piece_moved.color == WHITE:
-            self.white_king_position = (move.start_row, move.start_col)
-        elif move.piece_moved.piece_type == KING and move.piece_moved.color == BLACK:
-            self.black_king_position = (move.start_row, move.start_col)
-        if move.is_enpassant:
-            self.board[move.end_row][move.end_col] = None
-            self.board[move.start_row][move.end_col] = move.piece_captured
-        # musime znovu nastavit stejne enpassant pole jako bylo pred tahem
-        self.enpassant_square_log.pop()
-        # prava na rosady
-        self.castling_rights_log.pop()
+        if moved < 0:
+            self.fullmove_number -= 1
+        if moved == KING_CODE:
+            self.white_king_square = start_sq
+        elif moved == -KING_CODE:
+            self.black_king_square = start_sq
         # rosada
-        if move.is_castle:
-            if move.end_col - move.start_col == 2:  # kingside rosada
-                self.board[move.end_row][move.end_col + 1] = self.board[move.end_row][move.end_col - 1]
-                self.board[move.end_row][move.end_col - 1] = None
+        if code & MOVE_CASTLE:
+            if end_sq - start_sq == 2:  # kingside rosada
+                squares[end_sq + 1] = squares[end_sq - 1]
+                squares[end_sq - 1] = EMPTY
             else:  # queenside
-                self.board[move.end_row][move.end_col - 2] = self.board[move.end_row][move.end_col + 1]
-                self.board[move.end_row][move.end_col + 1] = None
+                squares[end_sq - 2] = squares[end_sq + 1]
+                squares[end_sq + 1] = EMPTY
+        self._update_scores(code, moved, captured, -1)
+        self._update_piece_squares(code, moved, captured, -1)
         self.game_result = None
-        print(f'Undo move: {len(self.castling_rights_log)}')
-        return move
+        return code
+
+    def compute_scores(self) -> None:
+        """
+        Metoda spocita material a pozicni hodnotu figur obou hracu od zacatku. Za partie se hodnoty udrzuji prubezne
+        v make_move() a unmake_move(), tato metoda slouzi pro inicializaci a kontrolu.
+        """
+        self.material_score = [0, 0]
+        self.positional_score = [0, 0]
+        for sq in BOARD_SQUARES:
+            code = self.squares[sq]
+            if code != EMPTY:
+                color = 0 if code > 0 else 1
+                self.material_score[color] += MATERIAL_SCORES[code]
+                self.positional_score[color] += POSITIONAL_SCORES[code][sq]
+
+    def compute_piece_squares(self) -> None:
+        """
+        Metoda sestavi seznamy poli figur a pocty figur od zacatku (viz compute_scores()).
+        """
+        self.piece_squares = [[] for _ in range(13)]
+        self.piece_counts = [0, 0]
+        for sq in BOARD_SQUARES:
+            code = self.squares[sq]
+            if code != EMPTY:
+                self.piece_squares[code].append(sq)
+                self.piece_counts[0 if code > 0 else 1] += 1
+
+    def _update_piece_squares(self, code: int, moved: int, captured: int, sign: int) -> None:
+        """
+        Metoda upravi seznamy poli figur a pocty figur o zmenu, kterou zpusobi tah (viz _update_scores()).
+        :param code: kod tahu
+        :param moved: kod tahnouci figury (pred pripadnou promenou)
+        :param captured: kod brane figury (EMPTY, pokud tah nic nebere)
+        :param sign: 1 pri provedeni tahu, -1 pri jeho vraceni
+        """
+        start_sq = code & 0x7F
+        end_sq = (code >> MOVE_TO_SHIFT) & 0x7F
+        piece_squares = self.piece_squares
+        promotion_code = (code >> MOVE_PROMOTION_SHIFT) & 7
+        if promotion_code:
+            promoted_squares = piece_squares[promotion_code if moved > 0 else -promotion_code]
+            if sign > 0:
+                piece_squares[moved].remove(start_sq)
+                promoted_squares.append(end_sq)
+            else:
+                promoted_squares.remove(end_sq)
+                piece_squares[moved].append(start_sq)
+        else:
+            moved_squares = piece_squares[moved]
+            if sign > 0:
+                moved_squares[moved_squares.index(start_sq)] = end_sq
+            else:
+                moved_squares[moved_squares.index(end_sq)] = start_sq
+        if captured != EMPTY:
+            captured_sq = end_sq if not code & MOVE_ENPASSANT else (start_sq & 0x70) | (end_sq & 7)
+            if sign > 0:
+                piece_squares[captured].remove(captured_sq)
+            else:
+                piece_squares[captured].append(captured_sq)
+            self.piece_counts[0 if captured > 0 else 1] -= sign
+        if code & MOVE_CASTLE:
+            rook_squares = piece_squares[ROOK_CODE if moved > 0 else -ROOK_CODE]
+            if end_sq - start_sq == 2:  # kingside rosada
+                rook_from, rook_to = end_sq + 1, end_sq - 1
+            else:  # queenside rosada
+                rook_from, rook_to = end_sq - 2, end_sq + 1
+            if sign < 0:
+                rook_from, rook_to = rook_to, rook_from
+            rook_squares[rook_squares.index(rook_from)] = rook_to
+
+    def _update_scores(self, code: int, moved: int, captured: int, sign: int) -> None:
+        """
+        Metoda upravi material a pozicni hodnotu o zmenu, kterou zpusobi tah (vcetne promeny pesce, brani mimochodem
+        a presunu veze pri rosade).
+        :param code: kod tahu
+        :param moved: kod tahnouci figury (pred pripadnou promenou)
+        :param captured: kod brane figury (EMPTY, pokud tah nic nebere)
+        :param sign: 1 pri provedeni tahu, -1 pri jeho vraceni
+        """
+        start_sq = code & 0x7F
+        end_sq = (code >> MOVE_TO_SHIFT) & 0x7F
+        color = 0 if moved > 0 else 1
+        positional_score = self.positional_score
+        end_code = moved
+        promotion_code = (code >> MOVE_PROMOTION_SHIFT) & 7
+        if promotion_code:
+            end_code = promotion_code if moved > 0 else -promotion_code
+            self.material_score[color] += sign * (MATERIAL_SCORES[end_code] - MATERIAL_SCORES[moved])
+        positional_score[color] += sign * (POSITIONAL_SCORES[end_code][end_sq] - POSITIONAL_SCORES[moved][start_sq])
+        if captured != EMPTY:
+            captured_sq = end_sq if not code & MOVE_ENPASSANT else (start_sq & 0x70) | (end_sq & 7)
+            self.material_score[1 - color] -= sign * MATERIAL_SCORES[captured]
+            positional_score[1 - color] -= sign * POSITIONAL_SCORES[captured][captured_sq]
+        if code & MOVE_CASTLE:
+            rook = ROOK_CODE if moved > 0 else -ROOK_CODE
+            if end_sq - start_sq == 2:  # kingside rosada
+                rook_from, rook_to = end_sq + 1, end_sq - 1
+            else:  # queenside rosada
+                rook_from, rook_to = end_sq - 2, end_sq + 1
+            positional_score[color] += sign * (POSITIONAL_SCORES[rook][rook_to] - POSITIONAL_SCORES[rook][rook_from])
+
+    def compute_zobrist_key(self) -> int:
+        """
+        Metoda spocita Zobrist hash aktualni pozice od zacatku. Za partie se hash udrzuje prubezne v make_move()
+        a unmake_move(), tato metoda slouzi pro inicializaci a kontrolu.
+        :return: 64bitovy hash pozice
+        """
+        key = 0
+        for sq in BOARD_SQUARES:
+            code = self.squares[sq]
+            if code != EMPTY:
+                key ^= ZOBRIST_PIECES[code][sq]
+        if not self.white_to_move:
+            key ^= ZOBRIST_BLACK_TO_MOVE
+        return key ^ self._get_state_zobrist_key()
+
+    def _get_state_zobrist_key(self) -> int:
+        """
+        Metoda vraci cast hashe, ktera odpovida pravum na rosadu a poli pro brani mimochodem. Pole pro brani
+        mimochodem hashujeme jen tehdy, kdyz vedle dvojkrokem posunuteho pesce stoji pesec hrace na tahu (stejne jako
+        Polyglot), jinak by se shodne pozice lisily hashem.
+        :return: cast hashe
+        """
+        key = ZOBRIST_CASTLING[self.castling_rights]
+        enpassant_square = self.enpassant_square
+        if enpassant_square != NO_SQUARE:
+            # pesec, ktery tahl o dve pole, stoji za polem pro brani mimochodem
+            if self.white_to_move:
+                pawn_sq, capturing_pawn = enpassant_square + 16, PAWN_CODE
+            else:
+                pawn_sq, capturing_pawn = enpassant_square - 16, -PAWN_CODE
+            if (not (pawn_sq - 1) & 0x88 and self.squares[pawn_sq - 1] == capturing_pawn) or \
+                    (not (pawn_sq + 1) & 0x88 and self.squares[pawn_sq + 1] == capturing_pawn):
+                key ^= ZOBRIST_ENPASSANT[enpassant_square & 7]
+        return key
+
+    @staticmethod
+    def _get_move_zobrist_key(code: int, moved: int, captured: int) -> int:
+        """
+        Metoda vraci XOR klicu vsech figur, ktere tah presouva, bere nebo meni (vcetne veze pri rosade).
+        :param code: kod tahu
+        :param moved: kod tahnouci figury (pred pripadnou promenou)
+        :param captured: kod brane figury (EMPTY, pokud tah nic nebere)
+        :return: cast hashe
+        """
+        start_sq = code & 0x7F
+        end_sq = (code >> MOVE_TO_SHIFT) & 0x7F
+        end_code = moved
+        promotion_code = (code >> MOVE_PROMOTION_SHIFT) & 7
+        if promotion_code:
+            end_code = promotion_code if moved > 0 else -promotion_code
+        key = ZOBRIST_PIECES[moved][start_sq] ^ ZOBRIST_PIECES[end_code][end_sq]
+        if captured != EMPTY:
+            captured_sq = end_sq if not code & MOVE_ENPASSANT else (start_sq & 0x70) | (end_sq & 7)
+            key ^= ZOBRIST_PIECES[captured][captured_sq]
+        if code & MOVE_CASTLE:
+            rook = ROOK_CODE if moved > 0 else -ROOK_CODE
+            if end_sq - start_sq == 2:  # kingside rosada
+                key ^= ZOBRIST_PIECES[rook][end_sq + 1] ^ ZOBRIST_PIECES[rook][end_sq - 1]
+            else:  # queenside rosada
+                key ^= ZOBRIST_PIECES[rook][end_sq - 2] ^ ZOBRIST_PIECES[rook][end_sq + 1]
+        return key
 
     def change_turn(self) -> None:
         """
@@ -781,138 +1455,211 @@ class ChessGame:
         """
         self.white_to_move = not self.white_to_move
 
-    def update_castling_rights(self, move: Move) -> None:
+    def generate_legal_moves(self, captures_only: bool = False) -> List[Move]:
         """
-        Metoda aktualizuje prava na rosady pro oba hrace
-        :param move: tah, ktery provadime
+        Metoda generuje legalni tahy jako objekty Move (pro UI a notaci). Samotne generovani je v generate_moves().
+        Notace tahu (Move.san) se pocita az pri cteni. Rezim captures_only generuje pouze brani a promeny pesce.
+        Pokud je hrac v sachu, vraci i v tomto rezimu vsechny uniky ze sachu, aby slo poznat mat.
+        :param captures_only: generovat pouze brani a promeny pesce
+        :return: list legalnich tahu
         """
-        # nacteme si posledni prava na rosadu
-        current_castling_rights = self.castling_rights_log[-1]
-        if move.piece_moved.piece_type == KING:
-            if move.piece_moved.color == WHITE:
-                # upravime pravo na rosadu - jelikoz se pohnul bily kral, tak mazeme obe prava na rosadu pro bileho
-                self.castling_rights_log.append(CastlingRights(False, current_castling_rights.bk, False,
-                                                               current_castling_rights.bq))
-            else:
-                # upravime pravo na rosadu - jelikoz se pohnul cerny kral, tak mazeme obe prava na rosadu pro cerneho
-                self.castling_rights_log.append(CastlingRights(current_castling_rights.wk, False,
-                                                               current_castling_rights.wq, False))
-        elif move.piece_moved.piece_type == ROOK:
-            # nacteme si posledni prava na rosadu
-            current_castling_rights = self.castling_rights_log[-1]
-            if move.piece_moved.color == WHITE:
-                if move.start_row == 7:
-                    if move.start_col == 0:  # leva vez - mazeme pravo bileho na queenside rosadu
-                        self.castling_rights_log.append(CastlingRights(current_castling_rights.wk,
-                                                                       current_castling_rights.bk,
-                                                                       False,
-                                                                       current_castling_rights.bq))
-                    elif move.start_col == 7:  # prava vez - mazeme pravo bileho na kingside rosadu
-                        self.castling_rights_log.append(CastlingRights(False,
-                                                                       current_castling_rights.bk,
-                                                                       current_castling_rights.wq,
-                                                                       current_castling_rights.bq))
-                    else:
-                        self.castling_rights_log.append(CastlingRights(current_castling_rights.wk,
-                                                                       current_castling_rights.bk,
-                                                                       current_castling_rights.wq,
-                                                                       current_castling_rights.bq))
-                else:
-                    self.castling_rights_log.append(CastlingRights(current_castling_rights.wk,
-                                                                   current_castling_rights.bk,
-                                                                   current_castling_rights.wq,
-                                                                   current_castling_rights.bq))
-            else:
-                if move.start_row == 0:
-                    if move.start_col == 0:  # leva vez - mazeme pravo cerneho na queenside rosadu
-                        self.castling_rights_log.append(CastlingRights(current_castling_rights.wk,
-                                                                       current_castling_rights.bk,
-                                                                       current_castling_rights.wq,
-                                                                       False))
-                    elif move.start_col == 7:  # prava vez - mazeme pravo cerneho na kingside rosadu
-                        self.castling_rights_log.append(CastlingRights(current_castling_rights.wk,
-                                                                       False,
-                                                                       current_castling_rights.wq,
-                                                                       current_castling_rights.bq))
-                    else:
-                        self.castling_rights_log.append(CastlingRights(current_castling_rights.wk,
-                                                                       current_castling_rights.bk,
-                                                                       current_castling_rights.wq,
-                                                                       current_castling_rights.bq))
-                else:
-                    self.castling_rights_log.append(CastlingRights(current_castling_rights.wk,
-                                                                   current_castling_rights.bk,
-                                                                   current_castling_rights.wq,
-                                                                   current_castling_rights.bq))
+        buffer = self._move_buffer
+        count = self.generate_moves(buffer, captures_only)
+        squares = self.squares
+        moves = [Move.from_code(buffer[i], squares) for i in range(count)]
+        # notaci tahu nepocitame hned, kazdy tah si ji spocita sam z ostatnich tahu pultahu, az ji nekdo bude cist
+        for move in moves:
+            move._siblings = moves
+        return moves
+
+    def generate_moves(self, moves: array, captures_only: bool = False) -> int:
+        """
+        Metoda generuje kody legalnich tahu do bufferu. Prvni verze generovani vygenerovala vsechny psude-legalni tahy,
+        pak zkusila kazdy tah provest, vygenerovat vsechny mozne tahy soupere a zjistit timto zpusobem, jestli bychom
+        se nedostali tahem do sachu. Tento postup byl znacne neefektivni, navic vedl k ruznym rekurzivnim situacim,
+        takze soucasny postup je, ze si nejdrive vygenerujeme vsechny pole, odkud je sachovano a vsechna pole, na
+        kterych jsou figury v pinu. Nasledne se metoda deli podle toho, zda je hrac na tahu v sachu (pak tahy generuje
+        generate_evasions()) nebo ne. Metody jednotlivych figur pro generovani pseudo-legalnich tahu uz pocitaji
+        s piny, takze neni nutne kontrolovat, zda se tahem nedostaneme do sachu.
+        Rezim captures_only slouzi pro quiescence search: generuje pouze brani a promeny pesce. Pokud je hrac v sachu,
+        generuje i v tomto rezimu vsechny uniky ze sachu, aby slo poznat mat.
+        :param moves: buffer pro kody tahu (viz new_move_buffer())
+        :param captures_only: generovat pouze brani a promeny pesce
+        :return: pocet legalnich tahu v bufferu
+        """
+        self.prepare_generation()
+        king_sq = self.white_king_square if self.white_to_move else self.black_king_square
+        if self.in_check:
+            return self.generate_evasions(moves)
+        elif captures_only:
+            return self.generate_pseudo_legal_moves(moves, captures_only=True)
         else:
-            self.castling_rights_log.append(CastlingRights(current_castling_rights.wk,
-                                                           current_castling_rights.bk,
-                                                           current_castling_rights.wq,
-                                                           current_castling_rights.bq))
-
-    def generate_legal_moves(self) -> List[Move]:
-        """
-        Metoda generuje legalni tahy. Prvni verze teto metody vygenerovala vsechny psude-legalni tahy, pak zkusila kazdy
-        tah provest, vygenerovat vsechny mozne tahy soupere a zjistit timto zpusobem, jestli bychom se nedostali tahem
-        do sachu. Tento postup byl znacne neefektivni, navic vedl k ruznym rekurzivnim situacim, takze soucasny postup
-        je, ze si nejdrive vygenerujeme vsechny pole, odkud je sachovano a vsechna pole, na kterych jsou figury v pinu.
-        Nasledne se metoda deli podle toho, zda je hrac na tahu v sachu a je potreba s nim neco delat nebo ne. Metody
-        jednotlivych figur pro generovani pseudo-legalnich tahu uz pocitaji s piny, takze neni nutne kontrolovat, zda
-        se tahem nedostaneme do sachu.
-        :return: list legalnich tahu
+            count = self.generate_pseudo_legal_moves(moves)
+            return King.generate_castling_moves(king_sq, self, moves, count)
+
+    def prepare_generation(self) -> None:
         """
+        Metoda pripravi stav pozice, ze ktereho ctou generatory tahu figur: sachy, piny (vcetne tabulky pinu) a mapu
+        utoku soupere. Vola ji generate_moves(), pripadne kdo generuje tahy jen nekterych figur (viz parse_san()).
+        """
+        # tabulka pinu obsahuje prave piny ze self.pins, staci tedy smazat predchozi piny a zapsat nove
+        pin_table = self.pin_table
+        for pin_sq, _ in self.pins:
+            pin_table[pin_sq] = 0
         self.in_check, self.pins, self.checks = self.check_for_pins_and_checks()
-        if self.white_to_move:
-            king_row = self.white_king_position[0]
-            king_col = self.white_king_position[1]
-        else:
-            king_row = self.black_king_position[0]
-            king_col = self.black_king_position[1]
+        for pin_sq, pin_direction in self.pins:
+            pin_table[pin_sq] = pin_direction
+        # tahy krale a rosady ctou napadena pole z mapy utoku, ktera se pocita jednou pro celou pozici
+        self.attacked_squares = self.compute_attack_map()
+
+    def parse_san(self, san: str) -> Move:
+        """
+        Metoda prevede tah v SAN notaci na legalni tah v aktualni pozici. Negeneruje vsechny tahy ani jejich notaci:
+        z ciloveho pole najde figury daneho typu, ktere na nej mohou tahnout (jezdce skokem, dalkove figury prvni
+        figurou na paprsku, pesce podle sloupce), a vygeneruje jen jejich tahy. V sachu vybira z uniku ze sachu.
+        Vraceny tah zna ostatni tahy stejne figury na stejne pole, takze si umi spocitat vlastni notaci.
+        :param san: tah v SAN notaci (napr. Nbd2, exd6 e.p., e8=Q+, O-O)
+        :return: objekt tahu
+        """
+        match = SAN_REGEX.match(san.strip())
+        if match is None:
+            raise Exception(f'Invalid SAN: {san}')
+        squares = self.squares
+        moves = self._move_buffer
+        self.prepare_generation()
+        ally_sign = 1 if self.white_to_move else -1
+        king_sq = self.white_king_square if self.white_to_move else self.black_king_square
+        if match.group('castle') is not None:
+            count = 0 if self.in_check else King.generate_castling_moves(king_sq, self, moves, 0)
+            kingside = len(match.group('castle')) == 3
+            for i in range(count):
+                if (((moves[i] >> MOVE_TO_SHIFT) & 0x7F) > king_sq) == kingside:
+                    move = Move.from_code(moves[i], squares)
+                    move._siblings = [move]
+                    return move
+            raise Exception(f'Invalid move: {san}')
+
+        target = match.group('target')
+        target_sq = to_square(Move.ranks_to_rows[target[1]], Move.files_to_cols[target[0]])
+        piece_code = FEN_PIECE_CODES[match.group('piece') or 'P'] * ally_sign
+        promotion_code = FEN_PIECE_CODES[match.group('promotion')] if match.group('promotion') is not None else 0
         if self.in_check:
-            # pouze jeden sach, muzeme blokovat (u dvojsachu nelze)
-            if len(self.checks) == 1:
-                moves = self.generate_pseudo_legal_moves()
-                check = self.checks[0]
-                check_row = check[0]
-                check_col = check[1]
-                piece_checking = self.board[check_row][check_col]
-                # policka, kam se figura muze pohnout
-                valid_squares = []
-                # jestli sachuje jezdec, musime bud jezdce vzit nebo uhnout kralem
-                if piece_checking.piece_type == KNIGHT:
-                    valid_squares = [(check_row, check_col)]
+            count = self.generate_evasions(moves)
+        else:
+            # vychozi pole figur daneho typu, ktere mohou na cilove pole tahnout
+            if piece_code == PAWN_CODE * ally_sign:
+                forward = -16 * ally_sign
+                if match.group('file') is not None and Move.files_to_cols[match.group('file')] != target_sq & 7:
+                    start_squares = [(target_sq - forward) & 0x70 | Move.files_to_cols[match.group('file')]]
                 else:
-                    for i in range(1, 8):
-                        # check[2] a check[3] jsou smery sachu
-                        valid_square = (king_row + check[2] * i, king_col + check[3] * i)
-                        valid_squares.append(valid_square)
-                        if valid_square[0] == check_row and valid_square[1] == check_col:
-                            break
-                # prochazime list pozpatku, abychom mohli bez obav mazat
-                for i in range(len(moves) - 1, -1, -1):
-                    # pokud tah neni kralem, musi to byt block nebo capture
-                    if moves[i].piece_moved.piece_type != KING:
-                        # jestli tah neblokuje nebo nebere, vyhazujeme ho z listu
-                        if not (moves[i].end_row, moves[i].end_col) in valid_squares:
-                            moves.remove(moves[i])
+                    start_squares = [target_sq - forward, target_sq - 2 * forward]
+            elif piece_code == KNIGHT_CODE * ally_sign:
+                start_squares = KNIGHT_TARGETS[target_sq]
+            elif piece_code == KING_CODE * ally_sign:
+                start_squares = [king_sq]
             else:
-                # dvojity sach, pouze tahy krale jsou povoleny
-                moves = self.generate_pseudo_legal_moves()
-                # prochazime list pozpatku, abychom mohli bez obav mazat
-                for i in range(len(moves) - 1, -1, -1):
-                    if moves[i].piece_moved.piece_type != KING:
-                        moves.remove(moves[i])
+                start_squares = []
+                for rays in (DIAGONAL_RAYS, ORTHOGONAL_RAYS):
+                    for _, ray in rays[target_sq]:
+                        for sq in ray:
+                            if squares[sq] != EMPTY:
+                                start_squares.append(sq)
+                                break
+            count = 0
+            for sq in start_squares:
+                if not sq & 0x88 and squares[sq] == piece_code:
+                    count = PIECES[piece_code].generate_pseudo_legal_moves(sq, self, moves, count)
+        # tahy figur daneho typu na cilove pole, z nich vybereme tah odpovidajici zapisu
+        candidates = [Move.from_code(moves[i], squares) for i in range(count)
+                      if (moves[i] >> MOVE_TO_SHIFT) & 0x7F == target_sq and squares[moves[i] & 0x7F] == piece_code
+                      and not moves[i] & MOVE_CASTLE]
+        matching = [move for move in candidates if (move.code >> MOVE_PROMOTION_SHIFT) & 7 == promotion_code and
+                    (match.group('file') is None or Move.cols_to_files[move.start_col] == match.group('file')) and
+                    (match.group('rank') is None or Move.rows_to_ranks[move.start_row] == match.group('rank'))]
+        if len(matching) != 1:
+            raise Exception(f'Invalid move: {san}' if len(matching) == 0 else f'Ambiguous move: {san}')
+        move = matching[0]
+        move._siblings = candidates
+        return move
+
+    def generate_evasions(self, moves: array) -> int:
+        """
+        Metoda generuje legalni tahy hrace, ktery je v sachu (vola ji generate_moves(), ktera uz spocitala sachy, piny
+        a mapu utoku). Misto generovani vsech tahu a jejich filtrovani generujeme jen tahy, ktere sach resi: tahy
+        krale, a pokud nejde o dvojsach, brani sachujici figury a zablokovani pole mezi ni a kralem. Pro kazde takove
+        cilove pole hledame vlastni figury, ktere na nej mohou tahnout. Figura v pinu sach nikdy vyresit nemuze (primka
+        pinu a primka sachu se protinaji jen na poli krale), proto ji vynechavame.
+        :param moves: buffer pro kody tahu
+        :return: pocet legalnich tahu v bufferu
+        """
+        squares = self.squares
+        pin_table = self.pin_table
+        if self.white_to_move:
+            king_sq, ally_sign, forward, double_push_row = self.white_king_square, 1, -16, 4
         else:
-            moves = self.generate_pseudo_legal_moves()
-            if self.white_to_move:
-                moves.extend(
-                    King.generate_castling_moves(self.white_king_position[0], self.white_king_position[1], self))
+            king_sq, ally_sign, forward, double_push_row = self.black_king_square, -1, 16, 3
+        count = PIECES[KING_CODE * ally_sign].generate_pseudo_legal_moves(king_sq, self, moves, 0)
+        if len(self.checks) != 1:
+            # dvojity sach, pouze tahy krale jsou povoleny
+            return count
+
+        check_sq, check_direction = self.checks[0]
+        if squares[check_sq] == -KNIGHT_CODE * ally_sign:
+            target_squares = [check_sq]
+        else:
+            # pole mezi kralem a sachujici figurou a pole sachujici figury
+            target_squares = []
+            target_sq = king_sq
+            while target_sq != check_sq:
+                target_sq += check_direction
+                target_squares.append(target_sq)
+        own_pawn = PAWN_CODE * ally_sign
+        own_knight = KNIGHT_CODE * ally_sign
+        for target_sq in target_squares:
+            flags = MOVE_CAPTURE if target_sq == check_sq else 0
+            # jezdci
+            for start_sq in KNIGHT_TARGETS[target_sq]:
+                if squares[start_sq] == own_knight and not pin_table[start_sq]:
+                    moves[count] = start_sq | target_sq << MOVE_TO_SHIFT | flags
+                    count += 1
+            # dalkove figury - po kazdem paprsku z ciloveho pole k prvni figure
+            for rays, slider in ((DIAGONAL_RAYS, BISHOP_CODE), (ORTHOGONAL_RAYS, ROOK_CODE)):
+                for direction, ray in rays[target_sq]:
+                    for start_sq in ray:
+                        piece = squares[start_sq] * ally_sign
+                        if piece != EMPTY:
+                            if (piece == slider or piece == QUEEN_CODE) and not pin_table[start_sq]:
+                                moves[count] = start_sq | target_sq << MOVE_TO_SHIFT | flags
+                                count += 1
+                            break
+            # pesci - brani sachujici figury sikmo, blokovani tahem dopredu o jedno nebo dve pole
+            if flags:
+                for start_sq in (target_sq - forward - 1, target_sq - forward + 1):
+                    if not start_sq & 0x88 and squares[start_sq] == own_pawn and not pin_table[start_sq]:
+                        count = Pawn.append_moves(start_sq, target_sq, moves, count, MOVE_CAPTURE)
             else:
-                moves.extend(
-                    King.generate_castling_moves(self.black_king_position[0], self.black_king_position[1], self))
-
-        Move.annotate_moves_san(moves)  # anotujeme vsechny legalni tahy daneho pultahu
-        return moves
+                start_sq = target_sq - forward
+                if start_sq & 0x88:
+                    continue
+                if squares[start_sq] == own_pawn:
+                    if not pin_table[start_sq]:
+                        count = Pawn.append_moves(start_sq, target_sq, moves, count)
+                elif squares[start_sq] == EMPTY and target_sq >> 4 == double_push_row and \
+                        squares[start_sq - forward] == own_pawn and not pin_table[start_sq - forward]:
+                    moves[count] = (start_sq - forward) | target_sq << MOVE_TO_SHIFT
+                    count += 1
+
+        # brani mimochodem - bere sachujiciho pesce, nebo tah na pole pro brani mimochodem sach blokuje
+        enpassant_square = self.enpassant_square
+        if enpassant_square != NO_SQUARE:
+            captured_sq = enpassant_square - forward
+            if captured_sq == check_sq or enpassant_square in target_squares:
+                for start_sq in (captured_sq - 1, captured_sq + 1):
+                    if not start_sq & 0x88 and squares[start_sq] == own_pawn and not pin_table[start_sq] and \
+                            self.is_enpassant_safe(start_sq, enpassant_square):
+                        moves[count] = start_sq | enpassant_square << MOVE_TO_SHIFT | MOVE_CAPTURE | MOVE_ENPASSANT
+                        count += 1
+        return count
 
     def check_for_pins_and_checks(self) -> Tuple[bool, List, List]:
         """
@@ -924,112 +1671,144 @@ class ChessGame:
         pins = []
         checks = []
         in_check = False
+        squares = self.squares
         if self.white_to_move:
-            enemy_color = BLACK
-            ally_color = WHITE
-            start_row = self.white_king_position[0]
-            start_col = self.white_king_position[1]
+            ally_sign = 1
+            start_sq = self.white_king_square
         else:
-            enemy_color = WHITE
-            ally_color = BLACK
-            start_row = self.black_king_position[0]
-            start_col = self.black_king_position[1]
-        directions = ((-1, 0), (0, -1), (1, 0), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
-        for i in range(len(directions)):
-            d = directions[i]
+            ally_sign = -1
+            start_sq = self.black_king_square
+        rays = RAYS[start_sq]
+        for i in range(8):
+            d = QUEEN_DIRECTIONS[i]
             possible_pin = ()
-            for j in range(1, 8):
-                end_row = start_row + d[0] * j
-                end_col = start_col + d[1] * j
-                if 0 <= end_row < 8 and 0 <= end_col < 8:
-                    end_piece = self.board[end_row][end_col]
-                    # posledni cast podminky je kvuli tomu, kdyz generujeme tahy krale, tak docasne kralem pohneme
-                    # a zkoumame, jestli neni v sachu, ale vede to k tomu, ze realna figura krale (nepohnuta) by
-                    # mohla poskytovat ochranu imaginarnimu krali a vytvaret pin
-                    if end_piece is not None and end_piece.color == ally_color and end_piece.piece_type != KING:
-                        # 1. spratelna figura v ceste -> mozny pin
+            for j, end_sq in enumerate(rays[i], 1):
+                # kladna hodnota znamena spratelenou figuru, zaporna souperovu
+                end_piece = squares[end_sq] * ally_sign
+                # posledni cast podminky je kvuli tomu, kdyz generujeme tahy krale, tak docasne kralem pohneme
+                # a zkoumame, jestli neni v sachu, ale vede to k tomu, ze realna figura krale (nepohnuta) by
+                # mohla poskytovat ochranu imaginarnimu krali a vytvaret pin
+                if end_piece > 0 and end_piece != KING_CODE:
+                    # 1. spratelna figura v ceste -> mozny pin
+                    if possible_pin == ():
+                        possible_pin = (end_sq, d)
+                    # 2. spratelena figura v ceste -> zadny pin ani sach neni mozny
+                    else:
+                        break
+                elif end_piece < 0:
+                    piece_type = -end_piece
+                    # 5 moznosti:
+                    # 1) kolmy smer a souperova figura je vez
+                    # 2) diagonalni smer a souperova figura je strelec
+                    # 3) jakykoliv smer a souperova figura je dama
+                    # 4) 1 policko diagonalne a souperova figura je pesec
+                    # 5) 1 policko jakymkoliv smerem a souperova figura je kral
+                    if (0 <= i <= 3 and piece_type == ROOK_CODE) or \
+                            (4 <= i <= 7 and piece_type == BISHOP_CODE) or \
+                            (j == 1 and piece_type == PAWN_CODE and ((ally_sign < 0 and 6 <= i <= 7) or
+                                                                     (ally_sign > 0 and 4 <= i <= 5))) or \
+                            (piece_type == QUEEN_CODE) or \
+                            (j == 1 and piece_type == KING_CODE):
                         if possible_pin == ():
-                            possible_pin = (end_row, end_col, d[0], d[1])
-                        # 2. spratelena figura v ceste -> zadny pin ani sach neni mozny
-                        else:
+                            in_check = True
+                            checks.append((end_sq, d))
                             break
-                    elif end_piece is not None and end_piece.color == enemy_color:
-                        piece_type = end_piece.piece_type
-                        # 5 moznosti:
-                        # 1) kolmy smer a souperova figura je vez
-                        # 2) diagonalni smer a souperova figura je strelec
-                        # 3) jakykoliv smer a souperova figura je dama
-                        # 4) 1 policko diagonalne a souperova figura je pesec
-                        # 5) 1 policko jakymkoliv smerem a souperova figura je kral
-                        if (0 <= i <= 3 and piece_type == ROOK) or \
-                                (4 <= i <= 7 and piece_type == BISHOP) or \
-                                (j == 1 and piece_type == PAWN and ((enemy_color == WHITE and 6 <= i <= 7) or
-                                                                    (enemy_color == BLACK and 4 <= i <= 5))) or \
-                                (piece_type == QUEEN) or \
-                                (j == 1 and piece_type == KING):
-                            if possible_pin == ():
-                                in_check = True
-                                checks.append((end_row, end_col, d[0], d[1]))
-                                break
-                            else:
-                                pins.append(possible_pin)
-                                break
                         else:
+                            pins.append(possible_pin)
                             break
-                else:
-                    # jsme mimo sachovnici
-                    break
+                    else:
+                        break
         # tahy jezdce
-        knight_moves = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
-        for knight_move in knight_moves:
-            end_row = start_row + knight_move[0]
-            end_col = start_col + knight_move[1]
-            if 0 <= end_row < 8 and 0 <= end_col < 8:
-                end_piece = self.board[end_row][end_col]
-                if end_piece is not None and end_piece.color == enemy_color and end_piece.piece_type == KNIGHT:
-                    in_check = True
-                    checks.append((end_row, end_col, knight_move[0], knight_move[1]))
+        enemy_knight = -ally_sign * KNIGHT_CODE
+        for end_sq in KNIGHT_TARGETS[start_sq]:
+            if squares[end_sq] == enemy_knight:
+                in_check = True
+                checks.append((end_sq, end_sq - start_sq))
         return in_check, pins, checks
 
+    def is_enpassant_safe(self, start_sq: int, end_sq: int) -> bool:
+        """
+        Metoda zjistuje, zda brani mimochodem neodkryje vlastniho krale. Brani mimochodem odstrani ze sachovnice dva
+        pesce najednou, coz bezna kontrola pinu nepokryje (napr. kral a souperova vez na stejne rade).
+        :param start_sq: pole, odkud pesec bere
+        :param end_sq: pole, kam pesec bere
+        :return: True/False, zda je brani mimochodem bezpecne
+        """
+        squares = self.squares
+        captured_sq = (start_sq & 0x70) | (end_sq & 7)
+        moved = squares[start_sq]
+        captured = squares[captured_sq]
+        squares[start_sq] = EMPTY
+        squares[captured_sq] = EMPTY
+        squares[end_sq] = moved
+        in_check = self.check_for_pins_and_checks()[0]
+        squares[start_sq] = moved
+        squares[captured_sq] = captured
+        squares[end_sq] = EMPTY
+        return not in_check
+
     def has_valid_move(self) -> bool:
         """
         Metoda zjistuje, zda ma hrac alespon jeden legalni tah. Slouzi pro urcovani vysledku partie.
         :return: True/False hodnota, zda ma hrac alespon jeden legalni tah
         """
-        moves = self.generate_legal_moves()
-        if len(moves) == 0:
-            return False
-        return True
+        return self.generate_moves(self._move_buffer) > 0
 
-    def is_square_attacked(self, r: int, c: int) -> bool:
+    def is_square_attacked(self, sq: int) -> bool:
         """
-        Metoda zjistuje, zda na dane pole utoci nejaka souperova figura
-        :param r: index radku sachovnice
-        :param c: index sloupce sachovnice
+        Metoda zjistuje, zda na dane pole utoci nejaka souperova figura. Generator tahu cte primo mapu utoku
+        (attacked_squares), tato metoda ji pocita znovu pro aktualni pozici.
+        :param sq: index pole sachovnice (0x88)
         :return: True/False, zda na dane utoci souperova figura
         """
-        self.change_turn()
-        opponent_moves = self.generate_pseudo_legal_moves()
-        self.change_turn()
-        for move in opponent_moves:
-            if move.end_row == r and move.end_col == c:
-                return True
-        return False
+        return self.compute_attack_map() >> sq & 1 == 1
 
-    def generate_pseudo_legal_moves(self) -> List[Move]:
+    def compute_attack_map(self) -> int:
+        """
+        Metoda spocita mapu utoku soupere hrace na tahu - bitovou masku (bit = index pole 0x88) vsech poli, na ktera
+        utoci alespon jedna souperova figura, vcetne poli s figurami obou barev. Kral hrace na tahu je pro souperovy
+        dalkove figury pruhledny, jinak by pole za kralem na sachujici primce vypadalo bezpecne a kral by mohl
+        ustoupit po smeru sachu.
+        :return: bitova maska napadenych poli
+        """
+        squares = self.squares
+        piece_squares = self.piece_squares
+        if self.white_to_move:
+            enemy_sign, own_king, pawn_attacks = -1, KING_CODE, BLACK_PAWN_ATTACKS
+        else:
+            enemy_sign, own_king, pawn_attacks = 1, -KING_CODE, WHITE_PAWN_ATTACKS
+        attacked = 0
+        for sq in piece_squares[enemy_sign * PAWN_CODE]:
+            attacked |= pawn_attacks[sq]
+        for sq in piece_squares[enemy_sign * KNIGHT_CODE]:
+            attacked |= KNIGHT_ATTACKS[sq]
+        for sq in piece_squares[enemy_sign * KING_CODE]:
+            attacked |= KING_ATTACKS[sq]
+        for code, all_rays in ((BISHOP_CODE, DIAGONAL_RAYS), (ROOK_CODE, ORTHOGONAL_RAYS),
+                               (QUEEN_CODE, DIAGONAL_RAYS), (QUEEN_CODE, ORTHOGONAL_RAYS)):
+            for sq in piece_squares[enemy_sign * code]:
+                for direction, ray in all_rays[sq]:
+                    for end_sq in ray:
+                        attacked |= 1 << end_sq
+                        if squares[end_sq] != EMPTY and squares[end_sq] != own_king:
+                            break
+        return attacked
+
+    def generate_pseudo_legal_moves(self, moves: array, captures_only: bool = False) -> int:
         """
         Metoda generuje vsechny mozne tahy hrace na tahu s tim, ze se nekontroluji vsechna pravidla, resi se pouze piny.
-        :return: Seznam pseudo-legalnich tahu, tj. platnych sachovych tahu, ktere ale nemusi byt legalni v dane pozici
-        """
-        moves = []
-        for r in range(len(self.board)):
-            for c in range(len(self.board[r])):
-                piece = self.board[r][c]
-                if piece is not None:
-                    color = piece.color
-                    if (color == WHITE and self.white_to_move) or (color == BLACK and not self.white_to_move):
-                        moves.extend(piece.generate_pseudo_legal_moves(r, c, self) or [])
-        return moves
+        Pseudo-legalni tahy jsou platne sachove tahy, ktere ale nemusi byt legalni v dane pozici.
+        :param moves: buffer pro kody tahu
+        :param captures_only: generovat pouze brani a promeny pesce
+        :return: pocet pseudo-legalnich tahu v bufferu
+        """
+        count = 0
+        piece_squares = self.piece_squares
+        for code in WHITE_PIECE_CODES if self.white_to_move else BLACK_PIECE_CODES:
+            piece = PIECES[code]
+            for sq in piece_squares[code]:
+                count = piece.generate_pseudo_legal_moves(sq, self, moves, count, captures_only)
+        return count
 
     def check_end_result(self) -> None:
         """
@@ -1043,8 +1822,15 @@ class ChessGame:
                     self.game_result = GameResult.WHITE_WIN
             else:
                 self.game_result = GameResult.STALEMATE
+        if self.game_result is not None:
+            # mat a pat maji prednost pred remizovymi pravidly
+            return
         if self.is_insufficient_material():
             self.game_result = GameResult.INSUFFICIENT_MATERIAL_DRAW
+        elif self.halfmove_clock >= FIFTY_MOVE_RULE_PLIES:
+            self.game_result = GameResult.FIFTY_MOVE_RULE_DRAW
+        elif self.repetition_count() >= 3:
+            self.game_result = GameResult.THREEFOLD_REPETITION_DRAW
 
     def get_result_string(self) -> Union[str, None]:
         """
@@ -1066,30 +1852,20 @@ class ChessGame:
 
     def is_insufficient_material(self) -> bool:
         """
-        Metoda zjistuje, zda je na sachovnici dostatek materialu pro vyhru jednoho z hracu. Zatim neni implementovano
-        :return: True/False hodnota, zda je na sachovnici dostatek materialu pro vyhru jednoho z hracu
-        """
-        white_pieces: Dict[PieceType, List[Piece]] = {}
-        black_pieces: Dict[PieceType, List[Piece]] = {}
-        for r in range(len(self.board)):
-            for c in range(len(self.board[r])):
-                piece = self.board[r][c]
-                if piece is not None:
-                    if piece.color == WHITE:
-                        if piece.piece_type in white_pieces.keys():
-                            white_pieces[piece.piece_type].append(piece)
-                        else:
-                            white_pieces[piece.piece_type] = [piece]
-                    else:
-                        if piece.piece_type in black_pieces.keys():
-                            black_pieces[piece.piece_type].append(piece)
-                        else:
-                            black_pieces[piece.piece_type] = [piece]
-
-        if QUEEN in white_pieces.keys() or QUEEN in black_pieces.keys():
-            return False
-        if ROOK in white_pieces.keys() or ROOK in black_pieces.keys():
-            return False
-        if PAWN in white_pieces.keys() or PAWN in black_pieces.keys():
+        Metoda zjistuje, zda na sachovnici chybi material pro mat jednoho z hracu. To plati pro krale proti krali,
+        krale a jednu lehkou figuru proti krali a pro pozice, kde krome kralu zustali jen strelci na polich stejne
+        barvy.
+        :return: True, pokud zadny z hracu nemuze dat mat, jinak False
+        """
+        piece_squares = self.piece_squares
+        if self.piece_counts[0] + self.piece_counts[1] <= 3:
+            # nejvyse jedna figura krome kralu, mat da jen dama, vez nebo pesec (po promene)
+            for code in (QUEEN_CODE, ROOK_CODE, PAWN_CODE):
+                if piece_squares[code] or piece_squares[-code]:
+                    return False
+            return True
+        bishops = piece_squares[BISHOP_CODE] + piece_squares[-BISHOP_CODE]
+        if len(bishops) + 2 != self.piece_counts[0] + self.piece_counts[1]:
             return False
-        return True
+        # barva pole je dana paritou souctu radku a sloupce
+        return len({sum(to_row_col(sq)) & 1 for sq in bishops}) == 1
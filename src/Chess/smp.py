@@ -0,0 +1,174 @@
+from typing import List, Tuple, Union, Callable
+from multiprocessing import shared_memory
+import multiprocessing
+import argparse
+import queue
+import time
+from rules import ChessGame, Move, STARTING_FEN
+from transposition import TranspositionTable
+from stats import SearchStats
+from engine import Search, SearchResult, SearchLimits, MoveOrderer, StopEvent, DEFAULT_DEPTH, TT_SIZE_MB, \
+    moves_from_codes
+
+DEFAULT_THREADS = 1
+# vysledek pomocneho procesu, ve kterem hledani selhalo (zaporna hloubka, pri vyberu vysledku se preskoci)
+FAILED_RESULT: Tuple[int, int, List[int], int] = (-1, 0, [], 0)
+# jak dlouho (s) ceka hlavni proces na vysledek, nez zkontroluje, zda pomocne procesy jeste bezi
+RESULT_TIMEOUT = 0.1
+
+
+def _search_worker(shm_name: str, tt_size_mb: int, tt_age: int, game: ChessGame, depth: int,
+                   stop_event: StopEvent, results: multiprocessing.Queue) -> None:
+    """
+    Funkce pomocneho procesu: pripoji se ke sdilene transpozicni tabulce a prohleda pozici do dane hloubky. Kdyz
+    hledani dokonci, zastavi ostatni procesy. Vysledek posle jako (hloubka, skore, kody hlavni varianty, pocet uzlu),
+    pri chybe posle FAILED_RESULT, aby na nej hlavni proces necekal.
+    """
+    shm: Union[shared_memory.SharedMemory, None] = None
+    tt: Union[TranspositionTable, None] = None
+    try:
+        shm = shared_memory.SharedMemory(name=shm_name)
+        tt = TranspositionTable(tt_size_mb, shm.buf)
+        tt.age = tt_age
+        search = Search(game, depth, tt, MoveOrderer(), SearchStats(), stop_event)
+        result = search.search()
+        if not search.stopped:
+            stop_event.set()
+        results.put((result.depth, result.score, [move.code for move in result.pv], result.nodes))
+    except Exception:
+        results.put(FAILED_RESULT)
+        raise
+    finally:
+        if tt is not None:
+            tt.release()
+        if shm is not None:
+            shm.close()
+
+
+class ParallelSearch:
+    """
+    Paralelni hledani (Lazy SMP). Vsechny procesy prohledavaji stejnou pozici a sdili transpozicni tabulku ve sdilene
+    pameti bez zamku, takze si navzajem predavaji vysledky a kazdy proces orezava vic, nez by orezaval sam. Hlavni
+    proces hleda do zadane hloubky, polovina pomocnych procesu o pultah hloubeji, aby procesy neprohledavaly stejnou
+    iteraci soucasne. Prvni proces, ktery dokonci svou hloubku, zastavi ostatni a vybere se nejhlubsi dokonceny
+    vysledek.
+    """
+    def __init__(self, threads: int = DEFAULT_THREADS, tt_size_mb: int = TT_SIZE_MB) -> None:
+        """
+        :param threads: celkovy pocet procesu vcetne hlavniho
+        :param tt_size_mb: velikost sdilene transpozicni tabulky v MB
+        """
+        self.threads: int = max(1, threads)
+        self.tt_size_mb: int = tt_size_mb
+        self.shm: shared_memory.SharedMemory = shared_memory.SharedMemory(create=True, size=tt_size_mb * 1024 * 1024)
+        self.tt: TranspositionTable = TranspositionTable(tt_size_mb, self.shm.buf)
+        self.orderer: MoveOrderer = MoveOrderer()
+        self.stats: SearchStats = SearchStats()
+        # Pomocne procesy nevytvarime primym forkem - volajici muze mit dalsi vlakna (napr. uci.py cte ve vedlejsim
+        # vlakne stdin) a fork by zdedil jejich zamcene zamky. Forkserver forkuje z cisteho procesu s jiz
+        # naimportovanymi moduly, kde neni k dispozici, pouzijeme spawn.
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            self.context = multiprocessing.get_context('forkserver')
+            self.context.set_forkserver_preload(['smp'])
+        else:
+            self.context = multiprocessing.get_context('spawn')
+        # udalost zastavujici prave probihajici hledani (viz stop())
+        self._stop_event: Union[StopEvent, None] = None
+
+    def clear(self) -> None:
+        """
+        Metoda vymaze sdilenou transpozicni tabulku (napr. pred novou partii).
+        """
+        self.tt.clear()
+
+    def stop(self) -> None:
+        """
+        Metoda zastavi prave probihajici hledani (napr. z jineho vlakna), search() pak vrati nejhlubsi dokonceny
+        vysledek.
+        """
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+    def close(self) -> None:
+        """
+        Metoda uvolni sdilenou pamet, objekt uz pak nelze pouzit.
+        """
+        self.tt.release()
+        self.shm.close()
+        self.shm.unlink()
+
+    def search(self, game: ChessGame, depth: int = DEFAULT_DEPTH,
+               valid_moves: Union[List[Move], None] = None, limits: Union[SearchLimits, None] = None,
+               on_iteration: Union[Callable[[SearchResult], None], None] = None) -> SearchResult:
+        """
+        Metoda najde nejlepsi tah. Hlavni proces hleda v objektu partie, pomocne procesy nad jeho kopii. Limity
+        hlida hlavni proces, pomocne procesy zastavi, az skonci.
+        :param game: objekt partie
+        :param depth: hloubka hledani v pultazich
+        :param valid_moves: legalni tahy v koreni (pokud je nezadame, vygeneruji se)
+        :param limits: casove limity a limit uzlu hlavniho procesu
+        :param on_iteration: funkce volana po kazde iteraci hlavniho procesu (viz Search)
+        :return: nejhlubsi dokonceny vysledek, pocet uzlu je soucet za vsechny procesy
+        """
+        if valid_moves is None:
+            valid_moves = game.generate_legal_moves()
+        context = self.context
+        stop_event = context.Event()
+        self._stop_event = stop_event
+        results = context.Queue()
+        # hlavni Search vek tabulky zvysi v search(), pomocne procesy zacinaji ze stejneho veku a zvysi ho stejne
+        workers = [context.Process(target=_search_worker, daemon=True,
+                                   args=(self.shm.name, self.tt_size_mb, self.tt.age, game, depth + i % 2,
+                                         stop_event, results))
+                   for i in range(1, self.threads)]
+        for worker in workers:
+            worker.start()
+
+        search = Search(game, depth, self.tt, self.orderer, self.stats, stop_event, limits, on_iteration)
+        result = search.search(valid_moves)
+        stop_event.set()
+        helper_results: List[Tuple[int, int, List[int], int]] = []
+        while len(helper_results) < len(workers):
+            # proces, ktery skoncil, uz ma svuj vysledek ve fronte - pokud vsechny skoncily a fronta je prazdna, nektery
+            # proces spadl bez vysledku (napr. byl zabit) a dal necekame
+            finished = all(worker.exitcode is not None for worker in workers)
+            try:
+                helper_results.append(results.get(timeout=RESULT_TIMEOUT))
+            except queue.Empty:
+                if finished:
+                    break
+        for worker in workers:
+            worker.join()
+        helper_results = [helper_result for helper_result in helper_results if helper_result[0] >= 0]
+
+        nodes = result.nodes + sum(helper_nodes for _, _, _, helper_nodes in helper_results)
+        result.nodes = nodes
+        deepest = max(helper_results, key=lambda helper_result: helper_result[0], default=None)
+        if deepest is not None and deepest[0] > result.depth:
+            helper_depth, score, pv_codes, _ = deepest
+            pv = moves_from_codes(game, pv_codes)
+            best_move = next(move for move in valid_moves if move.code == pv_codes[0])
+            result = SearchResult(best_move, score, pv, helper_depth, nodes, result.stats, result.elapsed)
+        return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Paralelni hledani nejlepsiho tahu v zadane pozici (Lazy SMP).')
+    parser.add_argument('--fen', default=STARTING_FEN, help='pozice ve FEN notaci')
+    parser.add_argument('-d', '--depth', type=int, default=DEFAULT_DEPTH, help='hloubka hledani v pultazich')
+    parser.add_argument('-t', '--threads', type=int, default=multiprocessing.cpu_count(), help='pocet procesu')
+    parser.add_argument('--hash', type=int, default=TT_SIZE_MB, help='velikost transpozicni tabulky v MB')
+    args = parser.parse_args()
+    parallel_search = ParallelSearch(args.threads, args.hash)
+    try:
+        start = time.perf_counter()
+        result = parallel_search.search(ChessGame(args.fen), args.depth)
+        elapsed = time.perf_counter() - start
+        print(result)
+        print(f'threads {parallel_search.threads}, time {elapsed:.3f} s, nps {int(result.nodes / max(elapsed, 1e-9))}')
+    finally:
+        parallel_search.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+from typing import Dict, Union
+import time
+
+
+class SearchStats:
+    """
+    Pocitadla a mereni casu pro hledani. Standardne jsou vypnuta (enabled = False), hledani pak jen jednou za uzel
+    zkontroluje, zda je ma pocitat. Po zapnuti se krome poctu uzlu meri i cas straveny generovanim tahu, hodnocenim
+    pozic a provadenim/vracenim tahu.
+    """
+    def __init__(self, enabled: bool = False) -> None:
+        """
+        :param enabled: zda se maji statistiky sbirat
+        """
+        self.enabled: bool = enabled
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Metoda vynuluje vsechna pocitadla a zacne merit celkovy cas, vola se na zacatku kazdeho hledani.
+        """
+        self.nodes: int = 0  # uzly hledani do plne hloubky
+        self.quiescence_nodes: int = 0
+        self.evaluations: int = 0  # staticka hodnoceni pozice v listech
+        self.beta_cutoffs: int = 0
+        self.first_move_cutoffs: int = 0  # beta rezy hned po prvnim zkousenem tahu
+        self.tt_probes: int = 0
+        self.tt_hits: int = 0
+        self.move_generation_time: float = 0.0
+        self.evaluation_time: float = 0.0
+        self.make_unmake_time: float = 0.0
+        self.depth: int = 0
+        self.start_time: float = time.perf_counter()
+        self.elapsed: float = 0.0
+
+    def stop(self) -> None:
+        """
+        Metoda ukonci mereni celkoveho casu hledani.
+        """
+        self.elapsed = time.perf_counter() - self.start_time
+
+    @property
+    def total_nodes(self) -> int:
+        return self.nodes + self.quiescence_nodes
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        """
+        Podil beta rezu, ktere zpusobil uz prvni tah - meritko kvality razeni tahu.
+        """
+        return self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0.0
+
+    @property
+    def tt_hit_rate(self) -> float:
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def nps(self) -> int:
+        return int(self.total_nodes / self.elapsed) if self.elapsed > 0 else 0
+
+    def as_dict(self) -> Dict[str, Union[int, float]]:
+        """
+        :return: vsechny hodnoty jako slovnik (napr. pro logovani)
+        """
+        return {
+            'depth': self.depth,
+            'nodes': self.nodes,
+            'quiescence_nodes': self.quiescence_nodes,
+            'evaluations': self.evaluations,
+            'beta_cutoffs': self.beta_cutoffs,
+            'first_move_cutoff_rate': self.first_move_cutoff_rate,
+            'tt_probes': self.tt_probes,
+            'tt_hits': self.tt_hits,
+            'move_generation_time': self.move_generation_time,
+            'evaluation_time': self.evaluation_time,
+            'make_unmake_time': self.make_unmake_time,
+            'elapsed': self.elapsed,
+            'nps': self.nps,
+        }
+
+    def summary(self) -> str:
+        """
+        :return: shrnuti hledani pro vypis do konzole
+        """
+        return f'depth {self.depth}, nodes {self.nodes}, qnodes {self.quiescence_nodes}, ' \
+               f'evaluations {self.evaluations}, time {self.elapsed:.3f} s, nps {self.nps}\n' \
+               f'beta cutoffs {self.beta_cutoffs} (first move {self.first_move_cutoff_rate:.1%}), ' \
+               f'tt probes {self.tt_probes} (hits {self.tt_hit_rate:.1%})\n' \
+               f'move generation {self.move_generation_time:.3f} s, evaluation {self.evaluation_time:.3f} s, ' \
+               f'make/unmake {self.make_unmake_time:.3f} s'
+
+    def __str__(self) -> str:
+        return self.summary()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# moduly enginu se importuji primo (from rules import ...), stejne jako pri spusteni ze src/Chess
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
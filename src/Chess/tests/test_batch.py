@@ -0,0 +1,21 @@
+import batch
+from engine import SearchLimits
+
+EPD = '7k/8/6K1/8/8/8/8/R7 w - - bm Ra8#; id "mate";'
+
+
+def test_analyse_position():
+    batch._init_worker(1)
+    record = batch.analyse_position(1, EPD, 2, SearchLimits())
+    assert record['id'] == 'mate' and record['uci'] == 'a1a8' and record['correct']
+
+
+def test_analyse_position_errors(monkeypatch):
+    batch._init_worker(1)
+    assert 'error' in batch.analyse_position(1, 'not an epd', 2, SearchLimits())
+
+    def failing_search(*args, **kwargs):
+        raise RuntimeError('search failed')
+    monkeypatch.setattr(batch, 'Search', failing_search)
+    assert batch.analyse_position(2, EPD, 2, SearchLimits()) == \
+        {'line': 2, 'fen': '7k/8/6K1/8/8/8/8/R7 w - - 0 1', 'id': 'mate', 'error': 'search failed'}
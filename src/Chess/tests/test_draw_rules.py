@@ -0,0 +1,66 @@
+from rules import ChessGame, GameResult
+
+
+def _play(game: ChessGame, sans) -> None:
+    for san in sans:
+        game.do_move(game.parse_san(san))
+        game.check_end_result()
+
+
+def test_threefold_repetition():
+    game = ChessGame()
+    _play(game, ['Nf3', 'Nf6', 'Ng1', 'Ng8', 'Nf3', 'Nf6', 'Ng1'])
+    assert game.repetition_count() == 2
+    assert game.game_result is None
+    _play(game, ['Ng8'])
+    assert game.repetition_count() == 3
+    assert game.game_result == GameResult.THREEFOLD_REPETITION_DRAW
+    game.undo_move()
+    assert game.repetition_count() == 2
+
+
+def test_repetition_stops_at_irreversible_move():
+    game = ChessGame()
+    _play(game, ['Nf3', 'Nf6', 'Ng1', 'Ng8', 'e4'])
+    assert game.repetition_count() == 1
+    assert not game.is_repetition()
+
+
+def test_fifty_move_rule():
+    game = ChessGame('8/8/8/4k3/8/8/3R4/K7 w - - 99 80')
+    _play(game, ['Rd3'])
+    assert game.halfmove_clock == 100
+    assert game.game_result == GameResult.FIFTY_MOVE_RULE_DRAW
+    game.undo_move()
+    assert game.halfmove_clock == 99
+
+
+def test_checkmate_beats_fifty_move_rule():
+    game = ChessGame('7k/8/6K1/8/8/8/8/R7 w - - 99 80')
+    _play(game, ['Ra8'])
+    assert game.game_result == GameResult.WHITE_WIN
+
+
+def test_checkmate_is_not_insufficient_material():
+    game = ChessGame('7k/8/5BKN/8/8/8/8/8 b - - 0 1')
+    game.check_end_result()
+    assert game.game_result == GameResult.WHITE_WIN
+
+
+def test_insufficient_material():
+    for fen in ('8/8/8/4k3/8/8/8/K7 w - - 0 1', '8/8/8/4k3/8/8/8/KB6 w - - 0 1', '8/8/8/4k3/8/8/8/K5n1 w - - 0 1',
+                '8/8/2b5/4k3/8/8/8/KB6 w - - 0 1', '8/8/8/4k3/8/8/8/KB1B1B2 w - - 0 1'):
+        game = ChessGame(fen)
+        assert game.is_insufficient_material(), fen
+        game.check_end_result()
+        assert game.game_result == GameResult.INSUFFICIENT_MATERIAL_DRAW, fen
+
+
+def test_sufficient_material():
+    for fen in ('8/8/8/4k3/8/8/8/KBN5 w - - 0 1', '8/8/8/4k3/8/8/8/KBB5 w - - 0 1', '8/8/8/4k3/8/8/8/KNN5 w - - 0 1',
+                '8/8/8/4k3/8/8/8/KB4n1 w - - 0 1', '8/8/3b4/4k3/8/8/8/KB6 w - - 0 1', '8/8/8/4k3/8/8/8/KR6 w - - 0 1',
+                '8/8/8/4k3/8/8/P7/K7 w - - 0 1'):
+        game = ChessGame(fen)
+        assert not game.is_insufficient_material(), fen
+        game.check_end_result()
+        assert game.game_result is None, fen
@@ -0,0 +1,33 @@
+import random
+import pytest
+from rules import ChessGame, GameResult, EMPTY
+from engine import Search, MATE_BOUND
+from endgame import EndgameTables
+
+KBNK_FEN = '8/8/8/4k3/8/8/8/KBN5 w - - 0 1'
+
+
+def test_kbnk_is_played_on():
+    game = ChessGame(KBNK_FEN)
+    rng = random.Random(5)
+    for _ in range(40):
+        game.check_end_result()
+        assert game.game_result is None
+        moves = game.generate_legal_moves()
+        # bez brani, aby na sachovnici zustal strelec i jezdec
+        moves = [move for move in moves if game.squares[move.end_sq] == EMPTY]
+        game.do_move(rng.choice(moves))
+
+
+def test_kbnk_search_finds_mate():
+    tables = EndgameTables()
+    if (2, 3) not in tables.tables:
+        tables.close()
+        pytest.skip('tabulka KBNK neni vygenerovana (python endgame.py generate)')
+    game = ChessGame(KBNK_FEN)
+    result, distance = tables.probe(game)
+    tables.close()
+    assert result == 1 and distance > 0
+    assert Search(game, 2).search(game.generate_legal_moves()).score >= MATE_BOUND
+    game.check_end_result()
+    assert game.game_result != GameResult.INSUFFICIENT_MATERIAL_DRAW
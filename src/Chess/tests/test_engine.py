@@ -0,0 +1,41 @@
+import random
+from engine import Search, SearchLimits, find_best_move, _get_position_evaluation, _get_naive_position_evaluation
+from rules import ChessGame, QUEEN_CODE
+
+
+def test_find_best_move_mates():
+    game = ChessGame('7k/8/6K1/8/8/8/8/R7 w - - 0 1')
+    assert find_best_move(game, game.generate_legal_moves()).uci == 'a1a8'
+
+
+def test_find_best_move_avoids_stalemate():
+    game = ChessGame('k7/8/2Q5/8/8/8/8/K7 w - - 0 1')
+    move = find_best_move(game, game.generate_legal_moves())
+    game.do_move(move)
+    assert game.generate_legal_moves()
+
+
+def test_naive_evaluation_matches_incremental():
+    rng = random.Random(2)
+    game = ChessGame()
+    for _ in range(100):
+        moves = game.generate_legal_moves()
+        if not moves:
+            break
+        game.do_move(rng.choice(moves))
+        assert _get_naive_position_evaluation(game) == _get_position_evaluation(game)
+
+
+def test_naive_evaluation_ignores_piece_lists():
+    game = ChessGame()
+    score = _get_naive_position_evaluation(game)
+    game.piece_squares[QUEEN_CODE].clear()
+    assert _get_naive_position_evaluation(game) == score
+
+
+def test_node_limit_stops_quiescence():
+    # po kazdem tahu kiwipete nasleduje dlouha serie brani, vetsina uzlu je v _quiescence()
+    game = ChessGame('r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1')
+    result = Search(game, 2, limits=SearchLimits(nodes=100)).search()
+    assert result.nodes <= 100
+    assert result.best_move is not None
@@ -0,0 +1,46 @@
+import random
+from rules import ChessGame, STARTING_FEN
+
+
+def _random_game(seed: int, plies: int = 120) -> ChessGame:
+    rng = random.Random(seed)
+    game = ChessGame()
+    for _ in range(plies):
+        moves = game.generate_legal_moves()
+        if not moves:
+            break
+        game.do_move(rng.choice(moves))
+    return game
+
+
+def test_fen_round_trip():
+    for seed in range(5):
+        game = _random_game(seed)
+        assert ChessGame(game.get_fen()).get_fen() == game.get_fen()
+    assert ChessGame().get_fen() == STARTING_FEN
+
+
+def test_san_round_trip():
+    rng = random.Random(1)
+    for _ in range(5):
+        game = ChessGame()
+        for _ in range(150):
+            moves = game.generate_legal_moves()
+            if not moves:
+                break
+            for move in moves:
+                assert game.parse_san(move.san).code == move.code
+            game.do_move(rng.choice(moves))
+
+
+def test_undo_restores_position():
+    game = _random_game(3)
+    keys = []
+    fens = []
+    while True:
+        keys.append(game.zobrist_key)
+        fens.append(game.get_fen())
+        if game.undo_move() is None:
+            break
+    assert fens[-1] == STARTING_FEN
+    assert keys[-1] == ChessGame().zobrist_key
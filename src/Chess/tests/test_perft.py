@@ -0,0 +1,21 @@
+import pytest
+from perft import POSITIONS, perft, divide
+from rules import ChessGame
+
+# hloubky, ktere se spocitaji za par sekund
+DEPTHS = {'startpos': 3, 'kiwipete': 2, 'position3': 4, 'position4': 3, 'position5': 3, 'position6': 2}
+
+
+@pytest.mark.parametrize('name', list(POSITIONS.keys()))
+def test_perft(name):
+    fen, expected = POSITIONS[name]
+    game = ChessGame(fen)
+    for depth in range(1, DEPTHS[name] + 1):
+        assert perft(game, depth) == expected[depth - 1]
+    # perft tahy vraci, pozice se nezmeni
+    assert game.get_fen() == ChessGame(fen).get_fen()
+
+
+def test_divide_sums_to_perft():
+    fen, expected = POSITIONS['kiwipete']
+    assert sum(count for _, count in divide(fen, 2)) == expected[1]
@@ -0,0 +1,59 @@
+import io
+import random
+from pgn import read_games, tokenize_movetext
+from rules import ChessGame
+
+
+def _movetext(game: ChessGame, moves) -> str:
+    """
+    Zapis tahu v PGN z notace tahu (Move.san), cisla tahu odpovidaji vychozi pozici.
+    """
+    parts = []
+    for move in moves:
+        if game.white_to_move:
+            parts.append(f'{game.fullmove_number}.')
+        parts.append(move.san)
+        game.do_move(move)
+    return ' '.join(parts)
+
+
+def _round_trip(fen: str, moves_uci) -> None:
+    game = ChessGame(fen)
+    moves = []
+    for uci in moves_uci:
+        move = next(m for m in game.generate_legal_moves() if m.uci == uci)
+        moves.append(move)
+        game.do_move(move)
+    expected_fen = game.get_fen()
+    movetext = _movetext(ChessGame(fen), moves)
+    pgn = f'[Event "test"]\n[FEN "{fen}"]\n\n{movetext} *\n'
+    games = list(read_games(io.StringIO(pgn)))
+    assert len(games) == 1
+    assert games[0].replay().get_fen() == expected_fen
+
+
+def test_tokenize_skips_en_passant_suffix():
+    assert list(tokenize_movetext('1. e4 {c} d5 2. e5 f5 3. exf6 e.p. (3. d4) $1 *')) == \
+        ['e4', 'd5', 'e5', 'f5', 'exf6', '*']
+
+
+def test_round_trip_en_passant():
+    fen = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+    _round_trip(fen, ['e2e4', 'a7a6', 'e4e5', 'd7d5', 'e5d6', 'c7d6'])
+
+
+def test_round_trip_random_games():
+    rng = random.Random(7)
+    game = ChessGame()
+    fen = game.get_fen()
+    for _ in range(10):
+        game = ChessGame(fen)
+        moves = []
+        for _ in range(200):
+            valid_moves = game.generate_legal_moves()
+            if not valid_moves:
+                break
+            move = rng.choice(valid_moves)
+            moves.append(move.uci)
+            game.do_move(move)
+        _round_trip(fen, moves)
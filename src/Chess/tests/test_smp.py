@@ -0,0 +1,23 @@
+import queue
+import threading
+import smp
+from rules import ChessGame
+
+
+def test_failed_worker_reports_result():
+    results = queue.Queue()
+    try:
+        smp._search_worker('missing-shared-memory', 1, 0, ChessGame(), 1, threading.Event(), results)
+    except FileNotFoundError:
+        pass
+    assert results.get_nowait() == smp.FAILED_RESULT
+
+
+def test_parallel_search():
+    parallel_search = smp.ParallelSearch(2, 1)
+    try:
+        game = ChessGame('7k/8/6K1/8/8/8/8/R7 w - - 0 1')
+        result = parallel_search.search(game, 2)
+        assert result.best_move.uci == 'a1a8'
+    finally:
+        parallel_search.close()
@@ -0,0 +1,36 @@
+import uci
+from rules import ChessGame, STARTING_FEN
+
+
+def _engine(monkeypatch):
+    lines = []
+    monkeypatch.setattr(uci, 'send', lines.append)
+    return uci.UciEngine(), lines
+
+
+def test_position_with_moves(monkeypatch):
+    engine, _ = _engine(monkeypatch)
+    engine.handle('position startpos moves e2e4 e7e5 g1f3')
+    assert engine.game.get_fen() == 'rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2'
+    engine.handle('position fen 8/8/8/4k3/8/8/3R4/K7 w - - 0 1 moves d2d3')
+    assert engine.game.get_fen() == '8/8/8/4k3/8/3R4/8/K7 b - - 1 1'
+
+
+def test_invalid_position_keeps_previous(monkeypatch):
+    engine, lines = _engine(monkeypatch)
+    engine.handle('position startpos moves e2e4')
+    fen = engine.game.get_fen()
+    assert engine.handle('position startpos moves e2e4 e2e4')
+    assert engine.handle('position fen not a fen')
+    assert engine.game.get_fen() == fen
+    assert len(lines) == 2 and all(line.startswith('info string') for line in lines)
+
+
+def test_invalid_option_is_reported(monkeypatch):
+    engine, lines = _engine(monkeypatch)
+    assert engine.handle('setoption name Hash value lots')
+    assert engine.handle('setoption name Threads value -')
+    assert engine.handle('setoption name BookFile value /nonexistent/book.bin')
+    assert engine.hash_mb == uci.TT_SIZE_MB and engine.threads == 1 and engine.book is None
+    assert len(lines) == 3 and all(line.startswith('info string') for line in lines)
+    assert engine.game.get_fen() == ChessGame(STARTING_FEN).get_fen()
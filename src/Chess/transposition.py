@@ -0,0 +1,116 @@
+from typing import Tuple, Union
+from array import array
+
+# typy ulozeneho skore
+EXACT = 0
+LOWER_BOUND = 1  # skore je alespon takove (doslo k beta rezu)
+UPPER_BOUND = 2  # skore je nejvyse takove (zadny tah nezlepsil alfu)
+
+# Kazdy zaznam ma dve 64bitova slova - klic pozice XOR zabalena data a zabalena data. Kbelik ma dva zaznamy: prvni se
+# nahrazuje jen hlubsim (nebo novejsim) vysledkem, druhy se nahrazuje vzdy. Diky XOR klice s daty se pozna zaznam,
+# jehoz slova zapsaly dva procesy soucasne (viz smp.py) - klic se pak neshoduje a zaznam se ignoruje.
+ENTRY_SIZE = 16
+BUCKET_WORDS = 4
+
+# rozlozeni dat v 64bitovem slove
+_MOVE_BITS = 24
+_DEPTH_SHIFT = 24
+_FLAG_SHIFT = 32
+_AGE_SHIFT = 34
+_SCORE_SHIFT = 40
+_SCORE_OFFSET = 1 << 23
+
+
+class TranspositionTable:
+    """
+    Transpozicni tabulka pevne velikosti. Data jsou ulozena v jednom poli 64bitovych cisel (array), ne ve slovniku
+    objektu, takze pamet je predem dana a tabulka nezatezuje garbage collector. Misto vlastniho pole muze tabulka
+    pouzivat predany buffer (sdilenou pamet), do ktereho pak zapisuje vice procesu bez zamku.
+    """
+    def __init__(self, size_mb: int = 16, buffer: Union[memoryview, None] = None) -> None:
+        """
+        :param size_mb: velikost tabulky v MB
+        :param buffer: volitelny buffer o velikosti alespon size_mb MB (napr. SharedMemory.buf), jinak se tabulka
+            alokuje
+        """
+        self.bucket_count: int = max(1, size_mb * 1024 * 1024 // (ENTRY_SIZE * 2))
+        if buffer is not None:
+            self.table: Union[array, memoryview] = buffer[:self.bucket_count * BUCKET_WORDS * 8].cast('Q')
+        else:
+            self.table: Union[array, memoryview] = array('Q', bytes(self.bucket_count * BUCKET_WORDS * 8))
+        self.age: int = 0
+
+    def clear(self) -> None:
+        """
+        Metoda vymaze vsechny zaznamy (na miste, aby se vymazal i predany buffer).
+        """
+        self.table[:] = array('Q', bytes(self.bucket_count * BUCKET_WORDS * 8))
+        self.age = 0
+
+    def release(self) -> None:
+        """
+        Metoda uvolni pohled na predany buffer (sdilenou pamet lze zavrit, az kdyz na ni neukazuje zadny pohled).
+        """
+        if isinstance(self.table, memoryview):
+            self.table.release()
+
+    def new_search(self) -> None:
+        """
+        Metoda se vola pred kazdym hledanim, zaznamy z predchozich hledani pak muzeme prednostne prepisovat.
+        """
+        self.age = (self.age + 1) & 0x3F
+
+    def probe(self, key: int) -> Union[Tuple[int, int, int, int], None]:
+        """
+        Metoda hleda pozici v tabulce.
+        :param key: Zobrist hash pozice
+        :return: (tah, hloubka, typ skore, skore), nebo None, pokud pozice v tabulce neni
+        """
+        index = (key % self.bucket_count) * BUCKET_WORDS
+        table = self.table
+        data = table[index + 1]
+        if table[index] ^ data == key:
+            return unpack(data)
+        data = table[index + 3]
+        if table[index + 2] ^ data == key:
+            return unpack(data)
+        return None
+
+    def store(self, key: int, move: int, depth: int, flag: int, score: int) -> None:
+        """
+        Metoda uklada vysledek hledani do tabulky.
+        :param key: Zobrist hash pozice
+        :param move: kod nejlepsiho tahu (0, pokud neni znam)
+        :param depth: hloubka, do ktere byla pozice prohledana
+        :param flag: typ skore (EXACT, LOWER_BOUND, UPPER_BOUND)
+        :param score: skore pozice
+        """
+        index = (key % self.bucket_count) * BUCKET_WORDS
+        table = self.table
+        data = pack(move, depth, flag, score, self.age)
+        stored = table[index + 1]
+        # zaznam preferujici hloubku prepisujeme stejnou pozici, hlubsim vysledkem nebo zaznamem ze stareho hledani
+        if table[index] ^ stored == key or depth >= (stored >> _DEPTH_SHIFT) & 0xFF or \
+                (stored >> _AGE_SHIFT) & 0x3F != self.age:
+            table[index] = key ^ data
+            table[index + 1] = data
+        else:
+            table[index + 2] = key ^ data
+            table[index + 3] = data
+
+
+def pack(move: int, depth: int, flag: int, score: int, age: int) -> int:
+    """
+    Funkce zabali data zaznamu do jednoho 64bitoveho cisla.
+    """
+    return (move & 0xFFFFFF) | depth << _DEPTH_SHIFT | flag << _FLAG_SHIFT | age << _AGE_SHIFT | \
+        (score + _SCORE_OFFSET) << _SCORE_SHIFT
+
+
+def unpack(data: int) -> Tuple[int, int, int, int]:
+    """
+    Funkce rozbali data zaznamu.
+    :return: (tah, hloubka, typ skore, skore)
+    """
+    return data & 0xFFFFFF, (data >> _DEPTH_SHIFT) & 0xFF, (data >> _FLAG_SHIFT) & 0x3, \
+        (data >> _SCORE_SHIFT) - _SCORE_OFFSET
@@ -0,0 +1,257 @@
+from typing import List, Union
+import sys
+import threading
+from rules import ChessGame, STARTING_FEN
+from transposition import TranspositionTable
+from stats import SearchStats
+from engine import Search, SearchResult, SearchLimits, MoveOrderer, CHECKMATE, MATE_BOUND, MAX_PLY, TT_SIZE_MB
+from smp import ParallelSearch
+from book import OpeningBook
+
+ENGINE_NAME = 'chess-python'
+ENGINE_AUTHOR = 'petergade'
+MAX_HASH_MB = 4096
+MAX_THREADS = 64
+# pri hre na cas - predpokladany pocet zbyvajicich tahu, pokud ho GUI nezada (movestogo)
+DEFAULT_MOVES_TO_GO = 30
+# rezerva v sekundach na komunikaci s GUI
+MOVE_OVERHEAD = 0.05
+# vystup pisi hlavni vlakno i vlakno hledani, radky se nesmi promichat
+_output_lock = threading.Lock()
+
+
+class UciEngine:
+    """
+    Rozhrani enginu pro protokol UCI (Universal Chess Interface). Prikazy se ctou po radcich, hledani (go) bezi ve
+    vlastnim vlakne, aby slo prerusit prikazem stop. Vystup jde na standardni vystup.
+    """
+    def __init__(self) -> None:
+        self.game: ChessGame = ChessGame()
+        self.hash_mb: int = TT_SIZE_MB
+        self.threads: int = 1
+        self.tt: TranspositionTable = TranspositionTable(self.hash_mb)
+        self.orderer: MoveOrderer = MoveOrderer()
+        # paralelni hledani se sdilenou tabulkou, pouze pro Threads > 1
+        self.parallel_search: Union[ParallelSearch, None] = None
+        self.stop_event: threading.Event = threading.Event()
+        self.search_thread: Union[threading.Thread, None] = None
+        # kniha zahajeni (volba BookFile), tahy z knihy se hraji bez hledani
+        self.book: Union[OpeningBook, None] = None
+        # probihajici hledani je go infinite (skonci jen prikazem stop)
+        self.infinite: bool = False
+
+    def handle(self, line: str) -> bool:
+        """
+        Metoda zpracuje jeden prikaz.
+        :param line: radek od GUI
+        :return: False, pokud ma engine skoncit (quit), jinak True
+        """
+        tokens = line.split()
+        if len(tokens) == 0:
+            return True
+        command = tokens[0]
+        if command == 'uci':
+            send(f'id name {ENGINE_NAME}')
+            send(f'id author {ENGINE_AUTHOR}')
+            send(f'option name Hash type spin default {TT_SIZE_MB} min 1 max {MAX_HASH_MB}')
+            send(f'option name Threads type spin default 1 min 1 max {MAX_THREADS}')
+            send('option name BookFile type string default <empty>')
+            send('uciok')
+        elif command == 'isready':
+            send('readyok')
+        elif command == 'setoption':
+            self.wait()
+            self.set_option(tokens[1:])
+        elif command == 'ucinewgame':
+            self.wait()
+            self.tt.clear()
+            if self.parallel_search is not None:
+                self.parallel_search.clear()
+            self.orderer = MoveOrderer()
+            self.game = ChessGame()
+        elif command == 'position':
+            self.wait()
+            self.set_position(tokens[1:])
+        elif command == 'go':
+            self.wait()
+            self.go(tokens[1:])
+        elif command == 'stop':
+            self.stop()
+        elif command == 'quit':
+            self.stop()
+            if self.parallel_search is not None:
+                self.parallel_search.close()
+            if self.book is not None:
+                self.book.close()
+            return False
+        return True
+
+    def set_option(self, tokens: List[str]) -> None:
+        """
+        Metoda zpracuje prikaz setoption name <jmeno> value <hodnota>.
+        """
+        if 'name' not in tokens or 'value' not in tokens:
+            return
+        name = ' '.join(tokens[tokens.index('name') + 1:tokens.index('value')]).lower()
+        value = ' '.join(tokens[tokens.index('value') + 1:])
+        try:
+            if name == 'hash':
+                self.hash_mb = min(max(1, int(value)), MAX_HASH_MB)
+                self.tt = TranspositionTable(self.hash_mb)
+            elif name == 'threads':
+                self.threads = min(max(1, int(value)), MAX_THREADS)
+            elif name == 'bookfile':
+                book = OpeningBook(value) if value and value != '<empty>' else None
+                if self.book is not None:
+                    self.book.close()
+                self.book = book
+                return
+            else:
+                return
+        except (ValueError, OSError) as e:
+            # chybna volba se ignoruje, engine bezi dal s puvodnim nastavenim
+            send(f'info string invalid option {name}: {e}')
+            return
+        if self.parallel_search is not None:
+            self.parallel_search.close()
+            self.parallel_search = None
+        if self.threads > 1:
+            self.parallel_search = ParallelSearch(self.threads, self.hash_mb)
+
+    def set_position(self, tokens: List[str]) -> None:
+        """
+        Metoda zpracuje prikaz position [startpos | fen <FEN>] [moves <tahy>]. Pri chybne FEN nebo nelegalnim tahu
+        zustane puvodni pozice.
+        """
+        moves_index = tokens.index('moves') if 'moves' in tokens else len(tokens)
+        if len(tokens) > 0 and tokens[0] == 'fen':
+            fen = ' '.join(tokens[1:moves_index])
+        else:
+            fen = STARTING_FEN
+        try:
+            game = ChessGame(fen)
+            for token in tokens[moves_index + 1:]:
+                move = next((m for m in game.generate_legal_moves() if m.uci == token), None)
+                if move is None:
+                    raise Exception(f'Invalid move: {token}')
+                game.do_move(move)
+        except Exception as e:
+            send(f'info string invalid position: {e}')
+            return
+        self.game = game
+
+    def go(self, tokens: List[str]) -> None:
+        """
+        Metoda zpracuje prikaz go a spusti hledani ve vlastnim vlakne. Podporovane parametry jsou depth, nodes,
+        movetime, wtime, btime, winc, binc, movestogo a infinite.
+        """
+        params = {}
+        for i, token in enumerate(tokens):
+            if token in ('depth', 'nodes', 'movetime', 'wtime', 'btime', 'winc', 'binc', 'movestogo') and \
+                    i + 1 < len(tokens):
+                try:
+                    params[token] = int(tokens[i + 1])
+                except ValueError:
+                    send(f'info string invalid {token}: {tokens[i + 1]}')
+        infinite = 'infinite' in tokens
+        depth = min(params.get('depth', MAX_PLY), MAX_PLY)
+        limits = SearchLimits(nodes=params.get('nodes'))
+        if 'movetime' in params:
+            limits.soft_time = limits.hard_time = max(0.0, params['movetime'] / 1000 - MOVE_OVERHEAD)
+        elif not infinite:
+            time_left = params.get('wtime' if self.game.white_to_move else 'btime')
+            if time_left is not None:
+                increment = params.get('winc' if self.game.white_to_move else 'binc', 0) / 1000
+                time_left = max(0.0, time_left / 1000 - MOVE_OVERHEAD)
+                # mekky limit je podil zbyvajiciho casu, tvrdy limit jeho nasobek, nejvyse tretina zbyvajiciho casu
+                limits.soft_time = min(time_left / params.get('movestogo', DEFAULT_MOVES_TO_GO) + increment,
+                                       time_left)
+                limits.hard_time = min(limits.soft_time * 3, time_left / 3 + increment, time_left)
+        self.stop_event.clear()
+        self.infinite = infinite
+        self.search_thread = threading.Thread(target=self._search, args=(depth, limits, infinite), daemon=True)
+        self.search_thread.start()
+
+    def wait(self) -> None:
+        """
+        Metoda pocka na dokonceni probihajiciho hledani (dalsi prikazy se zpracuji az po nem). Hledani go infinite
+        by neskoncilo, to zastavi.
+        """
+        if self.infinite:
+            self.stop()
+        elif self.search_thread is not None:
+            self.search_thread.join()
+            self.search_thread = None
+
+    def stop(self) -> None:
+        """
+        Metoda zastavi probihajici hledani a pocka, az vlakno hledani vypise nejlepsi tah.
+        """
+        if self.search_thread is None:
+            return
+        self.stop_event.set()
+        while self.search_thread.is_alive():
+            if self.parallel_search is not None:
+                # paralelni hledani ma vlastni udalost, ktera vznika az se zacatkem hledani, proto ji nastavujeme
+                # opakovane, dokud vlakno neskonci
+                self.parallel_search.stop()
+            self.search_thread.join(0.05)
+        self.search_thread = None
+        self.infinite = False
+
+    def _search(self, depth: int, limits: SearchLimits, infinite: bool) -> None:
+        """
+        Metoda vlakna hledani: prohleda pozici, prubezne vypisuje info a nakonec nejlepsi tah.
+        """
+        valid_moves = self.game.generate_legal_moves()
+        book_move = self.book.choose_move(self.game, valid_moves) if self.book is not None else None
+        if book_move is not None:
+            if infinite:
+                self.stop_event.wait()
+            send(f'bestmove {book_move.uci}')
+            return
+        if self.parallel_search is not None:
+            result = self.parallel_search.search(self.game, depth, valid_moves, limits, send_info)
+        else:
+            search = Search(self.game, depth, self.tt, self.orderer, SearchStats(), self.stop_event, limits,
+                            send_info)
+            result = search.search(valid_moves)
+        if infinite:
+            # pri go infinite smi engine poslat tah az po prikazu stop
+            self.stop_event.wait()
+        send(f'bestmove {result.best_move.uci if result.best_move is not None else "0000"}')
+
+
+def send(message: str) -> None:
+    """
+    Funkce vypise jeden radek pro GUI. Zapis je pod zamkem, aby se radky z vice vlaken nepromichaly.
+    """
+    with _output_lock:
+        sys.stdout.write(message + '\n')
+        sys.stdout.flush()
+
+
+def send_info(result: SearchResult) -> None:
+    """
+    Funkce vypise info o dokoncene iteraci hledani.
+    """
+    if abs(result.score) >= MATE_BOUND:
+        # skore matu je CHECKMATE minus pocet pultahu do matu, UCI pocita tahy
+        mate_moves = (CHECKMATE - abs(result.score) + 1) // 2
+        score = f'mate {mate_moves if result.score > 0 else -mate_moves}'
+    else:
+        score = f'cp {result.score}'
+    send(f'info depth {result.depth} score {score} nodes {result.nodes} nps {result.nps} '
+         f'time {int(result.elapsed * 1000)} pv {" ".join(move.uci for move in result.pv)}')
+
+
+def main() -> None:
+    uci_engine = UciEngine()
+    for line in sys.stdin:
+        if not uci_engine.handle(line):
+            break
+    uci_engine.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,17 @@
-from typing import List, Tuple
-from rules import ChessGame, Move, Piece, Color
+from typing import List, Tuple, Union
+from rules import ChessGame, Move, Color, BoardView
+from book import OpeningBook
 import engine
+import os
+import sys
 import pygame as p
 
 WIDTH = HEIGHT = 512
 DIMENSION = 8
 SQ_SIZE = HEIGHT // DIMENSION
 MAX_FPS = 15
+# kniha zahajeni (viz book.py), pokud soubor neexistuje, pocitac hleda od prvniho tahu
+BOOK_FILE = 'book.bin'
 IMAGES = {}
 WHITE = Color.WHITE
 BLACK = Color.BLACK
@@ -37,7 +42,6 @@ def main() -> None:
     screen.fill(p.Color("white"))
     game = ChessGame()
     valid_moves = game.generate_legal_moves()
-    print('Possible moves: ' + ','.join(str(move) for move in valid_moves))
     move_made = False
     load_images()
     running = True
@@ -46,6 +50,9 @@ def main() -> None:
     is_white_human = True
     is_black_human = False
     is_game_over = False
+    # hledani pocitace bezi ve vlastnim vlakne, smycka mezitim dal zpracovava udalosti a kresli
+    ai_thread: Union[engine.SearchThread, None] = None
+    book = OpeningBook(BOOK_FILE) if os.path.exists(BOOK_FILE) else None
     while running:
         is_human_turn = (game.white_to_move and is_white_human) or (not game.white_to_move and is_black_human)
         for e in p.event.get():
@@ -54,6 +61,9 @@ def main() -> None:
             # key handlers
             elif e.type == p.KEYDOWN:
                 if e.key == p.K_z:
+                    if ai_thread is not None:
+                        ai_thread.stop()
+                        ai_thread = None
                     is_game_over = False
                     game.undo_move()
                     move_made = True
@@ -82,20 +92,39 @@ def main() -> None:
                             player_clicks = [sq_selected]
 
         # AI
-        if not is_game_over and not is_human_turn:
-            best_move = engine.find_best_move_min_max(game, valid_moves)
-            if best_move is None:
-                best_move = engine.find_random_move(valid_moves)
-            game.do_move(best_move)
-            game.check_end_result()
-            move_made = True
+        if running and not is_game_over and not is_human_turn and not move_made:
+            book_move = book.choose_move(game, valid_moves) if book is not None and ai_thread is None else None
+            if book_move is not None:
+                game.do_move(book_move)
+                game.check_end_result()
+                move_made = True
+            elif ai_thread is None:
+                ai_thread = engine.SearchThread(game)
+                ai_thread.start()
+            elif not ai_thread.is_alive():
+                if ai_thread.result is None:
+                    # vlakno hledani skoncilo vyjimkou (vypise ji threading), hraje se nahodny tah
+                    print('AI search failed, playing a random move', file=sys.stderr)
+                    best_move = None
+                else:
+                    # tah z kopie partie prevedeme na tah z aktualnich legalnich tahu
+                    best_move = next((move for move in valid_moves if move == ai_thread.result.best_move), None)
+                if engine.search_stats.enabled:
+                    print(f'{best_move}: {engine.search_stats.summary()}')
+                ai_thread = None
+                p.display.set_caption('chess')
+                if best_move is None:
+                    best_move = engine.find_random_move(valid_moves)
+                game.do_move(best_move)
+                game.check_end_result()
+                move_made = True
+            elif ai_thread.progress is not None:
+                progress = ai_thread.progress
+                p.display.set_caption(f'chess - depth {progress.depth}, score {progress.score}, '
+                                      f'pv {" ".join(str(move) for move in progress.pv)}')
 
         if move_made:
             valid_moves = game.generate_legal_moves()
-            print('Possible moves: ' + ','.join(str(move) for move in valid_moves))
-            # print('Pins: ' + ','.join(str(pin) for pin in game.pins))
-            # print('En passant square: ' + str(game.enpassant_square_log[-1]) if len(game.enpassant_square_log) > 0 else 'none')
-            print('Castling rights: ' + str(game.castling_rights_log[-1]))
             move_made = False
         draw_game_state(screen, game, valid_moves, sq_selected)
         if game.game_result is not None:
@@ -104,9 +133,14 @@ def main() -> None:
             is_game_over = True
         clock.tick(MAX_FPS)
         p.display.flip()
+    if ai_thread is not None:
+        ai_thread.stop()
+    if book is not None:
+        book.close()
 
 
-def highlight_squares(screen: p.Surface, game: ChessGame, valid_moves: List[Move], sq_selected: Tuple[int, int]) -> None:
+def highlight_squares(screen: p.Surface, game: ChessGame, valid_moves: List[Move],
+                      sq_selected: Tuple[int, int]) -> None:
     if sq_selected != ():
         r, c = sq_selected
         if game.board[r][c] is not None and (game.board[r][c].color == WHITE if game.white_to_move else BLACK):
@@ -134,7 +168,7 @@ def draw_board(screen: p.Surface) -> None:
             p.draw.rect(screen, color, p.Rect(c*SQ_SIZE, r*SQ_SIZE, SQ_SIZE, SQ_SIZE))
 
 
-def draw_pieces(screen: p.Surface, board: List[List[Piece]]) -> None:
+def draw_pieces(screen: p.Surface, board: BoardView) -> None:
     for r in range(DIMENSION):
         for c in range(DIMENSION):
             piece = board[r][c]